@@ -0,0 +1,56 @@
+"""
+Compare the cold start of compiling a schema in a fresh process
+with and without the on-disk cache.
+
+    python -m benchmarks.cache
+"""
+
+import subprocess
+import sys
+import tempfile
+
+SCHEMAS = ["tests/assets/premis.xsd.xml", "tests/assets/mods-3-7.xsd.xml"]
+REPEAT = 5
+
+_COLD_START = """
+import sys, time
+import xsd2xml
+start = time.perf_counter()
+xsd2xml.compile(sys.argv[1], cache_dir=sys.argv[2] or None)
+print(time.perf_counter() - start)
+"""
+
+
+def _cold_start(path: str, cache_dir: str) -> float:
+    """
+    The time it takes a fresh process to get a compiled schema, excluding imports.
+    """
+
+    timings = []
+    for _ in range(REPEAT):
+        output = subprocess.run(
+            [sys.executable, "-c", _COLD_START, path, cache_dir],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        timings.append(float(output))
+    return min(timings)
+
+
+def main():
+    for path in SCHEMAS:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            uncached = _cold_start(path, "")
+            # Populate the cache before measuring
+            _ = _cold_start(path, cache_dir)
+            cached = _cold_start(path, cache_dir)
+
+        print(
+            f"{path}: compile {uncached * 1000:.1f} ms, "
+            f"with cache {cached * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
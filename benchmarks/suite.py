@@ -0,0 +1,212 @@
+"""
+Measure the generation of documents for the root elements of the test schemas,
+offline and with fixed seeds:
+
+- the time to load (compile) each schema,
+- documents per second and the p50 and p99 latency of one document, built as a tree,
+- documents per second of the generator specialized for the root element,
+- the time to serialize one document from its events,
+- the peak memory allocated while generating one document, from tracemalloc.
+
+Every document is timed a few times and its fastest time is kept, which
+filters out most of the noise of a busy machine.
+
+Root elements the generator does not support yet are reported and skipped.
+Results can be saved as a JSON baseline, and compared against one: any metric
+that got worse by more than the threshold is flagged and the exit status is 1.
+
+    python -m benchmarks.suite --save baseline.json
+    python -m benchmarks.suite --compare baseline.json --threshold 0.2
+"""
+
+from pathlib import Path
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import xsd2xml
+from xsd2xml.core import writer
+from xsd2xml.core.batch import document_random
+from xsd2xml.core.model import CompiledSchema
+from xsd2xml.core.utils import InvalidXSDError
+
+SCHEMAS = {
+    "premis": ("tests/assets/premis.xsd.xml", ["agent", "object", "event", "rights", "premis"]),
+    "mods": (
+        "tests/assets/mods-3-7.xsd.xml",
+        ["mods", "modsCollection", "titleInfo", "originInfo", "url", "digitalOrigin"],
+    ),
+}
+SEED = 1
+REPEAT = 3
+MEMORY_DOCUMENTS = 10
+
+# Whether a higher value of a metric is better
+_HIGHER_IS_BETTER = {
+    "load_s": False,
+    "documents_per_s": True,
+    "specialized_documents_per_s": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "serialize_ms": False,
+    "peak_kib": False,
+}
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def _load_time(path: str) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        xsd2xml.compile(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _measure_element(schema: CompiledSchema, element_name: str, n: int) -> dict[str, float]:
+    xsd_element = schema.find_global_element(element_name)
+
+    latencies = [float("inf")] * n
+    for _ in range(REPEAT):
+        for i in range(n):
+            start = time.perf_counter()
+            schema.generate_element(xsd_element, document_random(SEED, i))
+            latencies[i] = min(latencies[i], time.perf_counter() - start)
+
+    generator = schema.specialize(element_name)
+    specialized = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for i in range(n):
+            generator.generate(document_random(SEED, i))
+        specialized = min(specialized, time.perf_counter() - start)
+
+    prefixes = writer.output_prefixes(schema)
+    serialize_timings = []
+    for i in range(n):
+        events = list(schema.generate_events(xsd_element, document_random(SEED, i)))
+        timing = float("inf")
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            xml_writer = writer.XMLWriter(io.BytesIO(), prefixes, "  ")
+            writer.write_events(xml_writer, events)
+            xml_writer.close()
+            timing = min(timing, time.perf_counter() - start)
+        serialize_timings.append(timing)
+
+    peak = 0
+    for i in range(min(n, MEMORY_DOCUMENTS)):
+        tracemalloc.start()
+        schema.generate_element(xsd_element, document_random(SEED, i))
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "documents_per_s": n / sum(latencies),
+        "specialized_documents_per_s": n / specialized,
+        "p50_ms": _percentile(latencies, 0.5) * 1e3,
+        "p99_ms": _percentile(latencies, 0.99) * 1e3,
+        "serialize_ms": statistics.fmean(serialize_timings) * 1e3,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run(n: int, schema_names: list[str]) -> dict:
+    results = {
+        "python": platform.python_version(),
+        "documents": n,
+        "seed": SEED,
+        "schemas": {},
+    }
+    for schema_name in schema_names:
+        path, element_names = SCHEMAS[schema_name]
+        schema = xsd2xml.compile(path)
+        schema_results = {"load_s": _load_time(path), "elements": {}, "skipped": {}}
+        print(f"{schema_name}: loaded in {schema_results['load_s'] * 1e3:.1f} ms")
+
+        for element_name in element_names:
+            try:
+                metrics = _measure_element(schema, element_name, n)
+            except (NotImplementedError, InvalidXSDError, ValueError) as e:
+                schema_results["skipped"][element_name] = type(e).__name__
+                print(f"  {element_name:>16}: skipped ({type(e).__name__})")
+                continue
+            schema_results["elements"][element_name] = metrics
+            print(
+                f"  {element_name:>16}: {metrics['documents_per_s']:8.1f} documents/s, "
+                f"specialized {metrics['specialized_documents_per_s']:8.1f}/s, "
+                f"p50 {metrics['p50_ms']:7.3f} ms, p99 {metrics['p99_ms']:7.3f} ms, "
+                f"serialize {metrics['serialize_ms']:7.3f} ms, "
+                f"peak {metrics['peak_kib']:8.1f} KiB"
+            )
+        results["schemas"][schema_name] = schema_results
+    return results
+
+
+def _flatten(results: dict) -> dict[str, float]:
+    metrics = {}
+    for schema_name, schema_results in results["schemas"].items():
+        metrics[f"{schema_name}/load_s"] = schema_results["load_s"]
+        for element_name, element_metrics in schema_results["elements"].items():
+            for metric, value in element_metrics.items():
+                metrics[f"{schema_name}/{element_name}/{metric}"] = value
+    return metrics
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list[str]:
+    """
+    The metrics of `results` that are worse than in `baseline` by more than
+    `threshold`, a fraction of the baseline value.
+    """
+
+    regressions = []
+    current = _flatten(results)
+    for key, before in _flatten(baseline).items():
+        after = current.get(key)
+        if after is None or before == 0:
+            continue
+        change = (after - before) / before
+        if _HIGHER_IS_BETTER[key.rsplit("/", 1)[1]]:
+            change = -change
+        if change > threshold:
+            regressions.append(f"{key}: {before:.4g} -> {after:.4g} ({change:+.0%} worse)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--documents", type=int, default=200)
+    parser.add_argument("--schema", choices=SCHEMAS, action="append")
+    parser.add_argument("--save", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="compare against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run(args.documents, args.schema or list(SCHEMAS))
+
+    if args.save is not None:
+        args.save.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(baseline, results, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
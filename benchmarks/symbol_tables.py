@@ -0,0 +1,62 @@
+"""
+Compare resolving every reference in a schema with an ElementPath scan of the
+schema root against a lookup in the symbol table built at load time.
+
+    python -m benchmarks.symbol_tables
+"""
+
+import timeit
+
+from xsd2xml.core.etree import _ElementTree
+from xsd2xml.core.namespaces import xsd
+
+SCHEMAS = ["tests/assets/premis.xsd.xml", "tests/assets/mods-3-7.xsd.xml"]
+REFERENCE_KINDS = {
+    "ref": (xsd.element, xsd.attributeGroup, xsd.group),
+    "type": (xsd.simpleType, xsd.complexType),
+    "base": (xsd.simpleType, xsd.complexType),
+}
+
+
+def _collect_references(xsd_tree: _ElementTree) -> list[tuple[str, str]]:
+    root = xsd_tree.getroot()
+    references = []
+    for element in root._element.iter():
+        for attribute, kinds in REFERENCE_KINDS.items():
+            name = element.get(attribute)
+            if name is None:
+                continue
+            references += [(kind, name) for kind in kinds]
+    return references
+
+
+def _local_name(name: str) -> str:
+    return name.rsplit("}", 1)[-1]
+
+
+def main():
+    for path in SCHEMAS:
+        xsd_tree = _ElementTree.parse(path)
+        root = xsd_tree.getroot()
+        references = _collect_references(xsd_tree)
+
+        def scan():
+            for kind, name in references:
+                _ = root.find(f"{kind}[@name='{_local_name(name)}']")
+
+        def lookup():
+            for kind, name in references:
+                _ = root.lookup(kind, name)
+
+        scan_time = min(timeit.repeat(scan, number=10, repeat=5)) / 10
+        lookup_time = min(timeit.repeat(lookup, number=10, repeat=5)) / 10
+        print(
+            f"{path}: {len(references)} lookups, "
+            f"scan {scan_time * 1000:.2f} ms, "
+            f"symbol table {lookup_time * 1000:.2f} ms, "
+            f"{scan_time / lookup_time:.0f}x faster"
+        )
+
+
+if __name__ == "__main__":
+    main()
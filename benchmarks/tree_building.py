@@ -0,0 +1,107 @@
+"""
+Compare building the ElementTree of a large document directly from the
+generated events against first building a tree of placeholder dataclasses
+and copying it into `ET.Element`s, as generation used to.
+
+The MODS schema cannot be used here: most of its elements need the xlink
+and xml imports, which are not supported yet. A document with a few
+hundred thousand nested elements is generated from an inline schema instead.
+
+    python -m benchmarks.tree_building
+"""
+
+from dataclasses import dataclass, field
+import random
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+import xsd2xml
+from xsd2xml.core import events as ev, tree
+
+OCCURS = 100_000
+
+XSD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:element name="records">
+        <xs:complexType>
+            <xs:sequence>
+                <xs:element name="record" minOccurs="%d" maxOccurs="%d">
+                    <xs:complexType>
+                        <xs:sequence>
+                            <xs:element name="title" type="xs:string"/>
+                            <xs:element name="size" type="xs:integer"/>
+                        </xs:sequence>
+                        <xs:attribute name="id" type="xs:ID" use="required"/>
+                    </xs:complexType>
+                </xs:element>
+            </xs:sequence>
+        </xs:complexType>
+    </xs:element>
+</xs:schema>
+""" % (OCCURS, OCCURS)
+
+
+@dataclass
+class _Placeholder:
+    tag: str
+    text: str | None = None
+    attrib: dict[str, str] = field(default_factory=dict)
+    children: list["_Placeholder"] = field(default_factory=list)
+
+    def manifest(self) -> ET.Element:
+        element = ET.Element(self.tag, attrib=self.attrib)
+        element.text = self.text
+        element.extend(child.manifest() for child in self.children)
+        return element
+
+
+def _build_through_placeholders(events: list[ev.Event]) -> ET.ElementTree:
+    root = None
+    open_elements: list[_Placeholder] = []
+    for event in events:
+        if isinstance(event, ev.Start):
+            element = _Placeholder(event.tag, event.text, event.attrib)
+            if open_elements:
+                open_elements[-1].children.append(element)
+            else:
+                root = element
+            open_elements.append(element)
+        else:
+            _ = open_elements.pop()
+
+    assert root is not None
+    return ET.ElementTree(root.manifest())
+
+
+def _measure(build, events: list[ev.Event]) -> tuple[float, int]:
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    document = build(events)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del document
+    return elapsed, peak - baseline
+
+
+def main():
+    schema = xsd2xml.compile(XSD)
+    random.seed(1)
+    events = list(schema.generate_events(schema.find_global_element("records")))
+    nodes = sum(isinstance(event, ev.Start) for event in events)
+
+    for name, build in (
+        ("placeholders", _build_through_placeholders),
+        ("direct", tree.build_tree),
+    ):
+        elapsed, peak = _measure(build, events)
+        print(
+            f"{name:>12}: {nodes} nodes in {elapsed:.3f} s, "
+            f"peak {peak / 2**20:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
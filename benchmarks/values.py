@@ -0,0 +1,35 @@
+"""
+Time taking values of every built-in type from the value pools of a
+document, one value at a time as generation does.
+
+    python -m benchmarks.values
+"""
+
+import random
+import timeit
+
+from xsd2xml.core import values
+from xsd2xml.core.builtins import BuiltIn
+from xsd2xml.core.values import ValuePools
+
+N = 20_000
+
+
+def main():
+    backend = "numpy" if values.numpy is not None else "random"
+    print(f"backend: {backend}, {N} values per type")
+    for built_in in BuiltIn:
+        if built_in not in values._FILLERS:
+            continue
+
+        def take():
+            pools = ValuePools(random.Random(1))
+            for _ in range(N):
+                _ = pools.take(built_in)
+
+        elapsed = min(timeit.repeat(take, number=1, repeat=3))
+        print(f"{built_in.name:>20}: {elapsed / N * 1e9:6.0f} ns/value")
+
+
+if __name__ == "__main__":
+    main()
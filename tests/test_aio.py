@@ -0,0 +1,123 @@
+from contextlib import aclosing
+import asyncio
+import random
+import threading
+import time
+
+import pytest
+
+import xsd2xml
+from xsd2xml import ValueProviders
+
+PREMIS = "tests/assets/premis.xsd.xml"
+
+XSD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:element name="doc" type="xs:string"/>
+</xs:schema>
+"""
+
+
+class _Counter:
+    """A provider counting the documents generated so far"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, rng: random.Random) -> str:
+        with self.lock:
+            self.count += 1
+        return str(self.count)
+
+
+def _counted_schema() -> tuple[xsd2xml.CompiledSchema, _Counter]:
+    counter = _Counter()
+    providers = ValueProviders().for_path("doc", counter)
+    return xsd2xml.compile(XSD, providers=providers), counter
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"specialize": True}, {"workers": 2}],
+    ids=["thread", "specialized", "processes"],
+)
+def test_same_documents_as_generate_many(kwargs: dict):
+    async def collect() -> list:
+        stream = xsd2xml.agenerate(PREMIS, "event", 10, seed=4, serialize=True, **kwargs)
+        return [document async for document in stream]
+
+    expected = list(xsd2xml.generate_many(PREMIS, "event", 10, seed=4, serialize=True))
+    assert asyncio.run(collect()) == expected
+
+
+def test_slow_consumer_bounds_prefetching():
+    schema, counter = _counted_schema()
+
+    async def consume() -> None:
+        stream = xsd2xml.agenerate(schema, "doc", seed=1, prefetch=3)
+        async with aclosing(stream):
+            consumed = 0
+            async for _ in stream:
+                consumed += 1
+                await asyncio.sleep(0.05)
+                # The next documents are generated while the consumer is busy
+                assert counter.count == consumed + 3
+                if consumed == 5:
+                    break
+
+    asyncio.run(consume())
+
+
+def test_closing_stops_generation():
+    schema, counter = _counted_schema()
+
+    async def consume() -> int:
+        stream = xsd2xml.agenerate(schema, "doc", seed=1, prefetch=4)
+        async with aclosing(stream):
+            async for _ in stream:
+                break
+        return counter.count
+
+    count = asyncio.run(consume())
+    time.sleep(0.1)
+    assert counter.count == count <= 1 + 4
+
+
+def test_cancellation_stops_generation():
+    schema, counter = _counted_schema()
+
+    async def consume() -> None:
+        async for _ in xsd2xml.agenerate(schema, "doc", seed=1, prefetch=2):
+            await asyncio.sleep(1)
+
+    async def cancel() -> int:
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.1)
+        _ = task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return counter.count
+
+    count = asyncio.run(cancel())
+    time.sleep(0.1)
+    assert counter.count == count <= 1 + 2
+
+
+def test_event_loop_keeps_running():
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    async def consume() -> int:
+        ticker = asyncio.create_task(tick())
+        documents = [d async for d in xsd2xml.agenerate(PREMIS, "premis", 5, seed=1)]
+        _ = ticker.cancel()
+        return len(documents)
+
+    assert asyncio.run(consume()) == 5
+    assert ticks > 5
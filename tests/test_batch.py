@@ -0,0 +1,63 @@
+import random
+
+from xmlschema import XMLSchema
+
+import xsd2xml
+from tests.utils import serialize_tree, set_seed
+
+PREMIS = "tests/assets/premis.xsd.xml"
+premis_xsd = XMLSchema(PREMIS)
+
+
+def test_generate_many_valid():
+    batch = xsd2xml.generate_many(PREMIS, "premis", 5, seed=1, serialize=True)
+    documents = list(batch)
+
+    assert len(documents) == 5
+    assert all(premis_xsd.is_valid(document.decode()) for document in documents)
+    assert batch.generated == 5 and batch.throughput > 0
+
+
+def test_generate_many_is_reproducible_and_lazy():
+    schema = xsd2xml.compile(PREMIS)
+    first = list(xsd2xml.generate_many(schema, "agent", 3, seed=7, serialize=True))
+
+    batch = xsd2xml.generate_many(schema, "agent", 1000, seed=7, serialize=True)
+    second = [document for _, document in zip(range(3), batch)]
+
+    assert first == second
+    assert batch.generated == 3
+
+
+def test_generate_many_independent_of_workers():
+    schema = xsd2xml.compile(PREMIS)
+
+    sequential = list(xsd2xml.generate_many(schema, "premis", 12, seed=3, serialize=True))
+    parallel = list(
+        xsd2xml.generate_many(
+            schema, "premis", 12, seed=3, serialize=True, workers=2, chunk_size=5
+        )
+    )
+
+    assert parallel == sequential
+
+
+def test_generate_with_rng_ignores_global_random():
+    schema = xsd2xml.compile(PREMIS)
+
+    set_seed(1)
+    first = serialize_tree(schema.generate("premis", random.Random(42)))
+    set_seed(2)
+    second = serialize_tree(schema.generate("premis", random.Random(42)))
+
+    assert first == second
+
+
+def test_batch_document_regenerates_single_document():
+    batch = xsd2xml.generate_many(PREMIS, "premis", 1000, seed=11, serialize=True)
+
+    documents = [document for _, document in zip(range(4), batch)]
+
+    assert batch.document(3) == documents[3]
+    assert batch.document(999) == batch.document(999)
+
@@ -0,0 +1,114 @@
+import io
+import random
+
+from xmlschema import XMLSchema
+import pytest
+
+import xsd2xml
+from xsd2xml import Budget, Uniform, Zipf
+from xsd2xml.core.namespaces import xsi
+from tests.utils import serialize_tree
+
+PREMIS = "tests/assets/premis.xsd.xml"
+premis_xsd = XMLSchema(PREMIS)
+premis = xsd2xml.compile(PREMIS)
+
+
+def _depth(element, depth: int = 1) -> int:
+    return max((_depth(child, depth + 1) for child in element), default=depth)
+
+
+@pytest.mark.parametrize("target", [10, 300, 5000])
+def test_target_elements(target: int):
+    budget = Budget(elements=target)
+
+    sizes = []
+    for i in range(5):
+        document = premis.generate("premis", random.Random(i), budget)
+        assert premis_xsd.is_valid(serialize_tree(document))
+        sizes.append(sum(1 for _ in document.iter()))
+
+    # Once the target is reached, only required elements are added
+    assert all(size <= target + 10 for size in sizes)
+    assert max(sizes) >= target
+
+
+def test_target_bytes():
+    budget = Budget(bytes=20_000)
+
+    for i in range(5):
+        sink = io.BytesIO()
+        premis.write("premis", sink, indent=None, rng=random.Random(i), budget=budget)
+        assert 10_000 <= len(sink.getvalue()) <= 30_000
+
+
+def test_caps_stop_generation_cleanly():
+    budget = Budget(max_elements=100, max_depth=4, unbounded_occurs=10**9)
+
+    for i in range(5):
+        document = premis.generate("premis", random.Random(i), budget)
+        assert premis_xsd.is_valid(serialize_tree(document))
+        assert sum(1 for _ in document.iter()) <= 110
+        assert _depth(document.getroot()) <= 6
+
+
+def test_optional_attribute_probability():
+    budget = Budget(optional_attribute_probability=0)
+    document = premis.generate("object", random.Random(1), budget)
+
+    assert premis_xsd.is_valid(serialize_tree(document))
+    attributes = {name for element in document.iter() for name in element.attrib}
+    assert attributes <= {xsi.type}
+
+
+def test_zero_caps_are_caps():
+    sizes = {}
+    for max_elements in (0, 1):
+        budget = Budget(max_elements=max_elements, unbounded_occurs=10**9)
+        documents = [premis.generate("premis", random.Random(i), budget) for i in range(5)]
+        assert all(premis_xsd.is_valid(serialize_tree(d)) for d in documents)
+        sizes[max_elements] = max(sum(1 for _ in d.iter()) for d in documents)
+
+    # Only the required elements are generated in both cases
+    assert sizes[0] == sizes[1]
+
+
+@pytest.mark.parametrize(
+    "size",
+    [
+        lambda: Uniform(-1, 5),
+        lambda: Uniform(10, 5),
+        lambda: Zipf(0, 5),
+        lambda: Zipf(10, 5),
+    ],
+)
+def test_invalid_size_distributions(size):
+    with pytest.raises(ValueError):
+        size()
+
+
+@pytest.mark.parametrize("size", [Uniform(5, 50), Zipf(5, 50), Zipf(5, 50, exponent=1)])
+def test_size_distributions(size: Uniform | Zipf):
+    rng = random.Random(1)
+    samples = [size.sample(rng) for _ in range(1000)]
+
+    assert min(samples) >= 5
+    assert max(samples) <= 50
+
+
+def test_zipf_is_heavy_tailed():
+    rng = random.Random(1)
+    samples = sorted(Zipf(10, 10**6).sample(rng) for _ in range(1000))
+
+    assert samples[500] < 100
+    assert samples[-1] > 10_000
+
+
+def test_batch_with_budget_is_reproducible():
+    budget = Budget(elements=Uniform(50, 500))
+    batch = xsd2xml.generate_many(PREMIS, "premis", 8, seed=3, serialize=True, budget=budget)
+
+    documents = list(batch)
+
+    assert batch.document(5) == documents[5]
+    assert len(set(documents)) == 8
@@ -1,14 +1,19 @@
 from typing import Any
 import xml.etree.ElementTree as ET
 import io
+import random
 
+import pytest
 import xmlschema
 
-import xsd2xml.core.builtins as builtins
+from xsd2xml.core.builtins import BuiltIn
 from xsd2xml.core.namespaces import xsd
+from xsd2xml.core.values import ValuePools
 
+values = ValuePools(random.Random(1))
 
-def _test_type(xsd_type_name: str, value: Any):
+
+def _schema_for(xsd_type_name: str) -> xmlschema.XMLSchema:
     xsd_schema = ET.Element(xsd.schema)
     xsd_element = ET.Element(
         xsd.element, attrib={"name": "test", "type": xsd_type_name}
@@ -20,44 +25,77 @@ def _test_type(xsd_type_name: str, value: Any):
     xsd_tree.write(data, encoding="unicode")
     serialized = data.getvalue()
 
+    return xmlschema.XMLSchema(source=serialized)
+
+
+def _test_type(xsd_type_name: str, value: Any):
     xml_element = ET.Element("test")
     xml_element.text = value
 
-    schema = xmlschema.XMLSchema(source=serialized)
+    schema = _schema_for(xsd_type_name)
     assert schema.is_valid(xml_element)
 
 
 def test_string():
     for _ in range(100):
         # TODO: fix prefixes
-        _test_type("xsd:string", builtins.random_string())
+        _test_type("xsd:string", values.take(BuiltIn.string))
 
 
 def test_boolean():
     for _ in range(100):
-        _test_type("xsd:boolean", builtins.random_boolean())
+        _test_type("xsd:boolean", values.take(BuiltIn.boolean))
 
 
 def test_decimal():
     for _ in range(100):
-        _test_type("xsd:decimal", builtins.random_decimal())
+        _test_type("xsd:decimal", values.take(BuiltIn.decimal))
 
 
 def test_float():
     for _ in range(100):
-        _test_type("xsd:float", builtins.random_float())
+        _test_type("xsd:float", values.take(BuiltIn.float))
 
 
 def test_double():
     for _ in range(100):
-        _test_type("xsd:double", builtins.random_double())
+        _test_type("xsd:double", values.take(BuiltIn.double))
 
 
 def test_duration():
     for _ in range(100):
-        _test_type("xsd:duration", builtins.random_duration())
+        _test_type("xsd:duration", values.take(BuiltIn.duration))
 
 
 def test_integer():
     for _ in range(100):
-        _test_type("xsd:integer", builtins.random_integer())
+        _test_type("xsd:integer", values.take(BuiltIn.integer))
+
+
+# Values of these types must refer to declarations or IDs elsewhere in the document
+_CONTEXTUAL_TYPES = (
+    BuiltIn.notation,
+    BuiltIn.entity,
+    BuiltIn.entities,
+    BuiltIn.idref,
+    BuiltIn.idrefs,
+)
+
+
+@pytest.mark.parametrize(
+    "built_in", [t for t in BuiltIn if t not in _CONTEXTUAL_TYPES], ids=lambda t: t.name
+)
+def test_every_built_in_type(built_in: BuiltIn):
+    schema = _schema_for("xsd:" + built_in.value.split("}")[1])
+    pools = ValuePools(random.Random(built_in.value))
+
+    for _ in range(300):
+        xml_element = ET.Element("test")
+        xml_element.text = pools.take(built_in)
+        assert schema.is_valid(xml_element), xml_element.text
+
+
+@pytest.mark.parametrize("built_in", [BuiltIn.notation, BuiltIn.entity])
+def test_contextual_types_are_not_generated(built_in: BuiltIn):
+    with pytest.raises(NotImplementedError):
+        _ = ValuePools(random.Random(1)).take(built_in)
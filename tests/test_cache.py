@@ -0,0 +1,70 @@
+from pathlib import Path
+import pickle
+
+import pytest
+
+import xsd2xml
+import xsd2xml.xsd2xml
+from tests.utils import serialize_tree, set_seed
+
+PREMIS = "tests/assets/premis.xsd.xml"
+
+
+def test_cached_schema_generates_same_documents(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    calls = []
+    compile_schema = xsd2xml.xsd2xml.compile_schema
+    monkeypatch.setattr(
+        xsd2xml.xsd2xml,
+        "compile_schema",
+        lambda xsd_tree: calls.append(xsd_tree) or compile_schema(xsd_tree),
+    )
+
+    compiled = xsd2xml.compile(PREMIS, cache_dir=tmp_path)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    cached = xsd2xml.compile(PREMIS, cache_dir=tmp_path)
+    assert len(calls) == 1
+
+    set_seed(1)
+    expected = serialize_tree(compiled.generate("premis"))
+    set_seed(1)
+    actual = serialize_tree(cached.generate("premis"))
+    assert actual == expected
+
+
+def test_changed_schema_invalidates_cache(tmp_path: Path):
+    xsd_path = tmp_path / "premis.xsd"
+    cache_dir = tmp_path / "cache"
+    xsd = Path(PREMIS).read_text()
+
+    _ = xsd_path.write_text(xsd)
+    _ = xsd2xml.compile(xsd_path, cache_dir=cache_dir)
+
+    _ = xsd_path.write_text(xsd.replace('name="agent"', 'name="renamedAgent"'))
+    schema = xsd2xml.compile(xsd_path, cache_dir=cache_dir)
+
+    assert len(list(cache_dir.iterdir())) == 2
+    _ = schema.generate("renamedAgent")
+
+
+class _Corrupt:
+    """Unpickles into a call of CompiledSchema with the wrong arguments"""
+
+    def __reduce__(self):
+        return (xsd2xml.CompiledSchema, ("truncated",))
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [b"", b"\x80\x05\x95", b"not a pickle", pickle.dumps(_Corrupt()), pickle.dumps(1)],
+    ids=["empty", "truncated", "garbage", "type error", "not a schema"],
+)
+def test_corrupt_entry_is_recompiled(tmp_path: Path, entry: bytes):
+    expected = xsd2xml.compile(PREMIS, cache_dir=tmp_path)
+    [path] = tmp_path.iterdir()
+    _ = path.write_bytes(entry)
+
+    assert xsd2xml.compile(PREMIS, cache_dir=tmp_path) == expected
+    assert pickle.loads(path.read_bytes()) == expected
@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import pytest
+
+import xsd2xml
+from xsd2xml.cli import main, shard_range
+
+PREMIS = "tests/assets/premis.xsd.xml"
+
+LIST_XSD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:simpleType name="numbers">
+        <xs:list itemType="xs:integer"/>
+    </xs:simpleType>
+    <xs:element name="numbers" type="numbers"/>
+</xs:schema>
+"""
+
+
+def _run(*args: str) -> int:
+    return main(["--schema", PREMIS, "--element", "event", "--quiet", *args])
+
+
+def test_shards_form_the_whole_corpus(tmp_path: Path):
+    assert _run("--count", "10", "--seed", "3", "--out-dir", str(tmp_path / "all")) == 0
+    out_dir = str(tmp_path / "shards")
+    for shard in ("1/3", "2/3", "3/3"):
+        assert _run("--count", "10", "--seed", "3", "--shard", shard, "--out-dir", out_dir) == 0
+
+    corpus = sorted((tmp_path / "all").iterdir())
+    assert [path.name for path in corpus] == [f"event-{i}.xml" for i in range(10)]
+    for path in corpus:
+        assert (tmp_path / "shards" / path.name).read_bytes() == path.read_bytes()
+
+
+def test_jobs_do_not_change_the_documents(tmp_path: Path):
+    args = ("--count", "6", "--seed", "1", "--out-dir")
+    assert _run(*args, str(tmp_path / "one")) == 0
+    assert _run("--jobs", "2", *args, str(tmp_path / "two")) == 0
+
+    for path in (tmp_path / "one").iterdir():
+        assert (tmp_path / "two" / path.name).read_bytes() == path.read_bytes()
+
+
+def test_stream_does_not_change_the_documents(tmp_path: Path):
+    args = ("--count", "6", "--seed", "1", "--out-dir")
+    assert _run(*args, str(tmp_path / "specialized")) == 0
+    assert _run("--stream", *args, str(tmp_path / "streamed")) == 0
+
+    for path in (tmp_path / "specialized").iterdir():
+        assert (tmp_path / "streamed" / path.name).read_bytes() == path.read_bytes()
+
+
+def test_stdout(capsysbinary: pytest.CaptureFixture[bytes]):
+    assert _run("--count", "2", "--seed", "1") == 0
+
+    batch = xsd2xml.generate_many(PREMIS, "event", 2, seed=1, serialize=True)
+    expected = b"".join(document + b"\n" for document in batch)  # pyright: ignore[reportOperatorIssue]
+    assert capsysbinary.readouterr().out == expected
+
+
+def test_errors(capsys: pytest.CaptureFixture[str]):
+    assert main(["--schema", PREMIS, "--element", "missing"]) == 1
+    assert "no global element" in capsys.readouterr().err
+
+    with pytest.raises(SystemExit):
+        _ = _run("--count", "10", "--shard", "1/2")
+    with pytest.raises(SystemExit):
+        _ = _run("--shard", "3/2", "--seed", "1")
+
+
+def test_invalid_schemas(tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+    malformed = tmp_path / "malformed.xsd"
+    _ = malformed.write_bytes(b"<xs:schema")
+
+    assert main(["--schema", str(malformed), "--element", "a", "--quiet"]) == 1
+    assert f"cannot load {malformed}" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_unsupported_constructs(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], jobs: str
+):
+    schema = tmp_path / "list.xsd"
+    _ = schema.write_bytes(LIST_XSD)
+    args = ["--schema", str(schema), "--element", "numbers", "--quiet"]
+
+    assert main([*args, "--count", "4", "--seed", "1", "--jobs", jobs]) == 1
+    error = capsys.readouterr().err
+    assert "cannot generate numbers: the schema uses an unsupported construct" in error
+
+
+def test_shard_range():
+    shards = [shard_range(10, i, 3) for i in (1, 2, 3)]
+
+    assert [index for shard in shards for index in shard] == list(range(10))
+    assert shard_range(2, 1, 4) == range(0)
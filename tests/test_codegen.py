@@ -0,0 +1,140 @@
+from pathlib import Path
+import io
+import random
+import sys
+
+import pytest
+
+import xsd2xml
+from xsd2xml import BuiltIn, ValueProviders
+from xsd2xml.core import codegen
+from tests.test_streaming import IDREF_XSD
+from tests.utils import serialize_tree
+
+PREMIS = "tests/assets/premis.xsd.xml"
+PREMIS_ROOTS = ["premis", "object", "event", "agent", "rights"]
+
+
+def _tree(schema: xsd2xml.CompiledSchema, name: str, rng: random.Random) -> str:
+    return serialize_tree(schema.generate(name, rng))
+
+
+def _specialized_tree(
+    generator: codegen.SpecializedGenerator, rng: random.Random
+) -> str:
+    return serialize_tree(generator.generate(rng))
+
+
+@pytest.mark.parametrize("name", PREMIS_ROOTS)
+def test_same_trees_as_interpreter(name: str):
+    schema = xsd2xml.compile(PREMIS)
+    generator = schema.specialize(name)
+
+    for i in range(30):
+        expected = _tree(schema, name, random.Random(i))
+        assert _specialized_tree(generator, random.Random(i)) == expected
+
+
+def test_same_output_as_interpreter_when_writing():
+    schema = xsd2xml.compile(PREMIS)
+    generator = schema.specialize("premis")
+
+    for i in range(10):
+        expected, sink = io.BytesIO(), io.BytesIO()
+        schema.write("premis", expected, rng=random.Random(i))
+        generator.write(sink, rng=random.Random(i))
+        assert sink.getvalue() == expected.getvalue()
+
+
+def test_idrefs_are_back_patched_and_left_out():
+    for min_targets in (0, 1):
+        schema = xsd2xml.compile(IDREF_XSD % min_targets)
+        generator = schema.specialize("links")
+
+        for i in range(20):
+            expected = _tree(schema, "links", random.Random(i))
+            assert _specialized_tree(generator, random.Random(i)) == expected
+
+
+def test_providers():
+    providers = (
+        ValueProviders()
+        .for_type(BuiltIn.date_time, lambda rng: "2024-01-01T00:00:00")
+        .for_path("objectIdentifierType", lambda rng: "local")
+        .for_path("@version", lambda rng: "3.0")
+        .for_path("object/@xmlID", lambda rng: f"provided-{rng.random()}")
+        .for_path("objectIdentifierType/@authority", lambda rng: "registry")
+    )
+    schema = xsd2xml.compile(PREMIS, providers=providers)
+    generator = schema.specialize("premis")
+
+    for i in range(10):
+        expected = _tree(schema, "premis", random.Random(i))
+        assert _specialized_tree(generator, random.Random(i)) == expected
+        assert 'version="3.0"' in expected
+
+
+class _OtherRandom(random.Random):
+    def random(self) -> float:
+        return 1 - super().random()
+
+
+def test_falls_back_to_interpreter():
+    schema = xsd2xml.compile(PREMIS)
+    generator = schema.specialize("premis")
+    budget = xsd2xml.Budget(elements=20)
+
+    # Random generators other than `random.Random`, and budgets, are interpreted
+    expected = _tree(schema, "premis", _OtherRandom(1))
+    assert _specialized_tree(generator, _OtherRandom(1)) == expected
+    document = generator.generate(random.Random(1), budget)
+    expected = schema.generate("premis", random.Random(1), budget)
+    assert serialize_tree(document) == serialize_tree(expected)
+
+
+def _chain_xsd(depth: int) -> bytes:
+    elements = "".join(
+        f'<xs:element name="e{i}"><xs:complexType><xs:sequence>'
+        f'<xs:element ref="e{i + 1}"/></xs:sequence></xs:complexType></xs:element>'
+        for i in range(depth)
+    )
+    last = f'<xs:element name="e{depth}" type="xs:string"/>'
+    return (
+        b'<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">'
+        + (elements + last).encode()
+        + b"</xs:schema>"
+    )
+
+
+def test_deep_documents_fall_back_to_interpreter():
+    schema = xsd2xml.compile(_chain_xsd(sys.getrecursionlimit()))
+    generator = schema.specialize("e0")
+
+    rng, expected_rng = random.Random(1), random.Random(1)
+    document = generator.generate(rng)
+    expected = schema.generate("e0", expected_rng)
+
+    # Compared without serializing, which recurses
+    assert [(e.tag, e.text) for e in document.iter()] == [
+        (e.tag, e.text) for e in expected.iter()
+    ]
+    assert rng.getstate() == expected_rng.getstate()
+
+
+def test_cache_dir_keeps_an_importable_module(tmp_path: Path):
+    schema = xsd2xml.compile(PREMIS)
+
+    generator = schema.specialize("premis", cache_dir=tmp_path)
+    [path] = tmp_path.glob("xsd2xml_generated_*.py")
+    assert path.read_text() == generator.source
+
+    expected = _tree(schema, "premis", random.Random(3))
+    assert _specialized_tree(generator, random.Random(3)) == expected
+
+
+def test_generate_many_specialized():
+    kwargs = dict(seed=5, serialize=True)
+    expected = list(xsd2xml.generate_many(PREMIS, "premis", 20, **kwargs))
+    batch = xsd2xml.generate_many(PREMIS, "premis", 20, specialize=True, **kwargs)
+
+    assert list(batch) == expected
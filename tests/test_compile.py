@@ -0,0 +1,99 @@
+import io
+import pickle
+import random
+from pathlib import Path
+import xml.etree.ElementTree as ET
+
+from xmlschema import XMLSchema
+import pytest
+
+import xsd2xml
+from xsd2xml.core.etree import _ElementTree
+from xsd2xml.core.namespaces import xsd
+from tests.utils import serialize_tree, set_seed
+
+PREMIS = "tests/assets/premis.xsd.xml"
+premis_xsd = XMLSchema(PREMIS)
+
+
+def test_compiled_schema_valid(fuzzy_i: int):
+    schema = xsd2xml.compile(PREMIS)
+    for element_name in ("premis", "object", "event", "agent", "rights"):
+        tree = serialize_tree(schema.generate(element_name))
+        assert premis_xsd.is_valid(tree)
+
+
+def test_compiled_schema_matches_generate():
+    schema = xsd2xml.compile(PREMIS)
+
+    set_seed(3)
+    compiled = serialize_tree(schema.generate("premis"))
+    set_seed(3)
+    generated = serialize_tree(xsd2xml.generate(PREMIS, "premis"))
+
+    assert compiled == generated
+
+
+def test_compiled_schema_is_read_only():
+    providers = xsd2xml.ValueProviders().for_path("object/@xmlID", lambda rng: "a")
+    schema = xsd2xml.compile(PREMIS, providers=providers)
+
+    with pytest.raises(TypeError):
+        schema.elements["{http://www.loc.gov/premis/v3}premis"] = None  # pyright: ignore
+    # Registering more providers does not change the schema they were bound to
+    _ = providers.for_path("object/@xmlID", lambda rng: "b")
+    _ = providers.for_path("premis", lambda rng: "c")
+    object_ = schema.find_global_element("object")
+    assert object_.attribute_providers is not None
+    assert object_.attribute_providers["xmlID"](random.Random()) == "a"
+
+    unpickled = pickle.loads(pickle.dumps(xsd2xml.compile(PREMIS)))
+    expected = xsd2xml.compile(PREMIS).generate("premis", random.Random(1))
+    document = unpickled.generate("premis", random.Random(1))
+    assert serialize_tree(document) == serialize_tree(expected)
+
+
+@pytest.mark.parametrize(
+    "load",
+    [
+        lambda: Path(PREMIS).read_bytes(),
+        lambda: io.BytesIO(Path(PREMIS).read_bytes()),
+        lambda: ET.parse(PREMIS),
+    ],
+    ids=["bytes", "file", "tree"],
+)
+def test_compile_from_source(load):
+    set_seed(5)
+    expected = serialize_tree(xsd2xml.generate(PREMIS, "premis"))
+    set_seed(5)
+    actual = serialize_tree(xsd2xml.generate(load(), "premis"))
+
+    assert actual == expected
+
+
+def test_abstract_type_substitutes():
+    schema = xsd2xml.compile(PREMIS)
+    premis_ns = "{http://www.loc.gov/premis/v3}"
+
+    substitutes = schema.complex_type_substitutes[premis_ns + "objectComplexType"]
+
+    assert [t.name for t in substitutes] == [
+        premis_ns + "file",
+        premis_ns + "representation",
+        premis_ns + "bitstream",
+        premis_ns + "intellectualEntity",
+    ]
+
+
+def test_schema_nodes_have_stable_identity():
+    xsd_root = _ElementTree.parse(PREMIS).getroot()
+    premis_ns = "{http://www.loc.gov/premis/v3}"
+
+    complex_type = xsd_root.lookup(xsd.complexType, premis_ns + "agentComplexType")
+
+    assert complex_type is not None
+    assert complex_type is xsd_root.lookup(xsd.complexType, premis_ns + "agentComplexType")
+    assert list(complex_type.children) == list(complex_type.children)
+    assert complex_type.main_child is next(complex_type.children)
+    assert complex_type.root is xsd_root
+
@@ -0,0 +1,144 @@
+import random
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import xsd2xml
+from xsd2xml import Budget, Coverage
+
+PREMIS = "tests/assets/premis.xsd.xml"
+
+XSD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:simpleType name="color">
+        <xs:restriction base="xs:string">
+            <xs:enumeration value="red"/>
+            <xs:enumeration value="blue"/>
+        </xs:restriction>
+    </xs:simpleType>
+    <xs:complexType name="shape">
+        <xs:sequence>
+            <xs:element name="color" type="color" minOccurs="0"/>
+        </xs:sequence>
+        <xs:attribute name="id" type="xs:ID"/>
+    </xs:complexType>
+    <xs:complexType name="circle">
+        <xs:complexContent>
+            <xs:extension base="shape">
+                <xs:sequence>
+                    <xs:element name="radius" type="xs:decimal"/>
+                </xs:sequence>
+            </xs:extension>
+        </xs:complexContent>
+    </xs:complexType>
+    <xs:element name="drawing">
+        <xs:complexType>
+            <xs:choice>
+                <xs:element name="shape" type="shape"/>
+                <xs:element name="text" type="xs:string"/>
+            </xs:choice>
+        </xs:complexType>
+    </xs:element>
+</xs:schema>
+"""
+
+
+def _nested_choices_xsd(depth: int) -> bytes:
+    """Choices whose deepest branches uniform sampling reaches with probability 2^-depth"""
+    types = "".join(
+        f"""
+        <xs:complexType name="level{k}">
+            <xs:choice>
+                <xs:element name="deeper{k}" type="level{k + 1}"/>
+                <xs:element name="leaf{k}" type="xs:string"/>
+            </xs:choice>
+        </xs:complexType>"""
+        for k in range(depth)
+    )
+    enumerations = "".join(f'<xs:enumeration value="v{i}"/>' for i in range(8))
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">{types}
+            <xs:simpleType name="level{depth}">
+                <xs:restriction base="xs:string">{enumerations}</xs:restriction>
+            </xs:simpleType>
+            <xs:element name="root" type="level0"/>
+        </xs:schema>
+        """.encode()
+
+
+def test_paths():
+    schema = xsd2xml.compile(XSD)
+    coverage = schema.coverage("drawing")
+
+    assert isinstance(coverage, Coverage)
+    assert sorted(coverage.paths) == [
+        "circle/radius",
+        "color=blue",
+        "color=red",
+        "drawing",
+        "drawing/choice[1]=shape",
+        "drawing/choice[1]=text",
+        "drawing/shape",
+        "drawing/text",
+        "shape/@id",
+        "shape/color",
+        "shape[xsi:type=circle]",
+    ]
+    assert coverage.count == 0
+    assert str(coverage) == "0/11 schema paths covered (0.0%)"
+
+
+def test_guided_generation_covers_every_path():
+    schema = xsd2xml.compile(XSD)
+    coverage = schema.coverage("drawing")
+
+    for i in range(10):
+        _ = schema.generate("drawing", random.Random(i), check=True, coverage=coverage)
+
+    assert coverage.uncovered() == []
+    assert coverage.complete
+
+
+def test_far_fewer_documents_than_uniform_sampling():
+    schema = xsd2xml.compile(_nested_choices_xsd(8))
+
+    guided = schema.coverage("root")
+    for i in range(20):
+        _ = schema.generate("root", random.Random(i), coverage=guided)
+    assert guided.complete
+
+    # Uniform sampling needs thousands of documents to reach the deepest values
+    uniform = schema.coverage("root", guided=False)
+    for i in range(200):
+        _ = schema.generate("root", random.Random(i), coverage=uniform)
+    assert not uniform.complete
+    assert "level8=v0" in uniform.uncovered()
+
+
+@pytest.mark.parametrize("name", ["premis", "object", "event", "agent", "rights"])
+def test_unguided_coverage_does_not_change_the_documents(name: str):
+    schema = xsd2xml.compile(PREMIS)
+    coverage = schema.coverage(name, guided=False)
+
+    for i in range(20):
+        budget = Budget(elements=50) if i % 2 else None
+        expected = schema.generate(name, random.Random(i), budget)
+        document = schema.generate(name, random.Random(i), budget, coverage=coverage)
+        assert ET.tostring(document.getroot()) == ET.tostring(expected.getroot())
+    assert coverage.count > 0
+
+
+def test_generate_many():
+    schema = xsd2xml.compile(PREMIS)
+    coverage = schema.coverage("premis")
+
+    batch = xsd2xml.generate_many(
+        schema, "premis", 10, seed=1, serialize=True, check=True, coverage=coverage
+    )
+    assert len(list(batch)) == 10
+    assert coverage.complete
+
+    with pytest.raises(ValueError):
+        _ = xsd2xml.generate_many(schema, "premis", 10, workers=2, coverage=coverage)
+    with pytest.raises(ValueError):
+        _ = batch.document(0)
@@ -0,0 +1,236 @@
+from pathlib import Path
+import io
+import random
+import threading
+import xml.etree.ElementTree as ET
+
+from xmlschema import XMLSchema
+import pytest
+
+import xsd2xml
+from xsd2xml import SchemaRegistry
+from tests.utils import serialize_tree
+
+MAIN = """<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns="urn:main" xmlns:other="urn:other" targetNamespace="urn:main"
+    elementFormDefault="qualified">
+  <xs:import namespace="urn:other" schemaLocation="other/other.xsd"/>
+  <xs:import namespace="http://www.w3.org/XML/1998/namespace"
+      schemaLocation="http://www.w3.org/2001/xml.xsd"/>
+  <xs:include schemaLocation="part.xsd"/>
+  <xs:include schemaLocation="chameleon.xsd"/>
+  <xs:element name="root">
+    <xs:complexType>
+      <xs:sequence>
+        <xs:element ref="other:note" maxOccurs="3"/>
+        <xs:element name="part" type="partType"/>
+        <xs:element name="color" type="colorType"/>
+      </xs:sequence>
+      <xs:attributeGroup ref="other:common"/>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>
+"""
+
+PART = """<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns="urn:main" targetNamespace="urn:main" elementFormDefault="qualified">
+  <xs:complexType name="partType">
+    <xs:sequence>
+      <xs:element name="size" type="xs:positiveInteger"/>
+    </xs:sequence>
+  </xs:complexType>
+</xs:schema>
+"""
+
+CHAMELEON = """<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:simpleType name="colorType">
+    <xs:restriction base="xs:string">
+      <xs:enumeration value="red"/>
+      <xs:enumeration value="blue"/>
+    </xs:restriction>
+  </xs:simpleType>
+</xs:schema>
+"""
+
+OTHER = """<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns="urn:other" targetNamespace="urn:other" elementFormDefault="qualified">
+  <xs:import namespace="http://www.w3.org/XML/1998/namespace"
+      schemaLocation="http://www.w3.org/2001/xml.xsd"/>
+  <xs:element name="note" type="xs:string"/>
+  <xs:attributeGroup name="common">
+    <xs:attribute name="id" type="xs:ID" use="required"/>
+    <xs:attribute ref="xml:lang" use="required"/>
+  </xs:attributeGroup>
+</xs:schema>
+"""
+
+XML = """<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    targetNamespace="http://www.w3.org/XML/1998/namespace">
+  <xs:attribute name="lang" type="xs:language"/>
+</xs:schema>
+"""
+
+BASE = """<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns="urn:main" targetNamespace="urn:main" elementFormDefault="qualified">
+  <xs:complexType name="itemType">
+    <xs:sequence>
+      <xs:element name="title" type="xs:string"/>
+    </xs:sequence>
+  </xs:complexType>
+  <xs:element name="item" type="itemType"/>
+</xs:schema>
+"""
+
+REDEFINE = """<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns="urn:main" targetNamespace="urn:main" elementFormDefault="qualified">
+  <xs:redefine schemaLocation="base.xsd">
+    <xs:complexType name="itemType">
+      <xs:complexContent>
+        <xs:extension base="itemType">
+          <xs:sequence>
+            <xs:element name="price" type="xs:decimal"/>
+          </xs:sequence>
+        </xs:extension>
+      </xs:complexContent>
+    </xs:complexType>
+  </xs:redefine>
+</xs:schema>
+"""
+
+
+def _write_schemas(directory: Path) -> dict[str, Path]:
+    files = {
+        "main.xsd": MAIN,
+        "part.xsd": PART,
+        "chameleon.xsd": CHAMELEON,
+        "other/other.xsd": OTHER,
+        "w3c/xml.xsd": XML,
+        "base.xsd": BASE,
+        "redefine.xsd": REDEFINE,
+    }
+    paths = {}
+    for name, content in files.items():
+        path = directory / name
+        path.parent.mkdir(exist_ok=True)
+        _ = path.write_text(content)
+        paths[name] = path
+    return paths
+
+
+def _validator(paths: dict[str, Path], name: str) -> XMLSchema:
+    # The XML namespace schema is mapped to the local copy so that nothing is fetched
+    return XMLSchema(
+        str(paths[name]),
+        locations=[("http://www.w3.org/XML/1998/namespace", str(paths["w3c/xml.xsd"]))],
+    )
+
+
+def test_include_and_import(tmp_path: Path):
+    paths = _write_schemas(tmp_path)
+    registry = SchemaRegistry(directories=[tmp_path / "w3c"])
+    schema = xsd2xml.compile(paths["main.xsd"], registry=registry)
+    validator = _validator(paths, "main.xsd")
+
+    for i in range(10):
+        document = schema.generate("{urn:main}root", random.Random(i))
+        assert validator.is_valid(serialize_tree(document))
+
+        root = document.getroot()
+        assert root.get("{http://www.w3.org/XML/1998/namespace}lang") is not None
+        assert root.find("{urn:main}color").text in ("red", "blue")
+        assert root.find("{urn:other}note") is not None
+
+
+def test_written_document_uses_the_xml_prefix(tmp_path: Path):
+    paths = _write_schemas(tmp_path)
+    catalog = {"http://www.w3.org/2001/xml.xsd": paths["w3c/xml.xsd"]}
+    registry = SchemaRegistry(catalog=catalog)
+    schema = xsd2xml.compile(paths["main.xsd"], registry=registry)
+
+    sink = io.BytesIO()
+    schema.write("{urn:main}root", sink, indent=None, rng=random.Random(1))
+    output = sink.getvalue()
+
+    assert b' xml:lang="' in output
+    assert b"XML/1998/namespace" not in output
+    assert _validator(paths, "main.xsd").is_valid(output)
+
+
+def test_redefine_extends_the_original_type(tmp_path: Path):
+    paths = _write_schemas(tmp_path)
+    schema = xsd2xml.compile(paths["redefine.xsd"])
+    validator = _validator(paths, "redefine.xsd")
+
+    for i in range(5):
+        document = schema.generate("{urn:main}item", random.Random(i))
+        assert validator.is_valid(serialize_tree(document))
+        assert [child.tag for child in document.getroot()] == [
+            "{urn:main}title",
+            "{urn:main}price",
+        ]
+
+
+def test_unresolved_import_is_not_fetched(tmp_path: Path):
+    paths = _write_schemas(tmp_path)
+    schema = xsd2xml.compile(paths["main.xsd"])
+
+    # Without a local copy of xml.xsd, the components that do not use it still work
+    document = schema.generate("{urn:other}note", random.Random(1))
+    assert document.getroot().tag == "{urn:other}note"
+
+
+def test_registry_parses_each_file_once(tmp_path: Path):
+    paths = _write_schemas(tmp_path)
+    registry = SchemaRegistry(directories=[tmp_path / "w3c"])
+
+    main = registry.load(paths["main.xsd"])
+    other = registry.load(paths["other/other.xsd"])
+
+    assert other in main.imports
+    assert registry.load(paths["main.xsd"]) is main
+    xml_path = paths["w3c/xml.xsd"].resolve()
+    [xml_from_main] = [d for d in main.closure() if d.location == xml_path]
+    assert other.imports == [xml_from_main]
+
+
+def test_failed_parse_is_retried(tmp_path: Path):
+    paths = _write_schemas(tmp_path)
+    registry = SchemaRegistry(directories=[tmp_path / "w3c"])
+    _ = paths["part.xsd"].write_text(PART[: len(PART) // 2])
+
+    with pytest.raises(ET.ParseError):
+        _ = registry.load(paths["main.xsd"])
+    _ = paths["part.xsd"].write_text(PART)
+    main = registry.load(paths["main.xsd"])
+
+    assert paths["part.xsd"].resolve() in [d.location for d in main.closure()]
+    # The files of a level are parsed by threads that stop once the level is loaded
+    assert not any(t.name.startswith("xsd2xml-registry") for t in threading.enumerate())
+
+
+def test_cache_key_covers_imported_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    paths = _write_schemas(tmp_path)
+    cache_dir = tmp_path / "cache"
+
+    schema = xsd2xml.compile(paths["main.xsd"], cache_dir=cache_dir)
+    assert "{urn:main}partType" in schema.complex_types
+
+    # A cache hit parses none of the documents
+    with monkeypatch.context() as patch:
+        patch.setattr(SchemaRegistry, "load", lambda *_: pytest.fail("parsed on a hit"))
+        assert xsd2xml.compile(paths["main.xsd"], cache_dir=cache_dir) == schema
+
+    _ = paths["part.xsd"].write_text(PART.replace("partType", "pieceType"))
+    schema = xsd2xml.compile(paths["main.xsd"], cache_dir=cache_dir)
+
+    assert "{urn:main}pieceType" in schema.complex_types
+    assert len(list(cache_dir.glob("*.pickle"))) == 2
@@ -0,0 +1,38 @@
+import random
+
+import xsd2xml
+from xsd2xml.core.profile import Phase
+from tests.utils import serialize_tree
+
+PREMIS = "tests/assets/premis.xsd.xml"
+
+
+def test_profile_matches_generate():
+    schema = xsd2xml.compile(PREMIS)
+    premis_ns = "{http://www.loc.gov/premis/v3}"
+
+    document, profile = schema.profile("premis", random.Random(4))
+
+    assert serialize_tree(document) == serialize_tree(
+        schema.generate("premis", random.Random(4))
+    )
+    assert profile.components[("element", premis_ns + "premis")].calls == 1
+    elements = sum(
+        stats.calls for (kind, _), stats in profile.components.items() if kind == "element"
+    )
+    assert elements == sum(1 for _ in document.iter())
+    assert {Phase.content, Phase.reference_lookup, Phase.manifesting} <= set(profile.phases)
+
+
+def test_profile_folded_stacks():
+    schema = xsd2xml.compile(PREMIS)
+
+    _, profile = schema.profile("object", random.Random(2), serialize=True)
+
+    lines = profile.folded().splitlines()
+    assert "serialization" in {line.split(" ")[0] for line in lines}
+    for line in lines:
+        stack, microseconds = line.rsplit(" ", 1)
+        assert int(microseconds) >= 0
+        assert stack.split(";")[0] in {"object", *(phase.name for phase in Phase)}
+
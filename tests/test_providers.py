@@ -0,0 +1,112 @@
+import random
+
+from xmlschema import XMLSchema
+import pytest
+
+import xsd2xml
+from tests.utils import serialize_tree
+
+PREMIS = "tests/assets/premis.xsd.xml"
+premis_xsd = XMLSchema(PREMIS)
+
+
+def test_value_providers():
+    providers = (
+        xsd2xml.ValueProviders()
+        .for_type(xsd2xml.BuiltIn.nonnegativeinteger, lambda rng: "7")
+        .for_type("version3", lambda rng: "3.0")
+        .for_path("objectIdentifierType", lambda rng: "local")
+        .for_path("objectIdentifierType/@authority", lambda rng: "registry")
+    )
+    schema = xsd2xml.compile(PREMIS, providers=providers)
+    premis_ns = "{http://www.loc.gov/premis/v3}"
+
+    document = schema.generate("premis", random.Random(0))
+
+    assert premis_xsd.is_valid(serialize_tree(document))
+    assert document.getroot().get("version") == "3.0"
+    for identifier_type in document.iter(premis_ns + "objectIdentifierType"):
+        assert identifier_type.text == "local"
+        assert identifier_type.get("authority", "registry") == "registry"
+    sequences = list(document.iter(premis_ns + "relatedObjectSequence"))
+    assert sequences
+    assert all(sequence.text == "7" for sequence in sequences)
+
+
+def test_value_providers_for_any_attribute_path():
+    schema = xsd2xml.compile(
+        PREMIS, providers=xsd2xml.ValueProviders().for_path("@version", lambda rng: "3.0")
+    )
+
+    document = schema.generate("object", random.Random(5))
+
+    for element in document.iter():
+        assert element.get("version", "3.0") == "3.0"
+
+
+class _Counter:
+    """Provides distinct IDs"""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, rng: random.Random) -> str:
+        self.count += 1
+        return f"provided-{self.count}"
+
+
+@pytest.mark.parametrize("path", ["object/@xmlID", "@xmlID"])
+def test_provided_ids_are_referred_to(path: str):
+    schema = xsd2xml.compile(
+        PREMIS, providers=xsd2xml.ValueProviders().for_path(path, _Counter())
+    )
+    premis_ns = "{http://www.loc.gov/premis/v3}"
+
+    for i in range(40):
+        document = schema.generate("premis", random.Random(i))
+        assert premis_xsd.is_valid(serialize_tree(document))
+        for element in document.iter(premis_ns + "object"):
+            assert element.get("xmlID", "provided-").startswith("provided-")
+
+
+IDS_XSD = """<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:simpleType name="key">
+        <xs:restriction base="xs:ID"/>
+    </xs:simpleType>
+    <xs:element name="items">
+        <xs:complexType>
+            <xs:sequence>
+                <xs:element name="ref" type="xs:IDREF" minOccurs="0"/>
+                <xs:element name="id" type="{type}" maxOccurs="3"/>
+                <xs:element name="ref" type="xs:IDREF" maxOccurs="3"/>
+            </xs:sequence>
+        </xs:complexType>
+    </xs:element>
+</xs:schema>
+"""
+
+
+@pytest.mark.parametrize(
+    ("type", "providers"),
+    [
+        ("xs:ID", xsd2xml.ValueProviders().for_path("id", _Counter())),
+        ("key", xsd2xml.ValueProviders().for_type("key", _Counter())),
+    ],
+    ids=["element", "simple type"],
+)
+def test_provided_element_ids_are_referred_to(
+    type: str, providers: xsd2xml.ValueProviders
+):
+    schema = xsd2xml.compile(IDS_XSD.format(type=type).encode(), providers=providers)
+    specialized = schema.specialize("items")
+
+    for i in range(20):
+        for document in (
+            schema.generate("items", random.Random(i)),
+            specialized.generate(random.Random(i)),
+        ):
+            assert schema.validate(document) == []
+            refs = [ref.text or "" for ref in document.iter("ref")]
+            assert refs and all(ref.startswith("provided-") for ref in refs)
+
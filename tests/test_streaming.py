@@ -0,0 +1,145 @@
+import io
+import itertools
+import random
+import sys
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from xmlschema import XMLSchema
+
+import xsd2xml
+from xsd2xml.core.events import Start
+from tests.utils import serialize_tree, set_seed
+
+PREMIS = "tests/assets/premis.xsd.xml"
+premis_xsd = XMLSchema(PREMIS)
+
+XSD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:element name="items">
+        <xs:complexType>
+            <xs:sequence>
+                <xs:element name="item" type="xs:string" minOccurs="%d" maxOccurs="%d"/>
+            </xs:sequence>
+        </xs:complexType>
+    </xs:element>
+</xs:schema>
+"""
+
+
+class _CountingSink:
+    def __init__(self) -> None:
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        return len(data)
+
+
+def test_siblings_are_generated_lazily():
+    schema = xsd2xml.compile(XSD % (10**12, 10**12))
+
+    root = schema.find_global_element("items")
+    events = list(itertools.islice(schema.generate_events(root), 5))
+
+    assert [e.tag for e in events if isinstance(e, Start)] == ["items", "item", "item"]
+
+
+def test_write_memory_does_not_grow_with_siblings():
+    small = xsd2xml.compile(XSD % (1_000, 1_000))
+    large = xsd2xml.compile(XSD % (100_000, 100_000))
+
+    def peak_memory(schema: xsd2xml.CompiledSchema) -> int:
+        sink = _CountingSink()
+        tracemalloc.start()
+        schema.write("items", sink)  # pyright: ignore[reportArgumentType]
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert sink.size > 0
+        return peak
+
+    # The first write imports the writer, which should not be measured
+    small.write("items", _CountingSink())  # pyright: ignore[reportArgumentType]
+    assert peak_memory(large) < 2 * peak_memory(small)
+
+
+IDREF_XSD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:element name="links">
+        <xs:complexType>
+            <xs:sequence>
+                <xs:element name="link" type="xs:IDREF" minOccurs="2" maxOccurs="2"/>
+                <xs:element name="target" minOccurs="%d" maxOccurs="1">
+                    <xs:complexType>
+                        <xs:attribute name="id" type="xs:ID" use="required"/>
+                    </xs:complexType>
+                </xs:element>
+            </xs:sequence>
+        </xs:complexType>
+    </xs:element>
+</xs:schema>
+"""
+
+
+def test_idrefs_before_first_id_are_back_patched():
+    schema = xsd2xml.compile(IDREF_XSD % 1)
+
+    root = schema.generate("links").getroot()
+
+    target_id = root.find("target").get("id")  # pyright: ignore[reportOptionalMemberAccess]
+    assert [link.text for link in root.findall("link")] == [target_id, target_id]
+
+
+def test_idrefs_without_id_are_left_out():
+    schema = xsd2xml.compile(IDREF_XSD % 0)
+
+    for _ in range(10):
+        root = schema.generate("links").getroot()
+        if root.find("target") is None:
+            assert root.findall("link") == []
+
+
+RECURSIVE_XSD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:element name="node">
+        <xs:complexType>
+            <xs:sequence>
+                <xs:element ref="node" minOccurs="0"/>
+            </xs:sequence>
+        </xs:complexType>
+    </xs:element>
+</xs:schema>
+"""
+
+
+class _DeepestRandom(random.Random):
+    def randint(self, a: int, b: int) -> int:
+        return b
+
+
+def test_deep_nesting_does_not_recurse():
+    schema = xsd2xml.compile(RECURSIVE_XSD)
+    budget = xsd2xml.Budget(max_depth=3 * sys.getrecursionlimit())
+
+    root = schema.find_global_element("node")
+    events = schema.generate_events(root, _DeepestRandom(1), budget)
+
+    depth = max(itertools.accumulate(1 if isinstance(e, Start) else -1 for e in events))
+    assert depth == budget.max_depth
+
+
+def test_write_matches_generate(fuzzy_i: int):
+    schema = xsd2xml.compile(PREMIS)
+
+    set_seed(fuzzy_i)
+    generated = serialize_tree(schema.generate("premis"))
+    set_seed(fuzzy_i)
+    sink = io.BytesIO()
+    schema.write("premis", sink)
+    written = sink.getvalue().decode()
+
+    assert premis_xsd.is_valid(written)
+    assert ET.canonicalize(written, rewrite_prefixes=True) == ET.canonicalize(
+        generated, rewrite_prefixes=True
+    )
+
@@ -0,0 +1,256 @@
+import copy
+import random
+import sys
+import xml.etree.ElementTree as ET
+
+from xmlschema import XMLSchema
+import pytest
+
+import xsd2xml
+from xsd2xml import BuiltIn, InvalidDocumentError, ValueProviders
+from tests.utils import serialize_tree
+
+PREMIS = "tests/assets/premis.xsd.xml"
+PREMIS_ROOTS = ["premis", "object", "event", "agent", "rights"]
+
+XSD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:simpleType name="color">
+        <xs:restriction base="xs:string">
+            <xs:enumeration value="red"/>
+            <xs:enumeration value="blue"/>
+        </xs:restriction>
+    </xs:simpleType>
+    <xs:simpleType name="code">
+        <xs:restriction base="xs:string">
+            <xs:pattern value="[A-Z]{3}"/>
+        </xs:restriction>
+    </xs:simpleType>
+    <xs:simpleType name="percentage">
+        <xs:restriction base="xs:integer">
+            <xs:minInclusive value="0"/>
+            <xs:maxInclusive value="100"/>
+        </xs:restriction>
+    </xs:simpleType>
+    <xs:complexType name="shape">
+        <xs:sequence>
+            <xs:element name="color" type="color"/>
+        </xs:sequence>
+    </xs:complexType>
+    <xs:complexType name="circle">
+        <xs:complexContent>
+            <xs:extension base="shape">
+                <xs:sequence>
+                    <xs:element name="radius" type="xs:decimal"/>
+                </xs:sequence>
+            </xs:extension>
+        </xs:complexContent>
+    </xs:complexType>
+    <xs:element name="items">
+        <xs:complexType>
+            <xs:sequence>
+                <xs:element name="item" maxOccurs="unbounded">
+                    <xs:complexType>
+                        <xs:sequence>
+                            <xs:element name="count" type="xs:unsignedByte"/>
+                            <xs:choice minOccurs="0">
+                                <xs:element name="note" type="xs:string"/>
+                                <xs:element name="ref" type="xs:IDREF"/>
+                            </xs:choice>
+                        </xs:sequence>
+                        <xs:attribute name="id" type="xs:ID" use="required"/>
+                        <xs:attribute name="day" type="xs:date"/>
+                    </xs:complexType>
+                </xs:element>
+                <xs:element name="shape" type="shape" minOccurs="0"/>
+            </xs:sequence>
+        </xs:complexType>
+    </xs:element>
+    <xs:element name="code" type="code"/>
+    <xs:element name="percentage" type="percentage"/>
+</xs:schema>
+"""
+
+
+def _items(*items: str, shape: str = "") -> ET.Element:
+    return ET.fromstring(f"<items>{''.join(items)}{shape}</items>")
+
+
+def _messages(schema: xsd2xml.CompiledSchema, document: ET.Element) -> list[str]:
+    return [str(violation) for violation in schema.validate(document)]
+
+
+@pytest.mark.parametrize("name", PREMIS_ROOTS)
+def test_generated_documents_are_valid(name: str):
+    schema = xsd2xml.compile(PREMIS)
+
+    for i in range(20):
+        document = schema.generate(name, random.Random(i), check=True)
+        assert schema.validate(document) == []
+
+
+def test_valid_document():
+    schema = xsd2xml.compile(XSD)
+    document = _items(
+        '<item id="a" day="2024-02-29"><count> 7 </count><ref>b</ref></item>',
+        '<item id="b"><count>255</count><note>x</note></item>',
+        shape='<shape xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+        ' xsi:type="circle"><color>red</color><radius>1.5</radius></shape>',
+    )
+
+    assert _messages(schema, document) == []
+
+
+@pytest.mark.parametrize(
+    ("items", "message"),
+    [
+        ('<item id="a"/>', "/items/item[1]: required child elements are missing"),
+        (
+            '<item id="a"><count>1</count><count>2</count></item>',
+            "/items/item[1]: element count is not expected here",
+        ),
+        (
+            '<item id="a"><count>256</count></item>',
+            "/items/item[1]/count[1]: text '256' is out of range for unsignedbyte",
+        ),
+        (
+            '<item><count>1</count></item>',
+            "/items/item[1]: missing required attribute id",
+        ),
+        (
+            '<item id="a" size="1"><count>1</count></item>',
+            "/items/item[1]: attribute size is not allowed",
+        ),
+        (
+            '<item id="a" day="2024-13-01"><count>1</count></item>',
+            "/items/item[1]: attribute day '2024-13-01' is not a valid date",
+        ),
+        (
+            '<item id="a"><count>1</count></item><item id="a"><count>1</count></item>',
+            "/items/item[2]: attribute id 'a' is a duplicate ID",
+        ),
+        (
+            '<item id="a"><count>1</count><ref>b</ref></item>',
+            "/items/item[1]/ref[1]: IDREF 'b' does not refer to an ID",
+        ),
+        (
+            '<item id="a">text<count>1</count></item>',
+            "/items/item[1]: text is not allowed in element-only content",
+        ),
+    ],
+)
+def test_violations(items: str, message: str):
+    schema = xsd2xml.compile(XSD)
+
+    assert _messages(schema, _items(items)) == [message]
+
+
+def test_derived_types():
+    schema = xsd2xml.compile(XSD)
+    item = '<item id="a"><count>1</count></item>'
+    xsi = 'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+
+    # Without xsi:type the extension is not expected
+    shape = "<shape><color>red</color><radius>1</radius></shape>"
+    assert _messages(schema, _items(item, shape=shape)) == [
+        "/items/shape[1]: element radius is not expected here"
+    ]
+    shape = f'<shape {xsi} xsi:type="square"><color>red</color></shape>'
+    assert _messages(schema, _items(item, shape=shape)) == [
+        "/items/shape[1]: xsi:type square cannot replace shape"
+    ]
+    shape = "<shape><color>green</color></shape>"
+    assert _messages(schema, _items(item, shape=shape)) == [
+        "/items/shape[1]/color[1]: text 'green' is not one of the enumerated values"
+    ]
+
+
+def test_facets():
+    schema = xsd2xml.compile(XSD)
+
+    assert _messages(schema, ET.fromstring("<code>ABC</code>")) == []
+    assert _messages(schema, ET.fromstring("<code>AB1</code>")) == [
+        "/code: text 'AB1' does not match the pattern"
+    ]
+    assert _messages(schema, ET.fromstring("<percentage>100</percentage>")) == []
+    assert _messages(schema, ET.fromstring("<percentage>101</percentage>")) == [
+        "/percentage: text '101' violates maxInclusive 100"
+    ]
+
+
+def test_agrees_with_xmlschema_on_mutated_documents():
+    schema = xsd2xml.compile(PREMIS)
+    validator = XMLSchema(PREMIS)
+
+    for i in range(40):
+        rng = random.Random(i)
+        root = schema.generate(rng.choice(PREMIS_ROOTS), random.Random(i)).getroot()
+        parents = {child: parent for parent in root.iter() for child in parent}
+        element = rng.choice(list(root.iter()))
+        match i % 4:
+            case 0 if element in parents:
+                parents[element].remove(element)
+            case 1 if element in parents:
+                parent = parents[element]
+                parent.insert(list(parent).index(element), copy.deepcopy(element))
+            case 2:
+                element.set("unknown", "1")
+            case _:
+                element.text = "-1 x"
+
+        expected = validator.is_valid(serialize_tree(ET.ElementTree(root)))
+        assert (schema.validate(root) == []) == expected
+
+
+def test_events():
+    schema = xsd2xml.compile(PREMIS)
+    xsd_element = schema.find_global_element("premis")
+
+    assert schema.validate(schema.generate_events(xsd_element, random.Random(1))) == []
+
+
+def test_deep_documents_do_not_recurse():
+    schema = xsd2xml.compile(
+        b"""<?xml version="1.0" encoding="UTF-8"?>
+        <xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+            <xs:element name="node">
+                <xs:complexType>
+                    <xs:sequence>
+                        <xs:element ref="node" minOccurs="0"/>
+                    </xs:sequence>
+                </xs:complexType>
+            </xs:element>
+        </xs:schema>
+        """
+    )
+    root = node = ET.Element("node")
+    for _ in range(2 * sys.getrecursionlimit()):
+        node = ET.SubElement(node, "node")
+
+    assert schema.validate(root) == []
+
+
+def test_self_check_raises_on_invalid_documents():
+    providers = ValueProviders().for_type(BuiltIn.unsignedbyte, lambda rng: "256")
+    schema = xsd2xml.compile(XSD, providers=providers)
+
+    # The value of the provider is out of range for unsignedByte
+    with pytest.raises(InvalidDocumentError, match="is out of range for unsignedbyte"):
+        _ = schema.generate("items", random.Random(1), check=True)
+    with pytest.raises(InvalidDocumentError):
+        _ = list(xsd2xml.generate_many(schema, "items", 5, seed=1, check=True))
+    with pytest.raises(InvalidDocumentError):
+        batch = xsd2xml.generate_many(schema, "items", 5, seed=1, check=True, workers=2)
+        _ = list(batch)
+
+
+def test_self_check_keeps_the_documents():
+    kwargs = dict(seed=2, serialize=True)
+    expected = list(xsd2xml.generate_many(PREMIS, "premis", 10, **kwargs))
+
+    batch = xsd2xml.generate_many(PREMIS, "premis", 10, check=True, **kwargs)
+    assert list(batch) == expected
+    batch = xsd2xml.generate_many(
+        PREMIS, "premis", 10, check=True, specialize=True, **kwargs
+    )
+    assert list(batch) == expected
@@ -4,7 +4,7 @@ import random
 import re
 
 from xsd2xml.core.etree import _Element
-from xsd2xml.core import helpers, types
+from xsd2xml.core import helpers
 from xsd2xml.core.namespaces import xsd
 from xsd2xml.core import builtins, element
 from xsd2xml.core.utils import InvalidXSDError
@@ -51,7 +51,7 @@ def check_generated_tree_coverage(document: ET.ElementTree, xsd_schema: ET.Eleme
 
 def calculate_element_occurence_probability(xsd_element: _Element) -> dict[str, float]:
     xsd_element = helpers._try_resolve_reference(xsd_element)
-    type_definition = types._find_type_definition_for_element(xsd_element)
+    type_definition = _find_type_definition_for_element(xsd_element)
     element_name = xsd_element.get("name")
 
     if element_name is None:
@@ -61,6 +61,22 @@ def calculate_element_occurence_probability(xsd_element: _Element) -> dict[str,
         return {element_name: 1}
 
 
+def _find_type_definition_for_element(xsd_element: _Element) -> _Element | builtins.BuiltIn:
+    type_name = xsd_element.get("type")
+    if type_name is None:
+        return next(
+            el for el in xsd_element.children if el in (xsd.complexType, xsd.simpleType)
+        )
+    if type_name in builtins.BuiltIn:
+        return builtins.BuiltIn(type_name)
+
+    for tag in (xsd.simpleType, xsd.complexType):
+        type_definition = xsd_element.root.lookup(tag, type_name)
+        if type_definition is not None:
+            return type_definition
+    raise InvalidXSDError()
+
+
 def count_content_occurences(element: ET.Element) -> dict[str, float]:
     occurences = {}
 
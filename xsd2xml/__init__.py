@@ -1,3 +1,26 @@
-from xsd2xml.xsd2xml import generate
+from xsd2xml._version import __version__
+from xsd2xml.xsd2xml import agenerate, compile, generate, generate_many
+from xsd2xml.core.budget import Budget, Uniform, Zipf
+from xsd2xml.core.builtins import BuiltIn
+from xsd2xml.core.coverage import Coverage
+from xsd2xml.core.model import CompiledSchema
+from xsd2xml.core.providers import ValueProviders
+from xsd2xml.core.registry import SchemaRegistry
+from xsd2xml.core.utils import InvalidDocumentError
 
-__all__ = ["generate"]
+__all__ = [
+    "__version__",
+    "agenerate",
+    "compile",
+    "generate",
+    "generate_many",
+    "Budget",
+    "BuiltIn",
+    "CompiledSchema",
+    "Coverage",
+    "InvalidDocumentError",
+    "SchemaRegistry",
+    "ValueProviders",
+    "Uniform",
+    "Zipf",
+]
@@ -0,0 +1,170 @@
+"""
+The `xsd2xml` command: generate a corpus of documents from an XSD.
+
+    xsd2xml --schema premis.xsd --element premis --count 100000 --seed 1 \\
+        --jobs 8 --shard 2/4 --out-dir corpus
+
+The schema is compiled once per process. With `--shard i/n`, the documents are
+split into `n` contiguous slices and only the `i`th one is generated. Every
+document only depends on the seed and its index in the corpus, so shards
+generated on different machines are disjoint and together form the same
+corpus as a single run. Files are named after that index.
+
+Documents are generated by code specialized for the root element, which builds
+each document as a tree before serializing it. With `--stream`, the interpreter
+writes the elements while it generates them instead: it is slower, but the memory
+of a huge document is that of its serialized bytes rather than of its tree.
+"""
+
+from pathlib import Path
+from typing import BinaryIO, Sequence
+import argparse
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+from .core.batch import Batch
+from .core.utils import InvalidXSDError
+from .xsd2xml import compile
+
+# Seconds between two progress reports
+PROGRESS_INTERVAL = 1.0
+
+
+def _shard(value: str) -> tuple[int, int]:
+    try:
+        index, total = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/n, got {value!r}")
+    if not 1 <= index <= total:
+        raise argparse.ArgumentTypeError(f"expected 1 <= i <= n, got {value!r}")
+    return index, total
+
+
+def _positive(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive number, got {value!r}")
+    return number
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="xsd2xml", description="Generate random XML documents from an XSD."
+    )
+    parser.add_argument("--schema", required=True, type=Path, help="the XSD file")
+    parser.add_argument("--element", required=True, help="the root element")
+    parser.add_argument("--count", type=int, default=1, help="documents in the corpus")
+    parser.add_argument(
+        "--seed", type=int, help="seed of the corpus, required for reproducible shards"
+    )
+    parser.add_argument(
+        "--jobs", type=_positive, default=1, help="processes generating documents"
+    )
+    parser.add_argument(
+        "--shard",
+        type=_shard,
+        default=(1, 1),
+        metavar="i/n",
+        help="only generate the i-th of n slices of the corpus, counting from 1",
+    )
+    parser.add_argument(
+        "--out-dir",
+        type=Path,
+        help="write one file per document here instead of writing to stdout",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="write elements while they are generated instead of building each "
+        "document first, slower but lighter on memory for huge documents",
+    )
+    parser.add_argument(
+        "--quiet", action="store_true", help="do not report progress on stderr"
+    )
+    return parser
+
+
+def shard_range(count: int, index: int, total: int) -> range:
+    """The indices of the documents in shard `index` of `total`, counting from 1"""
+    return range(count * (index - 1) // total, count * index // total)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if args.count < 0:
+        parser.error("--count must not be negative")
+    if args.shard[1] > 1 and args.seed is None:
+        parser.error("--shard requires --seed, or the shards would not fit together")
+
+    try:
+        schema = compile(args.schema)
+    except (OSError, InvalidXSDError, ET.ParseError) as e:
+        reason = _reason(e)
+        print(f"xsd2xml: error: cannot load {args.schema}: {reason}", file=sys.stderr)
+        return 1
+    try:
+        _ = schema.find_global_element(args.element)
+    except ValueError:
+        print(f"xsd2xml: error: no global element {args.element!r}", file=sys.stderr)
+        return 1
+
+    indices = shard_range(args.count, *args.shard)
+    batch = Batch(
+        schema,
+        args.element,
+        len(indices),
+        seed=args.seed,
+        serialize=True,
+        workers=args.jobs,
+        specialize=not args.stream,
+        offset=indices.start,
+    )
+
+    if args.out_dir is not None:
+        args.out_dir.mkdir(parents=True, exist_ok=True)
+    width = len(str(max(args.count - 1, 0)))
+    local_name = args.element.rpartition("}")[2].rpartition(":")[2]
+
+    next_report = time.perf_counter() + PROGRESS_INTERVAL
+    try:
+        for index, document in zip(indices, batch):
+            assert isinstance(document, bytes)
+            if args.out_dir is None:
+                _write(sys.stdout.buffer, document)
+            else:
+                path = args.out_dir / f"{local_name}-{index:0{width}}.xml"
+                _ = path.write_bytes(document)
+            if not args.quiet and time.perf_counter() >= next_report:
+                next_report = time.perf_counter() + PROGRESS_INTERVAL
+                print(f"{batch.generated}/{batch.n}: {batch}", file=sys.stderr)
+        if args.out_dir is None:
+            sys.stdout.buffer.flush()
+    except (InvalidXSDError, NotImplementedError) as e:
+        reason = _reason(e)
+        message = f"xsd2xml: error: cannot generate {args.element}: {reason}"
+        print(message, file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # The consumer of stdout stopped reading, e.g. `xsd2xml ... | head`.
+        # Further writes, including the flush at exit, go nowhere.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+    if not args.quiet:
+        print(batch, file=sys.stderr)
+    return 0
+
+
+def _write(stream: BinaryIO, document: bytes) -> None:
+    """Write documents to a stream, one after the other, separated by a newline"""
+    _ = stream.write(document)
+    _ = stream.write(b"\n")
+
+
+def _reason(error: Exception) -> str:
+    if isinstance(error, NotImplementedError) and not str(error):
+        return "the schema uses an unsupported construct"
+    return str(error) or type(error).__name__
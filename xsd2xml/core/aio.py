@@ -0,0 +1,102 @@
+"""
+Generate documents for asyncio code without blocking its event loop.
+
+Documents are generated in an executor, a thread or worker processes, while
+the event loop keeps running other coroutines. At most `prefetch` documents
+are generated ahead of the consumer: a slow consumer never buffers more than
+that, and a fast one finds the next documents already generated. Documents
+are yielded in index order and are the documents of a `Batch` with the same seed.
+
+Closing the stream, by leaving an `async for` or cancelling the task that
+iterates it, cancels the documents that are not being generated yet.
+A document that is being generated in a thread still runs to its end.
+"""
+
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncGenerator, Callable, Iterator
+import asyncio
+import itertools
+
+from .batch import (
+    Document,
+    _generate_chunk,
+    _generate_document,
+    _initialize_worker,
+    document_random,
+)
+from .budget import Budget
+from .codegen import SpecializedGenerator
+from .model import CompiledSchema
+
+
+async def generate_documents(
+    schema: CompiledSchema,
+    element_name: str,
+    n: int | None,
+    seed: int,
+    serialize: bool = False,
+    budget: Budget | None = None,
+    specialize: bool = False,
+    workers: int | None = None,
+    prefetch: int = 8,
+    check: bool = False,
+) -> AsyncGenerator[Document, None]:
+    """
+    Yield `n` documents, or documents until the stream is closed when `n` is None.
+    With `workers`, they are generated by that many processes, otherwise by one thread.
+    """
+    if prefetch < 1:
+        raise ValueError("prefetch must be at least 1")
+    xsd_element = schema.find_global_element(element_name)
+    indices: Iterator[int] = itertools.count() if n is None else iter(range(n))
+
+    executor: Executor
+    submit: Callable[[int], Future[list[Document]]]
+    specialized: SpecializedGenerator | None = None
+    if workers is not None and workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_initialize_worker,
+            initargs=(schema, budget, specialize, check),
+        )
+
+        def submit_chunk(i: int) -> Future[list[Document]]:
+            return executor.submit(
+                _generate_chunk, element_name, i, i + 1, seed, serialize
+            )
+
+        submit = submit_chunk
+    else:
+        executor = ThreadPoolExecutor(1, thread_name_prefix="xsd2xml-agenerate")
+
+        def generate(i: int) -> list[Document]:
+            rng = document_random(seed, i)
+            return [
+                _generate_document(
+                    schema, xsd_element, rng, serialize, budget, specialized, check
+                )
+            ]
+
+        def submit_document(i: int) -> Future[list[Document]]:
+            return executor.submit(generate, i)
+
+        submit = submit_document
+
+    pending: deque[Future[list[Document]]] = deque()
+    try:
+        if specialize and not isinstance(executor, ProcessPoolExecutor):
+            specialized = await asyncio.wrap_future(
+                executor.submit(schema.specialize, element_name)
+            )
+
+        pending.extend(submit(i) for i in itertools.islice(indices, prefetch))
+        while pending:
+            documents = await asyncio.wrap_future(pending.popleft())
+            pending.extend(submit(i) for i in itertools.islice(indices, 1))
+            for document in documents:
+                yield document
+    finally:
+        for future in pending:
+            _ = future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
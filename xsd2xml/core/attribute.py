@@ -1,10 +1,11 @@
-import random
-
 from . import simple_type, helpers
 
 from .etree import _Element
 from .utils import InvalidXSDError
 from .namespaces import xsd
+from .context import GenerationContext
+from .profile import Phase
+from .model import AnyAttribute, Attribute, AttributeUse, Provider, SimpleType
 
 from xsd2xml.core.builtins import BuiltIn, random_built_in_type
 
@@ -23,26 +24,60 @@ def _recursively_collect_attributes(
     return attributes
 
 
-def _should_skip_attribute(xsd_attribute: _Element) -> bool:
-    is_attribute_required = xsd_attribute.get("use") == "required"
-    do_not_create = random.random() > 0.5
-    return not is_attribute_required and do_not_create
-
-
-def _generate_attributes(element_with_xsd_attributes: _Element) -> dict[str, str]:
+def _should_skip_attribute(
+    context: GenerationContext, xsd_attribute: Attribute
+) -> bool:
+    budget = context.budget
+    if budget is None:
+        do_not_create = context.random.random() > 0.5
+    elif budget.exhausted:
+        do_not_create = True
+    else:
+        probability = budget.optional_attribute_probability
+        do_not_create = context.random.random() > probability
+    coverage = context.coverage
+    if do_not_create and coverage is not None and not (budget and budget.exhausted):
+        # Generate an optional attribute while it leads to uncovered paths
+        do_not_create = not coverage.wants(xsd_attribute)
+    return not xsd_attribute.required and do_not_create
+
+
+def _generate_attributes(
+    context: GenerationContext,
+    xsd_attributes: tuple[Attribute, ...],
+    providers: dict[str, Provider] | None = None,
+) -> dict[str, str]:
+    """
+    `providers` are the attribute providers of the element being generated,
+    which take precedence over the providers of the attributes themselves.
+    """
+    if context.profile is not None and xsd_attributes:
+        context.profile.enter(Phase.value_generation)
+        attrib = _generate_attribute_values(context, xsd_attributes, providers)
+        context.profile.leave()
+        return attrib
+    return _generate_attribute_values(context, xsd_attributes, providers)
+
+
+def _generate_attribute_values(
+    context: GenerationContext,
+    xsd_attributes: tuple[Attribute, ...],
+    providers: dict[str, Provider] | None,
+) -> dict[str, str]:
     attrib = {}
-    xsd_attributes = _recursively_collect_attributes(element_with_xsd_attributes)
     for xsd_attribute in xsd_attributes:
-        if _should_skip_attribute(xsd_attribute):
+        if _should_skip_attribute(context, xsd_attribute):
             continue
 
-        if xsd_attribute.tag == xsd.attribute:
-            attribute_name = helpers._get_name_attribute(xsd_attribute)
-            attrib[attribute_name] = _generate_attribute_value(xsd_attribute)
-        elif xsd_attribute.tag == xsd.anyAttribute:
-            attrib |= _generate_any_attribute()
-        else:
-            raise InvalidXSDError()
+        match xsd_attribute:
+            case AttributeUse():
+                attrib[xsd_attribute.name] = _generate_attribute_value(
+                    context, xsd_attribute, providers
+                )
+                if context.coverage is not None:
+                    context.coverage.cover(xsd_attribute)
+            case AnyAttribute():
+                attrib |= _generate_any_attribute()
 
     return attrib
 
@@ -51,37 +86,26 @@ def _generate_any_attribute() -> dict[str, str]:
     raise NotImplementedError()
 
 
-def _generate_attribute_value(xsd_attribute: _Element) -> str:
-    type = xsd_attribute.get("type")
-    if type in BuiltIn:
-        return random_built_in_type(BuiltIn(type))
-
-    is_type_user_defined = type is not None and type not in BuiltIn
-    if is_type_user_defined:
-        xsd_simple_type = xsd_attribute.root.find(f"{xsd.simpleType}[@name='{type}']")
-        if xsd_simple_type is None:
-            raise InvalidXSDError()
-        ph_element = simple_type.generate_simple_type(xsd_simple_type)
-        if ph_element.text is None:
-            raise AssertionError()
-        return ph_element.text
-
-    is_type_anonymous = type is None
-    if is_type_anonymous:
-        xsd_simple_type = xsd_attribute.find(xsd.simpleType)
-        if xsd_simple_type is None:
-            raise InvalidXSDError()
-        ph_element = simple_type.generate_simple_type(xsd_simple_type)
-        if ph_element.text is None:
-            raise AssertionError()
-        return ph_element.text
-
-    raise InvalidXSDError()
-
-
-def _is_xsd_attribute(element: _Element) -> bool:
-    return element.tag in (xsd.attribute, xsd.attributeGroup, xsd.anyAttribute)
-
-
-def _is_not_xsd_attribute(element: _Element) -> bool:
-    return not _is_xsd_attribute(element)
+def _generate_attribute_value(
+    context: GenerationContext,
+    xsd_attribute: AttributeUse,
+    providers: dict[str, Provider] | None = None,
+) -> str:
+    provider = xsd_attribute.provider
+    if providers is not None:
+        provider = providers.get(xsd_attribute.name, provider)
+    if provider is not None:
+        value = provider(context.random)
+        # Provided IDs are referred to like generated ones
+        if simple_type.is_id_type(context.schema, xsd_attribute.type):
+            return context.ids.register(value)
+        return value
+
+    xsd_type = context.schema.find_type(xsd_attribute.type)
+    if isinstance(xsd_type, BuiltIn):
+        return random_built_in_type(xsd_type, context.values, context.ids)
+
+    if not isinstance(xsd_type, SimpleType):
+        raise InvalidXSDError()
+
+    return simple_type.generate_simple_type(context, xsd_type)
@@ -0,0 +1,298 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from collections import deque
+from typing import Iterator
+import io
+import random
+import time
+import xml.etree.ElementTree as ET
+
+from . import tree, validation, writer
+from .budget import Budget
+from .codegen import SpecializedGenerator
+from .coverage import Coverage
+from .model import CompiledSchema, ElementDecl
+
+type Document = ET.ElementTree | bytes
+
+
+class Batch:
+    """
+    Lazily generate `n` documents with the same root element.
+    Documents are only generated when they are requested, so a consumer can stop early.
+
+    Every document gets its own random generator derived from the batch seed and
+    its index, so the output does not depend on how many worker processes generate
+    it and any document can be regenerated on its own with `document`.
+    Without a seed, one is drawn from the global `random` module.
+    With an `offset`, the batch is the slice of documents `offset` to `offset + n`
+    of the larger batch with the same seed, so slices can be generated apart.
+    With `check`, every document is validated against the schema.
+    With a `coverage`, the documents are generated one after the other in this
+    process, each steered toward the paths the documents before it did not cover.
+
+    The time spent generating is tracked so the throughput of the batch
+    can be reported while or after iterating.
+    """
+
+    def __init__(
+        self,
+        schema: CompiledSchema,
+        element_name: str,
+        n: int,
+        seed: int | None = None,
+        serialize: bool = False,
+        workers: int | None = None,
+        chunk_size: int = 16,
+        budget: Budget | None = None,
+        specialize: bool = False,
+        offset: int = 0,
+        check: bool = False,
+        coverage: Coverage | None = None,
+    ) -> None:
+        if coverage is not None and (specialize or (workers is not None and workers > 1)):
+            raise ValueError("coverage is tracked in one process without specialization")
+        self.schema = schema
+        self.element_name = element_name
+        self.n = n
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.serialize = serialize
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.budget = budget
+        self.specialize = specialize
+        self.offset = offset
+        self.check = check
+        self.coverage = coverage
+        self.generated = 0
+        self.elapsed = 0.0
+        """Seconds spent waiting for documents, excluding the time spent by the consumer"""
+
+        # Fail early on an unknown root element
+        _ = schema.find_global_element(element_name)
+        self._specialized: SpecializedGenerator | None = None
+
+    @property
+    def throughput(self) -> float:
+        """Generated documents per second"""
+        if self.elapsed == 0:
+            return 0.0
+        return self.generated / self.elapsed
+
+    def __iter__(self) -> Iterator[Document]:
+        if self.workers is not None and self.workers > 1:
+            return self._generate_in_parallel(self.workers)
+        return self._generate()
+
+    def document(self, index: int) -> Document:
+        """
+        Generate the document at `index` in the batch, without generating the ones before it.
+        """
+        if not 0 <= index < self.n:
+            raise IndexError(index)
+        if self.coverage is not None:
+            raise ValueError("the documents of a covered batch depend on the ones before")
+        xsd_element = self.schema.find_global_element(self.element_name)
+        return _generate_document(
+            self.schema,
+            xsd_element,
+            document_random(self.seed, self.offset + index),
+            self.serialize,
+            self.budget,
+            self._specialized_generator(),
+            self.check,
+        )
+
+    def _specialized_generator(self) -> SpecializedGenerator | None:
+        if self.specialize and self._specialized is None:
+            self._specialized = self.schema.specialize(self.element_name)
+        return self._specialized
+
+    def _generate(self) -> Iterator[Document]:
+        xsd_element = self.schema.find_global_element(self.element_name)
+        specialized = self._specialized_generator()
+        for i in range(self.offset, self.offset + self.n):
+            start = time.perf_counter()
+            document = _generate_document(
+                self.schema,
+                xsd_element,
+                document_random(self.seed, i),
+                self.serialize,
+                self.budget,
+                specialized,
+                self.check,
+                self.coverage,
+            )
+            self.elapsed += time.perf_counter() - start
+            self.generated += 1
+            yield document
+
+    def _generate_in_parallel(self, workers: int) -> Iterator[Document]:
+        """
+        Hand out chunks of document indices to worker processes and yield the
+        documents in index order. At most two chunks per worker are in flight.
+        """
+
+        seed = self.seed
+        stop = self.offset + self.n
+        chunks = (
+            (start, min(start + self.chunk_size, stop))
+            for start in range(self.offset, stop, self.chunk_size)
+        )
+
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_initialize_worker,
+            initargs=(self.schema, self.budget, self.specialize, self.check),
+        )
+        pending: deque[Future[list[Document]]] = deque()
+        try:
+            start = time.perf_counter()
+            for chunk in chunks:
+                pending.append(
+                    pool.submit(
+                        _generate_chunk, self.element_name, *chunk, seed, self.serialize
+                    )
+                )
+                if len(pending) < 2 * workers:
+                    continue
+                yield from self._yield_chunk(pending.popleft(), start)
+                start = time.perf_counter()
+
+            while pending:
+                yield from self._yield_chunk(pending.popleft(), start)
+                start = time.perf_counter()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _yield_chunk(
+        self, future: "Future[list[Document]]", start: float
+    ) -> Iterator[Document]:
+        documents = future.result()
+        self.elapsed += time.perf_counter() - start
+        for document in documents:
+            self.generated += 1
+            yield document
+
+    def __str__(self) -> str:
+        return (
+            f"{self.generated} documents in {self.elapsed:.3f} s "
+            f"({self.throughput:.1f} documents/s)"
+        )
+
+
+def document_random(seed: int, index: int) -> random.Random:
+    """
+    The random generator of the document at `index` in a batch.
+    It only depends on the seed and the index, so creating it takes constant time.
+    String seeds are hashed by `random.seed`, so neighbouring batch seeds do not overlap.
+    """
+    return random.Random(f"{seed}/{index}")
+
+
+def _generate_document(
+    schema: CompiledSchema,
+    xsd_element: ElementDecl,
+    rng: random.Random,
+    serialize: bool,
+    budget: Budget | None = None,
+    specialized: SpecializedGenerator | None = None,
+    check: bool = False,
+    coverage: Coverage | None = None,
+) -> Document:
+    if check:
+        return _generate_checked_document(
+            schema, xsd_element, rng, serialize, budget, specialized, coverage
+        )
+    if specialized is not None:
+        if not serialize:
+            return specialized.generate(rng, budget)
+        sink = io.BytesIO()
+        specialized.write(sink, rng=rng, budget=budget)
+        return sink.getvalue()
+
+    if not serialize:
+        return schema.generate_element(xsd_element, rng, budget, coverage=coverage)
+
+    sink = io.BytesIO()
+    schema.write_element(xsd_element, sink, rng=rng, budget=budget, coverage=coverage)
+    return sink.getvalue()
+
+
+def _generate_checked_document(
+    schema: CompiledSchema,
+    xsd_element: ElementDecl,
+    rng: random.Random,
+    serialize: bool,
+    budget: Budget | None,
+    specialized: SpecializedGenerator | None,
+    coverage: Coverage | None = None,
+) -> Document:
+    """Generate a tree to validate it, and serialize it once it is valid"""
+    if specialized is not None:
+        document = specialized.generate(rng, budget)
+    else:
+        document = schema.generate_element(xsd_element, rng, budget, coverage=coverage)
+    validation.check(schema, document)
+    if not serialize:
+        return document
+
+    root = document.getroot()
+    if root is None:
+        raise ValueError()
+    sink = io.BytesIO()
+    xml_writer = writer.XMLWriter(sink, writer.output_prefixes(schema), "  ")
+    writer.write_events(xml_writer, tree.tree_events(root))
+    xml_writer.close()
+    return sink.getvalue()
+
+
+_worker_schema: CompiledSchema | None = None
+_worker_budget: Budget | None = None
+_worker_specialize = False
+_worker_check = False
+# Emitted modules cannot be pickled, so every worker specializes the root elements itself
+_worker_generators: dict[str, SpecializedGenerator] = {}
+
+
+def _initialize_worker(
+    schema: CompiledSchema,
+    budget: Budget | None,
+    specialize: bool = False,
+    check: bool = False,
+) -> None:
+    global _worker_schema, _worker_budget, _worker_specialize, _worker_check
+    _worker_schema = schema
+    _worker_budget = budget
+    _worker_specialize = specialize
+    _worker_check = check
+
+
+def _generate_chunk(
+    element_name: str, start: int, stop: int, seed: int, serialize_documents: bool
+) -> list[Document]:
+    if _worker_schema is None:
+        raise AssertionError()
+
+    xsd_element = _worker_schema.find_global_element(element_name)
+    specialized = None
+    if _worker_specialize:
+        specialized = _worker_generators.get(element_name)
+        if specialized is None:
+            specialized = _worker_schema.specialize(element_name)
+            _worker_generators[element_name] = specialized
+
+    documents = []
+    for i in range(start, stop):
+        rng = document_random(seed, i)
+        documents.append(
+            _generate_document(
+                _worker_schema,
+                xsd_element,
+                rng,
+                serialize_documents,
+                _worker_budget,
+                specialized,
+                _worker_check,
+            )
+        )
+    return documents
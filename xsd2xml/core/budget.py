@@ -0,0 +1,430 @@
+"""
+Budgets bound the size of generated documents.
+
+A budget has a target size, in elements or serialized bytes, and hard caps on
+the elements, the depth and the time spent per document. The target is drawn
+per document from a size distribution. Before generating, the number of
+occurrences drawn for `maxOccurs="unbounded"` is scaled so that the expected
+size of the document matches the target, using a model of the schema. While
+generating, the consumed events are counted, and once the budget runs out only
+the content the schema requires is generated, so the document stays valid.
+"""
+
+from dataclasses import dataclass
+from typing import Iterator
+import math
+import random
+import sys
+import time
+
+from .builtins import BuiltIn
+from .events import END, Event, Start
+from .model import (
+    AnyAttribute,
+    AnyElement,
+    Attribute,
+    CompiledSchema,
+    ComplexContentExtension,
+    ComplexType,
+    Compositor,
+    ElementDecl,
+    ElementRef,
+    ModelGroup,
+    Occurs,
+    Particle,
+    SimpleContentExtension,
+    SimpleType,
+    TypeRef,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Uniform:
+    """Sizes drawn uniformly from `low` up to and including `high`"""
+
+    low: int
+    high: int
+
+    def __post_init__(self) -> None:
+        if not 0 <= self.low <= self.high:
+            raise ValueError(f"expected 0 <= low <= high, got {self.low} and {self.high}")
+
+    def sample(self, rng: random.Random) -> int:
+        return rng.randint(self.low, self.high)
+
+
+@dataclass(frozen=True, slots=True)
+class Zipf:
+    """
+    Heavy-tailed sizes from `low` up to and including `high`: the probability
+    of a size is proportional to `size ** -exponent`, so most documents are
+    small and a few are huge.
+    """
+
+    low: int
+    high: int
+    exponent: float = 1.5
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.low <= self.high:
+            raise ValueError(f"expected 1 <= low <= high, got {self.low} and {self.high}")
+
+    def sample(self, rng: random.Random) -> int:
+        # Inverse of the cumulative distribution of the continuous power law
+        u = rng.random()
+        if self.exponent == 1:
+            size = self.low * (self.high / self.low) ** u
+        else:
+            a = 1 - self.exponent
+            size = (self.low**a + u * (self.high**a - self.low**a)) ** (1 / a)
+        return min(int(size), self.high)
+
+
+type Size = int | Uniform | Zipf
+"""A fixed size or a distribution of sizes"""
+
+
+def _sample_size(size: Size, rng: random.Random) -> int:
+    if isinstance(size, int):
+        return size
+    return size.sample(rng)
+
+
+@dataclass(frozen=True, slots=True)
+class Budget:
+    """
+    The size and limits of generated documents.
+
+    Without a target, `unbounded_occurs` is the largest number of occurrences
+    drawn for `maxOccurs="unbounded"`. The caps are hard: when one is reached,
+    only required elements and attributes are still generated. Required
+    content that is nested deeper than `max_depth` is still generated.
+    """
+
+    elements: Size | None = None
+    """Target number of elements per document"""
+    bytes: Size | None = None
+    """Target serialized size per document, without indentation"""
+    max_elements: int | None = None
+    max_depth: int | None = None
+    max_seconds: float | None = None
+    """Wall-clock time per document"""
+    unbounded_occurs: int = 2
+    optional_attribute_probability: float = 0.5
+
+    def start(
+        self, schema: CompiledSchema, xsd_element: ElementDecl, rng: random.Random
+    ) -> "DocumentBudget":
+        """
+        Draw the target of one document with root `xsd_element`.
+        """
+
+        target_elements = target_bytes = None
+        unbounded_occurs = self.unbounded_occurs
+        if self.elements is not None or self.bytes is not None:
+            model = self._model(schema, xsd_element)
+            unbounded_occurs = sys.maxsize
+            if self.elements is not None:
+                target_elements = _sample_size(self.elements, rng)
+                unbounded_occurs = model.unbounded_occurs(target_elements, 0)
+            if self.bytes is not None:
+                target_bytes = _sample_size(self.bytes, rng)
+                unbounded_occurs = min(
+                    unbounded_occurs, model.unbounded_occurs(target_bytes, 1)
+                )
+
+        # A cap of 0 is a cap, only None means no cap
+        max_elements = min(
+            sys.maxsize if target_elements is None else target_elements,
+            sys.maxsize if self.max_elements is None else self.max_elements,
+        )
+        deadline = None
+        if self.max_seconds is not None:
+            deadline = time.perf_counter() + self.max_seconds
+
+        return DocumentBudget(
+            unbounded_occurs,
+            self.optional_attribute_probability,
+            max_elements,
+            sys.maxsize if target_bytes is None else target_bytes,
+            sys.maxsize if self.max_depth is None else self.max_depth,
+            deadline,
+        )
+
+    def _model(self, schema: CompiledSchema, xsd_element: ElementDecl) -> "_SizeModel":
+        # The models are stored on the schema, so that they live as long as it
+        key = (xsd_element.name, self.optional_attribute_probability)
+        model = schema._size_models.get(key)
+        if model is None:
+            model = schema._size_models[key] = _SizeModel(
+                schema, xsd_element, self.optional_attribute_probability
+            )
+        return model
+
+
+class DocumentBudget:
+    """
+    The budget of one document, spent as its events are consumed.
+    """
+
+    __slots__ = (
+        "unbounded_occurs",
+        "optional_attribute_probability",
+        "max_elements",
+        "max_bytes",
+        "max_depth",
+        "deadline",
+        "elements",
+        "bytes",
+        "depth",
+        "exhausted",
+    )
+
+    def __init__(
+        self,
+        unbounded_occurs: int,
+        optional_attribute_probability: float,
+        max_elements: int,
+        max_bytes: int,
+        max_depth: int,
+        deadline: float | None,
+    ) -> None:
+        self.unbounded_occurs = unbounded_occurs
+        self.optional_attribute_probability = optional_attribute_probability
+        self.max_elements = max_elements
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self.deadline = deadline
+        self.elements = 0
+        self.bytes = 0
+        self.depth = 0
+        self.exhausted = False
+
+    def limited(self) -> bool:
+        """Whether only required content may be added to the open element"""
+        return self.exhausted or self.depth >= self.max_depth
+
+    def track(self, events: Iterator[Event]) -> Iterator[Event]:
+        for event in events:
+            if event is END:
+                self.depth -= 1
+            else:
+                assert isinstance(event, Start)
+                self.depth += 1
+                self.elements += 1
+                self.bytes += _approximate_size(event)
+                if (
+                    self.elements >= self.max_elements
+                    or self.bytes >= self.max_bytes
+                    or (
+                        self.deadline is not None
+                        and time.perf_counter() >= self.deadline
+                    )
+                ):
+                    self.exhausted = True
+            yield event
+
+
+def _local_length(name: str) -> int:
+    return len(name) - name.find("}") - 1
+
+
+def _approximate_size(start: Start) -> int:
+    # <tag attribute="value">text</tag>, without prefixes or escaping
+    size = 2 * _local_length(start.tag) + 5
+    if start.text is not None:
+        size += len(start.text)
+    for name, value in start.attrib.items():
+        size += _local_length(name) + len(value) + 4
+    return size
+
+
+# The model assumes a value of a simple type has this length
+_VALUE_LENGTH = 10
+
+# Sizes above this are treated as infinite, e.g. for recursive schemas
+_INFINITE = 1e15
+
+# The numbers of occurrences of `unbounded` for which the model is evaluated
+_UNBOUNDED_OCCURS = sorted({round(1.25**i) for i in range(94)})
+
+
+@dataclass(frozen=True, slots=True)
+class _Estimate:
+    elements: float = 0.0
+    bytes: float = 0.0
+
+    def __add__(self, other: "_Estimate") -> "_Estimate":
+        return _Estimate(self.elements + other.elements, self.bytes + other.bytes)
+
+    def __mul__(self, factor: float) -> "_Estimate":
+        if factor == 0:
+            return _NOTHING  # Even if the estimate is infinite
+        return _Estimate(self.elements * factor, self.bytes * factor)
+
+
+_NOTHING = _Estimate()
+
+
+class _SizeModel:
+    """
+    The expected size of the documents of a root element, as a function of the
+    number of occurrences drawn for `unbounded`.
+
+    Global elements and named types can be recursive, so their sizes are found
+    by fixed-point iteration: every round computes them from the sizes of the
+    previous round, starting from nothing.
+    """
+
+    def __init__(
+        self,
+        schema: CompiledSchema,
+        xsd_element: ElementDecl,
+        optional_attribute_probability: float,
+    ) -> None:
+        self._schema = schema
+        self._root = xsd_element
+        self._optional_attribute_probability = optional_attribute_probability
+        self._sizes: list[tuple[float, float]] = []
+        """The sizes of the documents, in elements and bytes, for the first of `_UNBOUNDED_OCCURS`"""
+
+    def unbounded_occurs(self, target: int, unit: int) -> int:
+        """
+        The occurrences of `unbounded` for which documents are expected to
+        have `target` elements, for `unit` 0, or bytes, for `unit` 1.
+        The model is only evaluated up to the first occurrences that reach the target.
+        """
+
+        previous_occurs, previous_size = 0, 0.0
+        for i, occurs in enumerate(_UNBOUNDED_OCCURS):
+            if i == len(self._sizes):
+                estimate = self._estimate(occurs)
+                self._sizes.append((estimate.elements, estimate.bytes))
+
+            size = self._sizes[i][unit]
+            if size >= target:
+                if size == previous_size:
+                    return occurs
+                fraction = (target - previous_size) / (size - previous_size)
+                return math.ceil(previous_occurs + fraction * (occurs - previous_occurs))
+            previous_occurs, previous_size = occurs, size
+        return previous_occurs
+
+    def _estimate(self, unbounded_occurs: int) -> _Estimate:
+        elements: dict[str, _Estimate] = {}
+        complex_types: dict[str, _Estimate] = {}
+        root = _NOTHING
+        for _ in range(1000):
+            iteration = _Iteration(self, unbounded_occurs, elements, complex_types)
+            next_elements = {
+                name: iteration.element(xsd_element)
+                for name, xsd_element in self._schema.elements.items()
+            }
+            next_complex_types = {
+                name: iteration.complex_content(xsd_complex_type)
+                for name, xsd_complex_type in self._schema.complex_types.items()
+            }
+            root = iteration.element(self._root)
+
+            converged = all(
+                math.isclose(e.elements, elements.get(name, _NOTHING).elements)
+                for name, e in next_elements.items()
+            ) and all(
+                math.isclose(c.elements, complex_types.get(name, _NOTHING).elements)
+                for name, c in next_complex_types.items()
+            )
+            if converged or root.elements >= _INFINITE:
+                return root
+            elements, complex_types = next_elements, next_complex_types
+        return root
+
+
+class _Iteration:
+    """One round of the fixed-point iteration of a `_SizeModel`."""
+
+    def __init__(
+        self,
+        model: _SizeModel,
+        unbounded_occurs: int,
+        elements: dict[str, _Estimate],
+        complex_types: dict[str, _Estimate],
+    ) -> None:
+        self._schema = model._schema
+        self._optional_attribute_probability = model._optional_attribute_probability
+        self._unbounded_occurs = unbounded_occurs
+        self._elements = elements
+        self._complex_types = complex_types
+
+    def _occurs(self, occurs: Occurs) -> float:
+        if occurs.max is None:
+            return (occurs.min + max(occurs.min, self._unbounded_occurs)) / 2
+        return (occurs.min + occurs.max) / 2
+
+    def element(self, xsd_element: ElementDecl) -> _Estimate:
+        tag = _Estimate(1, 2 * _local_length(xsd_element.name) + 5)
+        match xsd_element.type:
+            case TypeRef(name) if name in self._schema.complex_types:
+                substitutes = self._schema.complex_type_substitutes[name]
+                content = _average(
+                    [self._complex_types.get(t.name, _NOTHING) for t in substitutes]  # pyright: ignore
+                )
+            case ComplexType() as xsd_complex_type:
+                content = self.complex_content(xsd_complex_type)
+            case BuiltIn() | SimpleType() | TypeRef():
+                content = _Estimate(0, _VALUE_LENGTH)
+            case _:
+                content = _NOTHING
+        return tag + content
+
+    def complex_content(self, xsd_complex_type: ComplexType) -> _Estimate:
+        attributes = self._attributes(xsd_complex_type.attributes)
+        match xsd_complex_type.content:
+            case ModelGroup() as model_group:
+                return attributes + self._particle(model_group)
+            case SimpleContentExtension(base, extension_attributes):
+                if isinstance(base, TypeRef) and base.name in self._complex_types:
+                    content = self._complex_types[base.name]
+                else:
+                    content = _Estimate(0, _VALUE_LENGTH)
+                return attributes + content + self._attributes(extension_attributes)
+            case ComplexContentExtension(base, extension):
+                content = self._complex_types.get(base.name, _NOTHING)
+                return attributes + content + self.complex_content(extension)
+            case _:
+                return attributes
+
+    def _particle(self, particle: Particle) -> _Estimate:
+        match particle:
+            case ElementDecl():
+                return self.element(particle) * self._occurs(particle.occurs)
+            case ElementRef(ref, occurs):
+                return self._elements.get(ref, _NOTHING) * self._occurs(occurs)
+            case AnyElement(occurs):
+                return _Estimate(1, 2 * _VALUE_LENGTH + 5) * self._occurs(occurs)
+            case ModelGroup(Compositor.choice, particles):
+                return _average([self._particle(p) for p in particles])
+            case ModelGroup(_, particles):
+                total = _NOTHING
+                for p in particles:
+                    total += self._particle(p)
+                return total
+            case _:
+                return _NOTHING
+
+    def _attributes(self, xsd_attributes: tuple[Attribute, ...]) -> _Estimate:
+        size = 0.0
+        for xsd_attribute in xsd_attributes:
+            if isinstance(xsd_attribute, AnyAttribute):
+                continue
+            probability = 1 if xsd_attribute.required else self._optional_attribute_probability
+            size += probability * (_local_length(xsd_attribute.name) + _VALUE_LENGTH + 4)
+        return _Estimate(0, size)
+
+
+def _average(estimates: list[_Estimate]) -> _Estimate:
+    if not estimates:
+        return _NOTHING
+    total = _NOTHING
+    for estimate in estimates:
+        total += estimate
+    return total * (1 / len(estimates))
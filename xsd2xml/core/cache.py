@@ -0,0 +1,80 @@
+"""
+Persistent on-disk cache of compiled schemas.
+
+Entries are keyed by a hash of the schema content and the library version,
+so a changed XSD or a new release of xsd2xml never reads a stale entry.
+"""
+
+from pathlib import Path
+from typing import Callable
+import hashlib
+import os
+import pickle
+import tempfile
+
+from .._version import __version__
+from .etree import XSDSource
+from .model import CompiledSchema
+
+
+def read_source(xsd: XSDSource) -> bytes:
+    """
+    Read the raw content of an XSD source so it can be hashed and parsed.
+    """
+
+    if isinstance(xsd, bytes):
+        return xsd
+    if isinstance(xsd, (str, os.PathLike)):
+        return Path(xsd).read_bytes()
+    if hasattr(xsd, "read"):
+        return xsd.read()  # pyright: ignore[reportAttributeAccessIssue]
+    raise TypeError(f"Cannot cache a schema loaded from {type(xsd).__name__}")
+
+
+def cache_key(*contents: bytes) -> str:
+    digest = hashlib.sha256(__version__.encode())
+    for content in contents:
+        digest.update(hashlib.sha256(content).digest())
+    return digest.hexdigest()
+
+
+def load_or_compile(
+    key: str,
+    cache_dir: str | os.PathLike[str],
+    compile_schema: Callable[[], CompiledSchema],
+) -> CompiledSchema:
+    cache_dir = Path(cache_dir)
+    path = cache_dir / f"{key}.pickle"
+
+    try:
+        with path.open("rb") as f:
+            schema = pickle.load(f)
+        if isinstance(schema, CompiledSchema):
+            return schema
+    except FileNotFoundError:
+        pass
+    except Exception:
+        # Loading a corrupt or incompatible entry can raise about anything.
+        # It is removed, so that it is gone even if compiling fails.
+        path.unlink(missing_ok=True)
+
+    schema = compile_schema()
+    _write_atomically(path, pickle.dumps(schema, protocol=pickle.HIGHEST_PROTOCOL))
+    return schema
+
+
+def _write_atomically(path: Path, data: bytes) -> None:
+    """
+    Write through a temporary file so that concurrent processes never read
+    a partially written entry.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            _ = f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,790 @@
+"""
+A backend that compiles the generation of one root element into Python source.
+
+The interpreter walks the compiled schema for every element it generates:
+it dispatches on every particle and type, looks up references and substitutes,
+and runs one generator per element on the stack of the engine. `specialize`
+walks the schema once and emits a module with two functions per complex type,
+one for its attributes and text and one for its children, with the occurs
+bounds, enumerations, attribute names, tags and substitutes inlined as constants.
+The functions build the tree directly.
+
+The module draws the same random numbers in the same order as the interpreter,
+so a seed generates the same document with either backend. Generation with a
+budget or with a random generator other than `random.Random` is left to the
+interpreter, and so are documents nested too deep for Python recursion.
+"""
+
+from os import PathLike
+from pathlib import Path
+from types import ModuleType
+from typing import BinaryIO, Callable
+import importlib.util
+import random
+import threading
+import xml.etree.ElementTree as ET
+
+from . import cache, tree
+from .budget import Budget
+from .builtins import BuiltIn
+from .idrefs import IDRegistry
+from .simple_type import is_id_type
+from .model import (
+    AnyAttribute,
+    AnyElement,
+    Attribute,
+    AttributeUse,
+    CompiledSchema,
+    ComplexContentExtension,
+    ComplexType,
+    Compositor,
+    ElementDecl,
+    ElementRef,
+    ModelGroup,
+    Occurs,
+    Particle,
+    Provider,
+    Restriction,
+    SimpleContentExtension,
+    SimpleType,
+    TypeDefinition,
+    Unsupported,
+)
+from .namespaces import xsi
+from .utils import InvalidXSDError
+from .values import ValuePools
+
+type _Document = Callable[
+    [random.Random, Callable[[BuiltIn], str], "_TreeIDRegistry"], ET.Element
+]
+
+_HEADER = '''"""
+Generated by xsd2xml for the element {element}. Do not edit.
+"""
+
+from xml.etree.ElementTree import Element, SubElement
+
+from xsd2xml.core.builtins import BuiltIn
+
+XSI_TYPE = {xsi_type!r}
+{built_ins}
+
+def fail(error):
+    raise error()
+
+
+def build(K):
+'''
+
+# `randrange(n)` draws like `choice` and `randint` over n values in the interpreter
+_DOCUMENT = '''
+    def document(rng, take, ids):
+        randrange = rng.randrange
+        random = rng.random
+        shuffle = rng.shuffle
+        register = ids.register
+        reference = ids.reference
+        deferred = ids.deferred
+        hold = ids.hold
+'''
+
+_BUILT_IN_ERRORS = (IndexError, KeyError, NotImplementedError, ValueError)
+
+# Emitted where an element was created, and replaced once it is known
+# whether the module generates IDREFs
+_HOLD = "\0hold"
+
+
+class _ModuleWriter:
+    """
+    Emits the source of the module for one root element. Components are
+    resolved exactly as the interpreter resolves them while generating, and a
+    lookup that fails is emitted as the error the interpreter would raise.
+    """
+
+    def __init__(self, schema: CompiledSchema) -> None:
+        self.schema = schema
+        self.functions: list[str] = []
+        self.tables: list[str] = []
+        self.constants: list[object] = []
+        self.built_ins: dict[BuiltIn, str] = {}
+        self.generates_idrefs = False
+        self._type_indices: dict[tuple[int, int], int] = {}
+        self._element_indices: dict[int, int] = {}
+        self._children: dict[int, str | None] = {}
+        self._pending: list[Callable[[], None]] = []
+        self._variables = 0
+
+    def write(self, xsd_element: ElementDecl) -> str:
+        root = ["        def root():"]
+        self._element_body(root, 3, xsd_element, None)
+        root.append("            return e")
+        while self._pending:
+            self._pending.pop()()
+
+        built_ins = "".join(
+            f"{name} = BuiltIn.{type.name}\n" for type, name in self.built_ins.items()
+        )
+        parts = [
+            _HEADER.format(
+                element=xsd_element.name, xsi_type=xsi.type, built_ins=built_ins
+            )
+        ]
+        parts += [f"    k{i} = K[{i}]\n" for i in range(len(self.constants))]
+        parts.append(_DOCUMENT)
+        for function in self.functions + ["\n".join(root)]:
+            parts.append("\n" + function + "\n")
+        parts.append("\n")
+        parts += [f"        {table}\n" for table in self.tables]
+        parts.append("\n        return root()\n\n    return document\n")
+
+        # IDREFs that precede the first ID are resolved once the elements after them exist
+        hold = "if deferred: hold(parent, e)"
+        lines = []
+        for line in "".join(parts).split("\n"):
+            if line.strip() == _HOLD:
+                if not self.generates_idrefs:
+                    continue
+                line = line.replace(_HOLD, hold)
+            lines.append(line)
+        return "\n".join(lines)
+
+    # Names of constants and fresh variables
+
+    def _constant(self, value: object) -> str:
+        self.constants.append(value)
+        return f"k{len(self.constants) - 1}"
+
+    def _error(self, error: type[Exception]) -> str:
+        if error in _BUILT_IN_ERRORS:
+            return f"fail({error.__name__})"
+        return f"fail({self._constant(error)})"
+
+    def _variable(self) -> str:
+        self._variables += 1
+        return f"i{self._variables}"
+
+    # Values
+
+    def _built_in(self, type: BuiltIn) -> str:
+        name = self.built_ins.setdefault(type, f"T_{type.name}")
+        match type:
+            case BuiltIn.id:
+                return f"register(take({name}))"
+            case BuiltIn.idref | BuiltIn.idrefs:
+                self.generates_idrefs = True
+                return "reference()"
+            case _:
+                return f"take({name})"
+
+    def _simple_value(self, xsd_simple_type: SimpleType) -> str:
+        """Mirrors `simple_type.generate_simple_type`"""
+        if xsd_simple_type.provider is not None:
+            value = f"{self._constant(xsd_simple_type.provider)}(rng)"
+            if is_id_type(self.schema, xsd_simple_type):
+                return f"register({value})"
+            return value
+
+        match xsd_simple_type.content:
+            case Restriction(base, enumerations, facets):
+                if enumerations:
+                    return f"{enumerations!r}[randrange({len(enumerations)})]"
+                if facets:
+                    return self._error(NotImplementedError)
+                return self._built_in(base)
+            case Unsupported(error):
+                return self._error(error)
+
+    def _find_type(
+        self, type_definition: TypeDefinition
+    ) -> BuiltIn | SimpleType | ComplexType | type[Exception]:
+        try:
+            return self.schema.find_type(type_definition)
+        except Exception as e:
+            return type(e)
+
+    # Attributes
+
+    def _attributes(
+        self,
+        lines: list[str],
+        indent: int,
+        attributes: tuple[Attribute, ...],
+        providers: dict[str, Provider] | None,
+    ) -> None:
+        """Mirrors `attribute._generate_attributes` without a budget"""
+        pad = "    " * indent
+        for xsd_attribute in attributes:
+            match xsd_attribute:
+                case AttributeUse():
+                    value = self._attribute_value(xsd_attribute, providers)
+                    value = f"attrib[{xsd_attribute.name!r}] = {value}"
+                case AnyAttribute():
+                    value = self._error(NotImplementedError)
+            if xsd_attribute.required:
+                lines += [f"{pad}random()", f"{pad}{value}"]
+            else:
+                lines += [f"{pad}if random() <= 0.5:", f"{pad}    {value}"]
+
+    def _attribute_value(
+        self, xsd_attribute: AttributeUse, providers: dict[str, Provider] | None
+    ) -> str:
+        provider = xsd_attribute.provider
+        if providers is not None:
+            provider = providers.get(xsd_attribute.name, provider)
+        if provider is not None:
+            value = f"{self._constant(provider)}(rng)"
+            if is_id_type(self.schema, xsd_attribute.type):
+                return f"register({value})"
+            return value
+        xsd_type = self._find_type(xsd_attribute.type)
+        if isinstance(xsd_type, BuiltIn):
+            return self._built_in(xsd_type)
+        if isinstance(xsd_type, SimpleType):
+            return self._simple_value(xsd_type)
+        if isinstance(xsd_type, type):
+            return self._error(xsd_type)
+        return self._error(InvalidXSDError)
+
+    # Complex types
+
+    def _complex_type(
+        self,
+        xsd_complex_type: ComplexType,
+        providers: dict[str, Provider] | None = None,
+    ) -> int:
+        """
+        The index of the functions of a complex type, emitted on first use.
+        Elements with attribute providers get a head function of their own.
+        """
+        key = (id(xsd_complex_type), 0 if providers is None else id(providers))
+        index = self._type_indices.get(key)
+        if index is None:
+            index = self._type_indices[key] = len(self._type_indices)
+            self._pending.append(
+                lambda: self._emit_complex_type(index, xsd_complex_type, providers)
+            )
+        return index
+
+    def _emit_complex_type(
+        self,
+        index: int,
+        xsd_complex_type: ComplexType,
+        providers: dict[str, Provider] | None,
+    ) -> None:
+        """Mirrors `complex_type._generate_complex_type`"""
+        lines = [f"        def h{index}():"]
+        match xsd_complex_type.content:
+            case None | ModelGroup():
+                lines.append("            attrib = {}")
+                self._attributes(lines, 3, xsd_complex_type.attributes, providers)
+                lines.append("            return attrib, None")
+            case SimpleContentExtension(base, attributes):
+                xsd_type = self._find_type(base)
+                if isinstance(xsd_type, BuiltIn):
+                    lines.append("            text = " + self._built_in(xsd_type))
+                    lines.append("            attrib = {}")
+                elif isinstance(xsd_type, SimpleType):
+                    lines.append("            text = " + self._simple_value(xsd_type))
+                    lines.append("            attrib = {}")
+                elif isinstance(xsd_type, ComplexType):
+                    head = f"h{self._complex_type(xsd_type, providers)}"
+                    lines.append(f"            attrib, text = {head}()")
+                else:
+                    lines.append("            " + self._error(xsd_type))
+                self._attributes(lines, 3, attributes, providers)
+                lines.append("            return attrib, text")
+            case ComplexContentExtension(base, extension):
+                xsd_type = self._find_type(base)
+                if not isinstance(xsd_type, ComplexType):
+                    error = xsd_type if isinstance(xsd_type, type) else InvalidXSDError
+                    lines.append("            return " + self._error(error))
+                else:
+                    base_head = f"h{self._complex_type(xsd_type, providers)}"
+                    extension_head = f"h{self._complex_type(extension, providers)}"
+                    lines += [
+                        f"            attrib, text = {base_head}()",
+                        f"            extension_attrib, _ = {extension_head}()",
+                        "            attrib |= extension_attrib",
+                        "            return attrib, text",
+                    ]
+            case Unsupported(error):
+                lines.append("            return " + self._error(error))
+        self.functions.append("\n".join(lines))
+
+        if self._children_function(xsd_complex_type) == f"c{index}":
+            self._emit_children(index, xsd_complex_type)
+
+    def _children_function(self, xsd_complex_type: ComplexType) -> str | None:
+        """The function generating the children of a complex type, if it has any"""
+        key = id(xsd_complex_type)
+        if key in self._children:
+            return self._children[key]
+        # A type that extends itself has no children of its own
+        self._children[key] = None
+
+        index = self._complex_type(xsd_complex_type)
+        name = None
+        match xsd_complex_type.content:
+            case ModelGroup():
+                name = f"c{index}"
+            case SimpleContentExtension(base):
+                xsd_type = self._find_type(base)
+                if isinstance(xsd_type, ComplexType):
+                    name = self._children_function(xsd_type)
+            case ComplexContentExtension(base, extension):
+                xsd_type = self._find_type(base)
+                if isinstance(xsd_type, ComplexType):
+                    base_children = self._children_function(xsd_type)
+                    extension_children = self._children_function(extension)
+                    if base_children is None or extension_children is None:
+                        name = base_children or extension_children
+                    else:
+                        name = f"c{index}"
+        self._children[key] = name
+        return name
+
+    def _emit_children(self, index: int, xsd_complex_type: ComplexType) -> None:
+        lines = [f"        def c{index}(parent):"]
+        match xsd_complex_type.content:
+            case ModelGroup() as model_group:
+                self._particle(lines, 3, model_group)
+            case ComplexContentExtension(base, extension):
+                xsd_type = self.schema.find_type(base)
+                assert isinstance(xsd_type, ComplexType)
+                lines.append(f"            {self._children_function(xsd_type)}(parent)")
+                lines.append(f"            {self._children_function(extension)}(parent)")
+        if len(lines) == 1:
+            lines.append("            pass")
+        self.functions.append("\n".join(lines))
+
+    # Content models
+
+    def _particle(self, lines: list[str], indent: int, particle: Particle) -> None:
+        """Mirrors `complex_type._recurse_indicator`"""
+        pad = "    " * indent
+        match particle:
+            case ElementDecl() | ElementRef():
+                self._element_particle(lines, indent, particle)
+            case AnyElement(occurs):
+                tag = self._built_in(BuiltIn.ncname)
+                lines.append(f"{pad}for _ in range({self._occurs(occurs)}):")
+                lines.append(f"{pad}    e = SubElement(parent, {tag})")
+                lines.append(f"{pad}    {_HOLD}")
+            case ModelGroup(Compositor.sequence, particles):
+                for child in particles:
+                    self._particle(lines, indent, child)
+            case ModelGroup(Compositor.choice, particles):
+                self._choice(lines, indent, particles)
+            case ModelGroup(Compositor.all, particles):
+                if len(particles) == 1:
+                    self._particle(lines, indent, particles[0])
+                elif particles:
+                    order = self._variable()
+                    lines.append(f"{pad}{order} = list(range({len(particles)}))")
+                    lines.append(f"{pad}shuffle({order})")
+                    i = self._variable()
+                    lines.append(f"{pad}for {i} in {order}:")
+                    self._branches(lines, indent + 1, i, particles)
+            case Unsupported(error):
+                lines.append(pad + self._error(error))
+
+    def _choice(
+        self, lines: list[str], indent: int, particles: tuple[Particle, ...]
+    ) -> None:
+        pad = "    " * indent
+        if not particles:
+            lines.append(pad + self._error(IndexError))
+        elif len(particles) == 1:
+            lines.append(f"{pad}randrange(1)")
+            self._particle(lines, indent, particles[0])
+        else:
+            i = self._variable()
+            lines.append(f"{pad}{i} = randrange({len(particles)})")
+            self._branches(lines, indent, i, particles)
+
+    def _branches(
+        self, lines: list[str], indent: int, i: str, particles: tuple[Particle, ...]
+    ) -> None:
+        pad = "    " * indent
+        for n, particle in enumerate(particles):
+            if n == len(particles) - 1:
+                lines.append(f"{pad}else:")
+            else:
+                lines.append(f"{pad}{'if' if n == 0 else 'elif'} {i} == {n}:")
+            body_start = len(lines)
+            self._particle(lines, indent + 1, particle)
+            if len(lines) == body_start:
+                lines.append(f"{pad}    pass")
+
+    def _occurs(self, occurs: Occurs) -> str:
+        """The number of occurrences, as `_get_random_occurs` draws it without a budget"""
+        high = max(occurs.min, 2) if occurs.max is None else occurs.max
+        if high < occurs.min:
+            return self._error(ValueError)
+        return f"{occurs.min} + randrange({high - occurs.min + 1})"
+
+    # Elements
+
+    def _element_particle(
+        self, lines: list[str], indent: int, particle: ElementDecl | ElementRef
+    ) -> None:
+        """Mirrors `element.generate_element`"""
+        pad = "    " * indent
+        occurs = self._occurs(particle.occurs)
+        try:
+            xsd_element = self.schema.find_element(particle)
+            error = self._element_type_error(xsd_element)
+        except Exception as e:
+            xsd_element, error = None, type(e)
+
+        if xsd_element is None or error is not None:
+            # The interpreter fails before the first occurrence, if there are none too
+            lines += [pad + occurs, pad + self._error(error or InvalidXSDError)]
+        elif occurs == "1 + randrange(1)":
+            lines.append(f"{pad}randrange(1)")
+            lines.append(f"{pad}e{self._element(xsd_element)}(parent)")
+        else:
+            lines += [
+                f"{pad}for _ in range({occurs}):",
+                f"{pad}    e{self._element(xsd_element)}(parent)",
+            ]
+
+    def _element_type_error(self, xsd_element: ElementDecl) -> type[Exception] | None:
+        xsd_type = self._find_type(xsd_element.type)
+        if isinstance(xsd_type, type):
+            return xsd_type
+        if not isinstance(xsd_type, (BuiltIn, SimpleType, ComplexType)):
+            return InvalidXSDError
+        return None
+
+    def _element(self, xsd_element: ElementDecl) -> int:
+        index = self._element_indices.get(id(xsd_element))
+        if index is None:
+            index = self._element_indices[id(xsd_element)] = len(self._element_indices)
+            self._pending.append(lambda: self._emit_element(index, xsd_element))
+        return index
+
+    def _emit_element(self, index: int, xsd_element: ElementDecl) -> None:
+        lines = [f"        def e{index}(parent):"]
+        self._element_body(lines, 3, xsd_element, "parent")
+        self.functions.append("\n".join(lines))
+
+    def _element_body(
+        self,
+        lines: list[str],
+        indent: int,
+        xsd_element: ElementDecl,
+        parent: str | None,
+    ) -> None:
+        """Mirrors `element._find_element_generator` for one occurrence"""
+        pad = "    " * indent
+        tag = repr(xsd_element.name)
+        xsd_type = self.schema.find_type(xsd_element.type)
+        provider = xsd_element.provider
+
+        if provider is not None and isinstance(xsd_type, (BuiltIn, SimpleType)):
+            value = f"{self._constant(provider)}(rng)"
+            if is_id_type(self.schema, xsd_type):
+                value = f"register({value})"
+            lines.append(f"{pad}text = {value}")
+            self._create(lines, indent, tag, None, parent)
+        elif isinstance(xsd_type, BuiltIn):
+            lines.append(f"{pad}text = {self._built_in(xsd_type)}")
+            self._create(lines, indent, tag, None, parent)
+        elif isinstance(xsd_type, SimpleType):
+            self._simple_element(lines, indent, xsd_type)
+            self._create(lines, indent, tag, "attrib", parent)
+        else:
+            assert isinstance(xsd_type, ComplexType)
+            self._complex_element(lines, indent, xsd_element, xsd_type, parent)
+
+    def _create(
+        self,
+        lines: list[str],
+        indent: int,
+        tag: str,
+        attrib: str | None,
+        parent: str | None,
+    ) -> None:
+        pad = "    " * indent
+        arguments = tag if attrib is None else f"{tag}, {attrib}"
+        if parent is None:
+            lines.append(f"{pad}e = Element({arguments})")
+            lines.append(f"{pad}parent = None")
+        else:
+            lines.append(f"{pad}e = SubElement(parent, {arguments})")
+        lines.append(f"{pad}e.text = text")
+        lines.append(f"{pad}{_HOLD}")
+
+    def _simple_element(
+        self, lines: list[str], indent: int, xsd_simple_type: SimpleType
+    ) -> None:
+        """Mirrors `simple_type.generate_simple_element`"""
+        pad = "    " * indent
+        try:
+            substitutes = _simple_substitutes(self.schema, xsd_simple_type)
+        except KeyError:
+            lines.append(pad + self._error(KeyError))
+            return
+        if not substitutes:
+            lines.append(pad + self._error(IndexError))
+            return
+
+        def branch(indent: int, substitute: SimpleType) -> None:
+            pad = "    " * indent
+            lines.append(f"{pad}text = {self._simple_value(substitute)}")
+            if substitute is not xsd_simple_type and substitute.name:
+                lines.append(f"{pad}attrib = {{XSI_TYPE: {substitute.name!r}}}")
+            else:
+                lines.append(f"{pad}attrib = {{}}")
+
+        if len(substitutes) == 1:
+            lines.append(f"{pad}randrange(1)")
+            branch(indent, substitutes[0])
+            return
+        i = self._variable()
+        lines.append(f"{pad}{i} = randrange({len(substitutes)})")
+        for n, substitute in enumerate(substitutes):
+            if n == len(substitutes) - 1:
+                lines.append(f"{pad}else:")
+            else:
+                lines.append(f"{pad}{'if' if n == 0 else 'elif'} {i} == {n}:")
+            branch(indent + 1, substitute)
+
+    def _complex_element(
+        self,
+        lines: list[str],
+        indent: int,
+        xsd_element: ElementDecl,
+        xsd_complex_type: ComplexType,
+        parent: str | None,
+    ) -> None:
+        """Mirrors `complex_type.generate_complex_element`"""
+        pad = "    " * indent
+        try:
+            substitutes = _complex_substitutes(self.schema, xsd_complex_type)
+        except KeyError:
+            lines.append(pad + self._error(KeyError))
+            return
+        if not substitutes:
+            lines.append(pad + self._error(IndexError))
+            return
+
+        # The head, children and xsi:type of every substitute
+        providers = xsd_element.attribute_providers
+        rows = [
+            (
+                f"h{self._complex_type(substitute, providers)}",
+                self._children_function(substitute),
+                substitute.name
+                if substitute is not xsd_complex_type and substitute.name
+                else None,
+            )
+            for substitute in substitutes
+        ]
+        head, children, xsi_type = rows[0]
+        if len(rows) == 1:
+            lines.append(f"{pad}randrange(1)")
+        else:
+            table = f"S{len(self.tables)}"
+            cells = ", ".join(f"({h}, {c}, {x!r})" for h, c, x in rows)
+            self.tables.append(f"{table} = ({cells},)")
+            draw = f"{table}[randrange({len(rows)})]"
+            lines.append(f"{pad}head, children, xsi_type = {draw}")
+            head = "head"
+        lines.append(f"{pad}attrib, text = {head}()")
+
+        if xsd_element.provider is not None:
+            lines.append(f"{pad}if text is not None:")
+            lines.append(f"{pad}    text = {self._constant(xsd_element.provider)}(rng)")
+        if len(rows) > 1:
+            lines.append(f"{pad}if xsi_type is not None:")
+            lines.append(f"{pad}    attrib[XSI_TYPE] = xsi_type")
+        elif xsi_type is not None:
+            lines.append(f"{pad}attrib[XSI_TYPE] = {xsi_type!r}")
+
+        self._create(lines, indent, repr(xsd_element.name), "attrib", parent)
+        if len(rows) > 1:
+            lines.append(f"{pad}if children is not None:")
+            lines.append(f"{pad}    children(e)")
+        elif children is not None:
+            lines.append(f"{pad}{children}(e)")
+
+
+def _simple_substitutes(
+    schema: CompiledSchema, xsd_simple_type: SimpleType
+) -> tuple[SimpleType, ...]:
+    if xsd_simple_type.name is None:
+        return (xsd_simple_type,)
+    return schema.simple_type_substitutes[xsd_simple_type.name]
+
+
+def _complex_substitutes(
+    schema: CompiledSchema, xsd_complex_type: ComplexType
+) -> tuple[ComplexType, ...]:
+    if xsd_complex_type.name is None:
+        return (xsd_complex_type,)
+    return schema.complex_type_substitutes[xsd_complex_type.name]
+
+
+def generate_source(
+    schema: CompiledSchema, xsd_element: ElementDecl
+) -> tuple[str, tuple[object, ...]]:
+    """
+    The source of the module generating documents rooted at `xsd_element`,
+    and the constants its `build` function takes: providers and error types.
+    """
+    writer = _ModuleWriter(schema)
+    source = writer.write(xsd_element)
+    return source, tuple(writer.constants)
+
+
+class _TreeIDRegistry(IDRegistry):
+    """
+    Resolves deferred IDREFs in a tree the way `idrefs.resolve_idrefs` does in
+    the events: the elements created from the first deferred IDREF on are held,
+    and their slots are filled as soon as an ID is generated.
+    """
+
+    __slots__ = ("held",)
+
+    def __init__(self, rng: random.Random) -> None:
+        super().__init__(rng)
+        self.held: list[tuple[ET.Element | None, ET.Element]] = []
+
+    def hold(self, parent: ET.Element | None, element: ET.Element) -> None:
+        self.held.append((parent, element))
+        if not self.ids:
+            return
+        for _, held in self.held:
+            if held.text in self.deferred:
+                held.text = self.rng.choice(self.ids)
+            for k, v in held.attrib.items():
+                if v in self.deferred:
+                    held.attrib[k] = self.rng.choice(self.ids)
+        self.deferred.clear()
+        self.held.clear()
+
+    def remove_slots(self) -> None:
+        """Leave out the IDREFs that are still deferred when the document ends"""
+        for parent, held in self.held:
+            if held.text in self.deferred:
+                if parent is None:
+                    raise ValueError()
+                parent.remove(held)
+                continue
+            for k, v in held.attrib.copy().items():
+                if v in self.deferred:
+                    del held.attrib[k]
+        self.deferred.clear()
+        self.held.clear()
+
+
+class SpecializedGenerator:
+    """
+    Generates the documents of one root element with a module emitted by `specialize`.
+    The documents are those `CompiledSchema.generate_element` generates for the same seed.
+    """
+
+    def __init__(
+        self,
+        schema: CompiledSchema,
+        xsd_element: ElementDecl,
+        source: str,
+        document: _Document,
+    ) -> None:
+        self.schema = schema
+        self.xsd_element = xsd_element
+        self.source = source
+        self._document = document
+
+    def generate(
+        self, rng: random.Random | None = None, budget: Budget | None = None
+    ) -> ET.ElementTree:
+        if rng is None:
+            rng = random.Random(random.getrandbits(64))
+        if budget is not None or type(rng) is not random.Random:
+            return self.schema.generate_element(self.xsd_element, rng, budget)
+
+        state = rng.getstate()
+        ids = _TreeIDRegistry(rng)
+        values = ValuePools(rng, self.schema.built_in_providers)
+        try:
+            root = self._document(rng, values.take, ids)
+        except RecursionError:
+            rng.setstate(state)
+            return self.schema.generate_element(self.xsd_element, rng)
+        if ids.deferred:
+            ids.remove_slots()
+        return ET.ElementTree(root)
+
+    def write(
+        self,
+        sink: BinaryIO,
+        indent: str | None = "  ",
+        rng: random.Random | None = None,
+        budget: Budget | None = None,
+    ) -> None:
+        """
+        Write a document to a binary sink like `CompiledSchema.write_element`.
+        The document is built as a tree first, so unlike the interpreter, the memory
+        it takes grows with its size: huge documents are better written by the
+        interpreter, which writes the elements while it generates them.
+        """
+        from . import writer
+
+        if budget is not None:
+            self.schema.write_element(self.xsd_element, sink, indent, rng, budget)
+            return
+        root = self.generate(rng).getroot()
+        if root is None:
+            raise ValueError()
+        xml_writer = writer.XMLWriter(sink, writer.output_prefixes(self.schema), indent)
+        writer.write_events(xml_writer, tree.tree_events(root))
+        xml_writer.close()
+
+
+# Modules already loaded by this process, by cache key
+_modules: dict[str, ModuleType] = {}
+_modules_lock = threading.Lock()
+
+
+def specialize(
+    schema: CompiledSchema,
+    xsd_element: ElementDecl,
+    cache_dir: str | PathLike[str] | None = None,
+) -> SpecializedGenerator:
+    """
+    Emit and load the module generating documents rooted at `xsd_element`.
+    Modules are keyed by a hash of their source, so equal schemas share a module.
+    With `cache_dir`, the module is written there and imported from there,
+    which lets later processes reuse its bytecode.
+    """
+
+    source, constants = generate_source(schema, xsd_element)
+    key = cache.cache_key(source.encode())
+    name = f"xsd2xml_generated_{key[:16]}"
+    path = None
+    if cache_dir is not None:
+        path = Path(cache_dir) / f"{name}.py"
+        if not path.exists():
+            cache._write_atomically(path, source.encode())
+    with _modules_lock:
+        module = _modules.get(key)
+        if module is None:
+            module = _modules[key] = _load_module(name, source, path)
+    return SpecializedGenerator(schema, xsd_element, source, module.build(constants))
+
+
+def _load_module(name: str, source: str, path: Path | None) -> ModuleType:
+    if path is None:
+        module = ModuleType(name)
+        exec(compile(source, f"<{name}>", "exec"), module.__dict__)
+        return module
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
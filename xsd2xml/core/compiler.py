@@ -0,0 +1,352 @@
+"""
+Compile a parsed XSD tree into the typed model of `model.py`.
+
+Constructs the generator does not support are compiled into `Unsupported`
+so that the error surfaces only when generation actually reaches them.
+"""
+
+import dataclasses
+
+from .etree import _Element, _ElementTree
+from . import attribute, helpers
+from .model import (
+    AnyAttribute,
+    AnyElement,
+    Attribute,
+    AttributeUse,
+    CompiledSchema,
+    ComplexContent,
+    ComplexContentExtension,
+    ComplexType,
+    Compositor,
+    ElementDecl,
+    ElementRef,
+    Facet,
+    ModelGroup,
+    Occurs,
+    Particle,
+    Restriction,
+    SimpleContentExtension,
+    SimpleType,
+    TypeDefinition,
+    TypeRef,
+    Unsupported,
+)
+from .builtins import BuiltIn
+from .utils import InvalidXSDError
+from .namespaces import xsd
+
+
+def compile_schema(xsd_tree: _ElementTree) -> CompiledSchema:
+    xsd_root = xsd_tree.getroot()
+
+    # Including the components of the included, imported and redefined documents
+    elements: dict[str, ElementDecl] = {}
+    simple_types: dict[str, SimpleType] = {}
+    complex_types: dict[str, ComplexType] = {}
+    for kind, name, component in xsd_tree.global_components():
+        match kind:
+            case xsd.element:
+                elements[name] = _compile_element_declaration(component)
+            case xsd.simpleType:
+                simple_types[name] = _compile_named_type(
+                    name, _compile_simple_type(component)
+                )
+            case xsd.complexType:
+                complex_types[name] = _compile_named_type(
+                    name, _compile_complex_type(component)
+                )
+
+    return CompiledSchema(
+        target_namespace=xsd_root.get("targetNamespace"),
+        namespaces=xsd_tree.namespaces,
+        elements=elements,
+        simple_types=simple_types,
+        complex_types=complex_types,
+        simple_type_substitutes=_index_substitutes(simple_types),
+        complex_type_substitutes=_index_substitutes(complex_types),
+    )
+
+
+def _index_substitutes[_T: (SimpleType, ComplexType)](
+    named_types: dict[str, _T],
+) -> dict[str, tuple[_T, ...]]:
+    """
+    Map every named type to the types an element of that type may be generated with:
+    its transitive derivatives followed by the type itself, leaving out abstract types.
+    """
+
+    directly_derived: dict[str, list[_T]] = {}
+    for named_type in named_types.values():
+        if named_type.base is None or named_type.base == named_type.name:
+            continue
+        directly_derived.setdefault(named_type.base, []).append(named_type)
+
+    def collect_derived_types(base_type: _T, seen: set[str]) -> list[_T]:
+        derived_types = []
+        for derived_type in directly_derived.get(base_type.name or "", []):
+            if derived_type.name in seen:
+                continue
+            seen.add(derived_type.name or "")
+            derived_types.append(derived_type)
+            derived_types += collect_derived_types(derived_type, seen)
+        return derived_types
+
+    substitutes: dict[str, tuple[_T, ...]] = {}
+    for name, named_type in named_types.items():
+        candidates = collect_derived_types(named_type, {name})
+        candidates.append(named_type)
+        substitutes[name] = tuple(t for t in candidates if not t.abstract)
+
+    return substitutes
+
+
+def _compile_named_type[_T: (SimpleType, ComplexType)](name: str, named_type: _T) -> _T:
+    """
+    Keep a type under the name it is looked up by, which differs for the
+    original of a redefined type
+    """
+    if named_type.name == name:
+        return named_type
+    return dataclasses.replace(named_type, name=name)
+
+
+def _compile_name(xsd_component: _Element) -> str | None:
+    if xsd_component.get("name") is None:
+        return None
+    return helpers.get_element_name(xsd_component)
+
+
+def _is_true(value: str | None) -> bool:
+    return value in ("true", "1")
+
+
+def _compile_occurs(xsd_particle: _Element) -> Occurs:
+    min_occurs = xsd_particle.get("minOccurs")
+    min_occurs = int(min_occurs) if min_occurs else 1
+
+    max_occurs = xsd_particle.get("maxOccurs")
+    if max_occurs == "unbounded":
+        return Occurs(min_occurs, None)
+    max_occurs = int(max_occurs) if max_occurs else 1
+
+    return Occurs(min_occurs, max_occurs)
+
+
+def _compile_type_name(type_name: str) -> BuiltIn | TypeRef:
+    if type_name in BuiltIn:
+        return BuiltIn(type_name)
+    return TypeRef(type_name)
+
+
+def _compile_particle(xsd_particle: _Element) -> Particle:
+    match xsd_particle.tag:
+        case xsd.element:
+            ref = xsd_particle.get("ref")
+            if ref is not None:
+                return ElementRef(ref, _compile_occurs(xsd_particle))
+            return _compile_element_declaration(xsd_particle)
+        case xsd.any:
+            return AnyElement(_compile_occurs(xsd_particle))
+        case xsd.sequence | xsd.choice | xsd.all:
+            return _compile_model_group(xsd_particle)
+        case xsd.group:
+            return _compile_group_reference(xsd_particle)
+        case _:
+            return Unsupported(NotImplementedError)
+
+
+def _compile_model_group(
+    xsd_model_group: _Element, occurs: Occurs | None = None
+) -> ModelGroup:
+    compositor = Compositor[xsd_model_group.tag.removeprefix("{" + xsd.__ns__ + "}")]
+    particles = tuple(_compile_particle(child) for child in xsd_model_group.children)
+    if occurs is None:
+        occurs = _compile_occurs(xsd_model_group)
+    return ModelGroup(compositor, particles, occurs)
+
+
+def _compile_group_reference(xsd_group: _Element) -> ModelGroup | Unsupported:
+    try:
+        xsd_group_definition = helpers._try_resolve_reference(xsd_group)
+    except InvalidXSDError:
+        return Unsupported(InvalidXSDError)
+
+    for child in xsd_group_definition.children:
+        if child.tag in (xsd.sequence, xsd.choice, xsd.all):
+            return _compile_model_group(child, _compile_occurs(xsd_group))
+
+    return Unsupported(InvalidXSDError)
+
+
+def _compile_element_declaration(xsd_element: _Element) -> ElementDecl:
+    return ElementDecl(
+        name=helpers.get_element_name(xsd_element),
+        type=_compile_element_type(xsd_element),
+        occurs=_compile_occurs(xsd_element),
+    )
+
+
+def _compile_element_type(xsd_element: _Element) -> TypeDefinition:
+    type_name = xsd_element.get("type")
+    if type_name is not None:
+        return _compile_type_name(type_name)
+
+    for child in xsd_element.children:
+        if child.tag == xsd.simpleType:
+            return _compile_simple_type(child)
+        if child.tag == xsd.complexType:
+            return _compile_complex_type(child)
+
+    # Elements without a type are of xsd:anyType
+    return Unsupported(NotImplementedError)
+
+
+def _compile_simple_type(xsd_simple_type: _Element) -> SimpleType:
+    name = _compile_name(xsd_simple_type)
+    abstract = _is_true(xsd_simple_type.get("abstract"))
+    child = next(xsd_simple_type.children, None)
+
+    if child is None or child.tag not in (xsd.list, xsd.union, xsd.restriction):
+        return SimpleType(name, Unsupported(InvalidXSDError), abstract)
+
+    if child.tag != xsd.restriction:
+        return SimpleType(name, Unsupported(NotImplementedError), abstract)
+
+    base = child.get("base")
+    return SimpleType(name, _compile_restriction(child), abstract, base)
+
+
+def _compile_restriction(xsd_restriction: _Element) -> Restriction | Unsupported:
+    base = xsd_restriction.get("base")
+    if base is None:
+        return Unsupported(InvalidXSDError)
+
+    is_type_user_defined = base not in BuiltIn
+    if is_type_user_defined:
+        return Unsupported(NotImplementedError)
+
+    enumerations: list[str] = []
+    facets: list[Facet] = []
+    for facet in xsd_restriction.children:
+        if facet.tag == xsd.enumeration:
+            value = facet.get("value")
+            if value is None:
+                return Unsupported(InvalidXSDError)
+            enumerations.append(value)
+        else:
+            kind = facet.tag.removeprefix("{" + xsd.__ns__ + "}")
+            facets.append(Facet(kind, facet.get("value")))
+
+    return Restriction(BuiltIn(base), tuple(enumerations), tuple(facets))
+
+
+def _compile_complex_type(xsd_complex_type: _Element) -> ComplexType:
+    name = _compile_name(xsd_complex_type)
+    abstract = _is_true(xsd_complex_type.get("abstract"))
+    main_child = xsd_complex_type.main_child
+
+    base = None
+    if main_child is not None and main_child.tag in (
+        xsd.simpleContent,
+        xsd.complexContent,
+    ):
+        restriction_or_extension = next(main_child.children, None)
+        if restriction_or_extension is not None:
+            base = restriction_or_extension.get("base")
+
+    try:
+        content = _compile_complex_content(main_child)
+        attributes = _compile_attributes(xsd_complex_type)
+    except InvalidXSDError:
+        content, attributes = Unsupported(InvalidXSDError), ()
+
+    return ComplexType(name, content, attributes, abstract, base)
+
+
+def _compile_complex_content(main_child: _Element | None) -> ComplexContent:
+    if main_child is None:
+        return None
+
+    match main_child.tag:
+        case xsd.sequence | xsd.choice | xsd.all:
+            return _compile_model_group(main_child)
+        case xsd.simpleContent:
+            return _compile_simple_content(main_child)
+        case xsd.complexContent:
+            return _compile_complex_content_derivation(main_child)
+        case _:
+            return Unsupported(InvalidXSDError)
+
+
+def _compile_simple_content(
+    xsd_simple_content: _Element,
+) -> SimpleContentExtension | Unsupported:
+    restriction_or_extension = next(xsd_simple_content.children, None)
+    if restriction_or_extension is None:
+        return Unsupported(InvalidXSDError)
+
+    match restriction_or_extension.tag:
+        case xsd.restriction:
+            return Unsupported(NotImplementedError)
+        case xsd.extension:
+            base = restriction_or_extension.get("base")
+            if base is None:
+                return Unsupported(InvalidXSDError)
+            attributes = _compile_attributes(restriction_or_extension)
+            return SimpleContentExtension(_compile_type_name(base), attributes)
+
+    return Unsupported(InvalidXSDError)
+
+
+def _compile_complex_content_derivation(
+    xsd_complex_content: _Element,
+) -> ComplexContentExtension | Unsupported:
+    restriction_or_extension = next(xsd_complex_content.children, None)
+    if restriction_or_extension is None:
+        return Unsupported(InvalidXSDError)
+
+    match restriction_or_extension.tag:
+        case xsd.restriction:
+            return Unsupported(NotImplementedError)
+        case xsd.extension:
+            base = restriction_or_extension.get("base")
+            if base is None:
+                return Unsupported(InvalidXSDError)
+            extension = _compile_complex_type(restriction_or_extension)
+            return ComplexContentExtension(TypeRef(base), extension)
+
+    return Unsupported(InvalidXSDError)
+
+
+def _compile_attributes(
+    element_with_xsd_attributes: _Element,
+) -> tuple[Attribute, ...]:
+    xsd_attributes = attribute._recursively_collect_attributes(
+        element_with_xsd_attributes
+    )
+    return tuple(_compile_attribute(xsd_attribute) for xsd_attribute in xsd_attributes)
+
+
+def _compile_attribute(xsd_attribute: _Element) -> Attribute:
+    required = xsd_attribute.get("use") == "required"
+    if xsd_attribute.tag == xsd.anyAttribute:
+        return AnyAttribute(required)
+
+    name = xsd_attribute.get("name")
+    if name is None:
+        # A reference to a global attribute, e.g. xml:lang, which is in the namespace of its schema
+        name = xsd_attribute.get("ref", "")
+        xsd_global_attribute = xsd_attribute.lookup(xsd.attribute, name)
+        if xsd_global_attribute is None:
+            return AttributeUse(name, Unsupported(InvalidXSDError), required)
+        xsd_attribute = xsd_global_attribute
+
+    type = xsd_attribute.get("type")
+    if type is not None:
+        return AttributeUse(name, _compile_type_name(type), required)
+
+    xsd_simple_type = xsd_attribute.find(xsd.simpleType)
+    if xsd_simple_type is None:
+        return AttributeUse(name, Unsupported(InvalidXSDError), required)
+    return AttributeUse(name, _compile_simple_type(xsd_simple_type), required)
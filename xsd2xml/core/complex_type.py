@@ -1,212 +1,184 @@
-import random
-from typing import Generator
+import itertools
 
-from .etree import _Element
-from . import placeholder as ph, attribute, types, helpers
+from . import attribute
+from .context import GenerationContext
+from .engine import Work
+from .events import END, Start
+from .profile import Phase
 from .utils import InvalidXSDError
-from .namespaces import xsi, xsd
-from .types import find_type_defintion_by_name
+from .namespaces import xsi
+from .model import (
+    Provider,
+    AnyElement,
+    ComplexContentExtension,
+    ComplexType,
+    Compositor,
+    ElementDecl,
+    ElementRef,
+    ModelGroup,
+    Particle,
+    SimpleContentExtension,
+    SimpleType,
+    Unsupported,
+)
 from .simple_type import generate_simple_type
 from .builtins import BuiltIn, random_built_in_type
 
+# The attributes and text of an element, and its lazily generated children
+type _Content = tuple[dict[str, str], str | None, Work]
 
-def _find_complex_type_definition(xsd_element: _Element) -> _Element:
-    xsd_complex_type = types._find_type_definition_for_element(xsd_element)
-    if (
-        not isinstance(xsd_complex_type, _Element)
-        or xsd_complex_type.tag != xsd.complexType
-    ):
-        raise InvalidXSDError()
-    return xsd_complex_type
-
-
-def generate_complex_element(xsd_element: _Element) -> ph.Element:
-    xsd_complex_type = _find_complex_type_definition(xsd_element)
-    element_name = helpers.get_element_name(xsd_element)
-
-    placholder = _generate_complex_type_or_derivative(xsd_complex_type)
-    placholder.tag = element_name
-
-    return placholder
-
-
-def _equal_complex_types(type_1: _Element, type_2: _Element) -> bool:
-    t1_name = helpers._get_name_attribute(type_1)
-    t2_name = helpers._get_name_attribute(type_2)
-    return t1_name == t2_name
-
-
-def _is_directly_derived_from(base_type: _Element, derived_type: _Element) -> bool:
-    derived_main_child = next(
-        filter(attribute._is_not_xsd_attribute, derived_type.children), None
-    )
-
-    if derived_main_child is None:
-        return False
-
-    content_tags = (xsd.simpleContent, xsd.complexContent)
-    if derived_main_child.tag not in content_tags:
-        return False
 
-    extension_or_restriction = next(derived_main_child.children)
-    base_type_name = helpers._get_name_attribute(base_type)
-    return extension_or_restriction.get("base") == base_type_name
-
-
-def _collect_derived_types(
-    xsd_complex_type: _Element,
-) -> Generator[_Element, None, None]:
-    all_complex_types = xsd_complex_type.root.findall(xsd.complexType)
-
-    for complex_type in all_complex_types:
-        # A complex type is not a derivative of itself
-        if _equal_complex_types(xsd_complex_type, complex_type):
-            continue
-        if not _is_directly_derived_from(xsd_complex_type, complex_type):
-            continue
-
-        yield complex_type
-
-        derived_from_derived_type = _collect_derived_types(complex_type)
-        for type in derived_from_derived_type:
-            yield type
-
-
-def _generate_complex_type_or_derivative(xsd_complex_type: _Element) -> ph.Element:
+def generate_complex_element(
+    context: GenerationContext,
+    xsd_element: ElementDecl,
+    xsd_complex_type: ComplexType,
+) -> Work:
     """
-    Generate a placeholder Element that has type `xsd_complex_type`
+    Generate an element that has type `xsd_complex_type`
     or a complex type that extends or restricts it.
     """
 
-    derivatives = list(_collect_derived_types(xsd_complex_type))
-    is_abstract = xsd_complex_type.get("abstract", False)
-    if not is_abstract:
-        derivatives.append(xsd_complex_type)
+    profile = context.profile
+    if profile is not None:
+        profile.enter(Phase.derivation_search)
+    derivatives = _find_substitutes(context, xsd_complex_type)
+    if context.coverage is None:
+        random_complex_type = context.random.choice(derivatives)
+    else:
+        i = context.coverage.choose(context.random, xsd_complex_type, len(derivatives))
+        random_complex_type = derivatives[i]
+    if profile is not None:
+        profile.leave()
+        if random_complex_type.name is not None:
+            profile.set_type(("complexType", random_complex_type.name))
+
+    attrib, text, children = _generate_complex_type(
+        context, random_complex_type, xsd_element.attribute_providers
+    )
+
+    if xsd_element.provider is not None and text is not None:
+        text = xsd_element.provider(context.random)
+
+    if random_complex_type is not xsd_complex_type and random_complex_type.name:
+        attrib[xsi.type] = random_complex_type.name
 
-    random_complex_type = random.choice(derivatives)
-    created_element = _generate_complex_type(random_complex_type)
+    yield Start(xsd_element.name, attrib, text)
+    yield children
+    yield END
 
-    if random_complex_type != xsd_complex_type:
-        name = helpers.get_element_name(random_complex_type)
-        created_element.attrib[xsi.type] = name
 
-    return created_element
+def _find_substitutes(
+    context: GenerationContext, xsd_complex_type: ComplexType
+) -> tuple[ComplexType, ...]:
+    if xsd_complex_type.name is None:
+        return (xsd_complex_type,)
+    return context.schema.complex_type_substitutes[xsd_complex_type.name]
 
 
-def _generate_complex_type(xsd_complex_type: _Element) -> ph.Element:
+def _generate_complex_type(
+    context: GenerationContext,
+    xsd_complex_type: ComplexType,
+    providers: dict[str, Provider] | None = None,
+) -> _Content:
     """
-    Generate a placeholder Element with a complex type.
+    Generate the content of an element with a complex type.
+    The attributes are generated right away, the children only when they are consumed.
     This function does not look for any derivatives of the given complex type.
+    `providers` are the attribute providers of the element.
     """
-    main_child = next(
-        filter(attribute._is_not_xsd_attribute, xsd_complex_type.children), None
-    )
-
-    complex_type_is_empty = main_child is None
-    if complex_type_is_empty:
-        return ph.Element()
-
-    match main_child.tag:
-        case xsd.sequence | xsd.choice | xsd.all:
-            children = _recurse_indicator(main_child)
-            created_element = ph.Element()
-            created_element.children.extend(children)
-            created_element.attrib = attribute._generate_attributes(xsd_complex_type)
-        case xsd.simpleContent:
-            created_element = _generate_simple_content(main_child)
-        case xsd.complexContent:
-            created_element = _generate_complex_content(main_child)
-        case _:
-            raise InvalidXSDError()
 
-    return created_element
-
-
-def _recurse_indicator(indicator: _Element) -> list[ph.Element]:
+    match xsd_complex_type.content:
+        case None:
+            attrib = attribute._generate_attributes(
+                context, xsd_complex_type.attributes, providers
+            )
+            return attrib, None, iter(())
+        case ModelGroup() as model_group:
+            attrib = attribute._generate_attributes(
+                context, xsd_complex_type.attributes, providers
+            )
+            return attrib, None, _recurse_indicator(context, model_group)
+        case SimpleContentExtension() as extension:
+            return _generate_simple_content_extension(context, extension, providers)
+        case ComplexContentExtension() as extension:
+            return _generate_complex_content_extension(context, extension, providers)
+        case Unsupported(error):
+            raise error()
+
+
+def _recurse_indicator(context: GenerationContext, indicator: Particle) -> Work:
     from . import element
 
-    result: list[ph.Element] = []
-    match indicator.tag:
+    match indicator:
         # Base conditions
-        case xsd.element:
-            return element.generate_element(indicator)
-        case xsd.any:
-            return element._generate_any_element(indicator)
+        case ElementDecl() | ElementRef():
+            yield element.generate_element(context, indicator)
+        case AnyElement():
+            yield element._generate_any_element(context, indicator)
         # Recursive conditions
-        case xsd.sequence:
-            for child in indicator.children:
-                result.extend(_recurse_indicator(child))
-        case xsd.choice:
-            choice = random.choice(list(indicator.children))
-            result = _recurse_indicator(choice)
-        case xsd.all:
-            for child in indicator.children:
-                result.extend(_recurse_indicator(child))
-            random.shuffle(result)
-        case _:
-            raise NotImplementedError()
-
-    return result
-
-
-def _generate_simple_content(xsd_simple_content: _Element) -> ph.Element:
-    restriction_or_extension = next(xsd_simple_content.children)
-
-    match restriction_or_extension.tag:
-        case xsd.restriction:
-            raise NotImplementedError()
-        case xsd.extension:
-            return _generate_simple_content_extension(restriction_or_extension)
-
-    raise InvalidXSDError()
-
-
-def _generate_simple_content_extension(xsd_extension) -> ph.Element:
-    base = xsd_extension.get("base")
-    if base is None:
-        raise InvalidXSDError()
-
-    xsd_type = find_type_defintion_by_name(xsd_extension.root, base)
+        case ModelGroup(Compositor.sequence):
+            for child in indicator.particles:
+                yield _recurse_indicator(context, child)
+        case ModelGroup(Compositor.choice):
+            particles = indicator.particles
+            if context.coverage is None:
+                choice = context.random.choice(particles)
+            else:
+                choice = particles[
+                    context.coverage.choose(context.random, indicator, len(particles))
+                ]
+            yield _recurse_indicator(context, choice)
+        case ModelGroup(Compositor.all):
+            # Particles of an all group occur at most once,
+            # so shuffling them shuffles the generated elements
+            particles = list(indicator.particles)
+            context.random.shuffle(particles)
+            for child in particles:
+                yield _recurse_indicator(context, child)
+        case Unsupported(error):
+            raise error()
+
+
+def _generate_simple_content_extension(
+    context: GenerationContext,
+    xsd_extension: SimpleContentExtension,
+    providers: dict[str, Provider] | None,
+) -> _Content:
+    xsd_type = context.schema.find_type(xsd_extension.base)
 
     if isinstance(xsd_type, BuiltIn):
-        text = random_built_in_type(xsd_type)
-        ph_element = ph.Element(text=text)
-    elif xsd_type.tag == xsd.simplType:
-        ph_element = generate_simple_type(xsd_type)
-    elif xsd_type.tag == xsd.complexType:
-        ph_element = _generate_complex_type(xsd_type)
+        if context.profile is not None:
+            context.profile.enter(Phase.value_generation)
+        text = random_built_in_type(xsd_type, context.values, context.ids)
+        if context.profile is not None:
+            context.profile.leave()
+        attrib, children = {}, iter(())
+    elif isinstance(xsd_type, SimpleType):
+        text = generate_simple_type(context, xsd_type)
+        attrib, children = {}, iter(())
     else:
-        raise AssertionError()
-
-    ph_element.attrib |= attribute._generate_attributes(xsd_extension)
-    return ph_element
-
-
-def _generate_complex_content(xsd_complex_content: _Element) -> ph.Element:
-    restriction_or_extension = next(xsd_complex_content.children)
+        attrib, text, children = _generate_complex_type(context, xsd_type, providers)
 
-    match restriction_or_extension.tag:
-        case xsd.restriction:
-            raise NotImplementedError()
-        case xsd.extension:
-            return _generate_complex_content_extension(restriction_or_extension)
-
-    raise InvalidXSDError()
+    attrib |= attribute._generate_attributes(
+        context, xsd_extension.attributes, providers
+    )
+    return attrib, text, children
 
 
-def _generate_complex_content_extension(xsd_extension: _Element) -> ph.Element:
-    base = xsd_extension.get("base")
-    if base is None:
-        raise InvalidXSDError()
-    xsd_type = find_type_defintion_by_name(xsd_extension.root, base)
+def _generate_complex_content_extension(
+    context: GenerationContext,
+    xsd_extension: ComplexContentExtension,
+    providers: dict[str, Provider] | None,
+) -> _Content:
+    xsd_type = context.schema.find_type(xsd_extension.base)
 
-    if not (isinstance(xsd_type, _Element) and xsd_type.tag == xsd.complexType):
+    if not isinstance(xsd_type, ComplexType):
         raise InvalidXSDError()
 
-    ph_element = _generate_complex_type(xsd_type)
-    ph_extension_element = _generate_complex_type(xsd_extension)
-
-    ph_element.children += ph_extension_element.children
-    ph_element.attrib |= ph_extension_element.attrib
+    attrib, text, children = _generate_complex_type(context, xsd_type, providers)
+    extension_attrib, _, extension_children = _generate_complex_type(
+        context, xsd_extension.extension, providers
+    )
 
-    return ph_element
+    attrib |= extension_attrib
+    return attrib, text, itertools.chain(children, extension_children)
@@ -0,0 +1,28 @@
+from dataclasses import dataclass, field
+import random
+
+from .budget import DocumentBudget
+from .coverage import Coverage
+from .idrefs import IDRegistry
+from .model import CompiledSchema
+from .profile import Profile
+from .values import ValuePools
+
+
+@dataclass(slots=True)
+class GenerationContext:
+    """
+    The state of the generation of one document, passed to every generator.
+    """
+
+    schema: CompiledSchema
+    random: random.Random
+    budget: DocumentBudget | None = None
+    profile: Profile | None = None
+    coverage: Coverage | None = None
+    ids: IDRegistry = field(init=False)
+    values: ValuePools = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.ids = IDRegistry(self.random)
+        self.values = ValuePools(self.random, self.schema.built_in_providers)
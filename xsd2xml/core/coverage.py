@@ -0,0 +1,438 @@
+"""
+Coverage of a schema by generated documents, and generation steered by it.
+
+A `Coverage` enumerates what the documents rooted at one element can contain:
+the elements and attributes of every content model, the branches of choices,
+the enumerated values of simple types and the types that can replace a named
+type through `xsi:type`. Each of them has a path, e.g. `eventComplexType/eventType`,
+interned as a small integer: the bit of the path in the `covered` mask.
+
+Every decision also knows the mask of the paths reachable through each of its
+options, recursive types included. When generation is given a coverage, choices,
+derived types and enumerations pick among the options that still reach uncovered
+paths, and optional elements and attributes are generated while they do. Options
+that cannot be generated, e.g. unsupported constructs, are avoided. Decisions
+whose options are all covered stay uniform. Covering a schema then takes about
+as many documents as it has branches, instead of waiting for uniform sampling to
+draw its least likely combinations.
+"""
+
+from random import Random
+from typing import Callable, Mapping
+
+from .builtins import BuiltIn
+from .model import (
+    AnyAttribute,
+    AnyElement,
+    Attribute,
+    AttributeUse,
+    ComplexContentExtension,
+    ComplexType,
+    Compositor,
+    CompiledSchema,
+    ElementDecl,
+    ElementRef,
+    ModelGroup,
+    Particle,
+    Restriction,
+    SimpleContentExtension,
+    SimpleType,
+    TypeDefinition,
+    TypeRef,
+    Unsupported,
+)
+from .utils import InvalidXSDError
+
+# The bit of an item, 0 for an option that is not an item itself, and the mask
+# of the items reachable through it. None for an option that cannot be generated.
+type _Option = tuple[int, int] | None
+
+
+def _local_name(name: str) -> str:
+    return name.rpartition("}")[2]
+
+
+class Coverage:
+    """
+    The paths of a schema that the documents generated with this coverage have produced.
+
+    With `guided`, generation prefers the options that lead to uncovered paths.
+    Without it, the documents are the same as without a coverage and the coverage
+    only measures them.
+    """
+
+    def __init__(
+        self, schema: CompiledSchema, element_name: str, guided: bool = True
+    ) -> None:
+        self.schema = schema
+        self.guided = guided
+        self.paths: list[str] = []
+        """The paths by their interned ID"""
+        self.covered = 0
+        """The mask of the covered paths, bit `i` for `paths[i]`"""
+        self._ids: dict[tuple[str, int, int], int] = {}
+        self._items: dict[int, tuple[int, int]] = {}
+        """Optional elements and attributes by `id`"""
+        self._decisions: dict[int, tuple[_Option, ...]] = {}
+        """The options of choices, substitutions and enumerations by `id`"""
+        _Walk(self).run(schema.find_global_element(element_name))
+
+    @property
+    def total(self) -> int:
+        return len(self.paths)
+
+    @property
+    def count(self) -> int:
+        return self.covered.bit_count()
+
+    @property
+    def ratio(self) -> float:
+        return self.count / self.total if self.paths else 1.0
+
+    @property
+    def complete(self) -> bool:
+        return self.count == self.total
+
+    def uncovered(self) -> list[str]:
+        return [path for i, path in enumerate(self.paths) if not self.covered >> i & 1]
+
+    def wants(self, item: Particle | Attribute) -> bool:
+        """Whether generating the optional `item` would cover new paths"""
+        if not self.guided:
+            return False
+        option = self._items.get(id(item))
+        return option is not None and option[1] & ~self.covered != 0
+
+    def cover(self, item: ElementDecl | ElementRef | AttributeUse) -> None:
+        option = self._items.get(id(item))
+        if option is not None:
+            self.covered |= option[0]
+
+    def choose(
+        self,
+        rng: Random,
+        decision: ModelGroup | ComplexType | SimpleType | Restriction,
+        n: int,
+    ) -> int:
+        """
+        The index of the option taken among the `n` options of `decision`:
+        the particles of a choice, the substitutes of a type or enumerated values.
+        """
+        options = self._decisions.get(id(decision))
+        if options is None:
+            return rng.randrange(n)
+
+        if self.guided:
+            uncovered = [
+                i
+                for i, option in enumerate(options)
+                if option is not None and option[1] & ~self.covered
+            ]
+            if not uncovered:
+                uncovered = [i for i, option in enumerate(options) if option is not None]
+            index = rng.choice(uncovered) if uncovered else rng.randrange(n)
+        else:
+            index = rng.randrange(n)
+
+        option = options[index]
+        if option is not None:
+            self.covered |= option[0]
+        return index
+
+    def __str__(self) -> str:
+        return f"{self.count}/{self.total} schema paths covered ({self.ratio:.1%})"
+
+
+class _Walk:
+    """
+    Interns the paths reachable from a root element and computes the masks of
+    the options of every decision. Recursive types are walked again until their
+    masks stop growing.
+    """
+
+    def __init__(self, coverage: Coverage) -> None:
+        self.coverage = coverage
+        self.schema = coverage.schema
+        self.masks: dict[int, int | None] = {}
+        self.done: set[int] = set()
+        self.visiting: set[int] = set()
+        self.changed = False
+        self.choice_numbers: dict[int, int] = {}
+        self.owner_choices: dict[str, int] = {}
+
+    def run(self, root: ElementDecl) -> None:
+        while True:
+            self.done.clear()
+            self.changed = False
+            name = _local_name(root.name)
+            reach = self.element_type(root, name)
+            if reach is not None:
+                bit = self.bit(("element", id(root), 0), name)
+                self.coverage._items[id(root)] = (bit, reach | bit)
+            if not self.changed:
+                return
+
+    def bit(self, key: tuple[str, int, int], path: str) -> int:
+        ids = self.coverage._ids
+        i = ids.get(key)
+        if i is None:
+            i = ids[key] = len(self.coverage.paths)
+            self.coverage.paths.append(path)
+        return 1 << i
+
+    def memo(self, component: object, compute: Callable[[], int | None]) -> int | None:
+        key = id(component)
+        if key in self.done:
+            return self.masks[key]
+        if key in self.visiting:
+            # A recursive reference, completed by the next walk
+            return self.masks.get(key, 0)
+
+        self.visiting.add(key)
+        mask = compute()
+        self.visiting.discard(key)
+        self.done.add(key)
+        if key not in self.masks or self.masks[key] != mask:
+            self.changed = True
+        self.masks[key] = mask
+        return mask
+
+    def find_type(
+        self, type_definition: TypeDefinition
+    ) -> BuiltIn | SimpleType | ComplexType | None:
+        if isinstance(type_definition, Unsupported):
+            return None
+        try:
+            return self.schema.find_type(type_definition)
+        except InvalidXSDError:
+            return None
+
+    def element_type(self, xsd_element: ElementDecl, owner: str) -> int | None:
+        xsd_type = self.find_type(xsd_element.type)
+        if xsd_element.provider is not None and isinstance(
+            xsd_type, (BuiltIn, SimpleType)
+        ):
+            return 0
+        match xsd_type:
+            case BuiltIn():
+                return 0
+            case SimpleType():
+                return self.substitution(
+                    xsd_type,
+                    self.schema.simple_type_substitutes,
+                    self.simple_type,
+                    owner,
+                )
+            case ComplexType():
+                return self.substitution(
+                    xsd_type,
+                    self.schema.complex_type_substitutes,
+                    self.complex_type,
+                    owner,
+                )
+            case None:
+                return None
+
+    def substitution[T: (SimpleType, ComplexType)](
+        self,
+        xsd_type: T,
+        substitutes: Mapping[str, tuple[T, ...]],
+        walk_type: Callable[[T, str], int | None],
+        owner: str,
+    ) -> int | None:
+        if xsd_type.name is None:
+            return walk_type(xsd_type, owner)
+
+        base = _local_name(xsd_type.name)
+        options: list[_Option] = []
+        for substitute in substitutes[xsd_type.name]:
+            name = _local_name(substitute.name or "")
+            reach = walk_type(substitute, name)
+            if reach is None:
+                options.append(None)
+                continue
+            bit = 0
+            if substitute is not xsd_type:
+                key = ("type", id(xsd_type), id(substitute))
+                bit = self.bit(key, f"{base}[xsi:type={name}]")
+            options.append((bit, reach | bit))
+        return self.decision(xsd_type, options)
+
+    def decision(self, component: object, options: list[_Option]) -> int | None:
+        self.coverage._decisions[id(component)] = tuple(options)
+        if all(option is None for option in options):
+            return None
+        mask = 0
+        for option in options:
+            if option is not None:
+                mask |= option[1]
+        return mask
+
+    def simple_type(self, xsd_simple_type: SimpleType, owner: str) -> int | None:
+        return self.memo(
+            xsd_simple_type, lambda: self._simple_type(xsd_simple_type, owner)
+        )
+
+    def _simple_type(self, xsd_simple_type: SimpleType, owner: str) -> int | None:
+        if xsd_simple_type.provider is not None:
+            return 0
+        match xsd_simple_type.content:
+            case Restriction(enumerations=enumerations) as restriction if enumerations:
+                options: list[_Option] = []
+                for i, value in enumerate(enumerations):
+                    bit = self.bit(("enumeration", id(restriction), i), f"{owner}={value}")
+                    options.append((bit, bit))
+                return self.decision(restriction, options)
+            case Restriction(facets=facets) if facets:
+                return None
+            case Restriction():
+                return 0
+            case Unsupported():
+                return None
+
+    def complex_type(self, xsd_complex_type: ComplexType, owner: str) -> int | None:
+        return self.memo(
+            xsd_complex_type, lambda: self._complex_type(xsd_complex_type, owner)
+        )
+
+    def _complex_type(self, xsd_complex_type: ComplexType, owner: str) -> int | None:
+        attributes = self.attributes(xsd_complex_type.attributes, owner)
+        match xsd_complex_type.content:
+            case None:
+                content = 0
+            case ModelGroup() as model_group:
+                content = self.particle(model_group, owner)
+            case SimpleContentExtension(base, extension_attributes):
+                content = self.simple_content(base, owner)
+                extension = self.attributes(extension_attributes, owner)
+                if content is not None and extension is not None:
+                    content |= extension
+                else:
+                    content = None
+            case ComplexContentExtension(base, extension):
+                base_type = self.find_type(base)
+                content = None
+                if isinstance(base_type, ComplexType):
+                    content = self.complex_type(base_type, _local_name(base.name))
+                    added = self.complex_type(extension, owner)
+                    content = None if content is None or added is None else content | added
+            case Unsupported():
+                content = None
+
+        if attributes is None or content is None:
+            return None
+        return attributes | content
+
+    def simple_content(self, base: BuiltIn | TypeRef, owner: str) -> int | None:
+        base_type = self.find_type(base)
+        match base_type:
+            case BuiltIn():
+                return 0
+            case SimpleType():
+                return self.simple_type(base_type, _local_name(base_type.name or owner))
+            case ComplexType():
+                return self.complex_type(base_type, _local_name(base_type.name or owner))
+            case None:
+                return None
+
+    def attributes(self, xsd_attributes: tuple[Attribute, ...], owner: str) -> int | None:
+        mask = 0
+        for xsd_attribute in xsd_attributes:
+            if isinstance(xsd_attribute, AnyAttribute):
+                if xsd_attribute.required:
+                    return None
+                continue
+
+            path = f"{owner}/@{_local_name(xsd_attribute.name)}"
+            reach = self.attribute_type(xsd_attribute, path)
+            if reach is None:
+                if xsd_attribute.required:
+                    return None
+                continue
+            bit = self.bit(("attribute", id(xsd_attribute), 0), path)
+            self.coverage._items[id(xsd_attribute)] = (bit, reach | bit)
+            mask |= reach | bit
+        return mask
+
+    def attribute_type(self, xsd_attribute: AttributeUse, path: str) -> int | None:
+        if xsd_attribute.provider is not None:
+            return 0
+        xsd_type = self.find_type(xsd_attribute.type)
+        match xsd_type:
+            case BuiltIn():
+                return 0
+            case SimpleType():
+                return self.simple_type(xsd_type, _local_name(xsd_type.name or path))
+            case _:
+                return None
+
+    def particle(self, particle: Particle, owner: str) -> int | None:
+        match particle:
+            case ElementDecl() | ElementRef():
+                try:
+                    xsd_element = self.schema.find_element(particle)
+                except InvalidXSDError:
+                    return None
+                name = _local_name(xsd_element.name)
+                path = f"{owner}/{name}"
+                # The anonymous type of a global element is shared by its references
+                type_owner = path if isinstance(particle, ElementDecl) else name
+                reach = self.element_type(xsd_element, type_owner)
+                if reach is None:
+                    return None
+                bit = self.bit(("element", id(particle), 0), path)
+                self.coverage._items[id(particle)] = (bit, reach | bit)
+                return reach | bit
+            case AnyElement():
+                return 0
+            case ModelGroup(Compositor.choice):
+                return self.choice(particle, owner)
+            case ModelGroup():
+                mask = 0
+                for child in particle.particles:
+                    reach = self.particle(child, owner)
+                    if reach is not None:
+                        mask |= reach
+                    elif _required(child):
+                        return None
+                return mask
+            case Unsupported():
+                return None
+
+    def choice(self, model_group: ModelGroup, owner: str) -> int | None:
+        number = self.choice_numbers.get(id(model_group))
+        if number is None:
+            number = self.owner_choices[owner] = self.owner_choices.get(owner, 0) + 1
+            self.choice_numbers[id(model_group)] = number
+
+        options: list[_Option] = []
+        for i, child in enumerate(model_group.particles):
+            reach = self.particle(child, owner)
+            if reach is None:
+                options.append(None)
+                continue
+            key = ("branch", id(model_group), i)
+            bit = self.bit(key, f"{owner}/choice[{number}]={_branch_label(child, i)}")
+            options.append((bit, reach | bit))
+        return self.decision(model_group, options)
+
+
+def _required(particle: Particle) -> bool:
+    # Model groups are generated once whatever their occurrences
+    if isinstance(particle, (ElementDecl, ElementRef, AnyElement)):
+        return particle.occurs.min > 0
+    return True
+
+
+def _branch_label(particle: Particle, i: int) -> str:
+    match particle:
+        case ElementDecl(name):
+            return _local_name(name)
+        case ElementRef(ref):
+            return _local_name(ref)
+        case AnyElement():
+            return "any"
+        case ModelGroup(compositor):
+            return f"{compositor.name}[{i + 1}]"
+        case Unsupported():
+            return f"unsupported[{i + 1}]"
@@ -1,52 +1,136 @@
-import random
+from typing import Callable
 
 from .utils import InvalidXSDError
-from .etree import _Element
+from .model import (
+    AnyElement,
+    ComplexType,
+    ElementDecl,
+    ElementRef,
+    Occurs,
+    SimpleType,
+)
 
-from . import types, placeholder as ph, builtins, complex_type, helpers, simple_type
+from . import builtins, complex_type, events, simple_type
 from .builtins import BuiltIn
-from .namespaces import xsd
+from .context import GenerationContext
+from .engine import Work
+from .profile import Phase
 
 
-def generate_element(xsd_element: _Element) -> list[ph.Element]:
-    random_occurs = _get_random_occurs(xsd_element)
-    xsd_element = helpers._try_resolve_reference(xsd_element)
-    type_definition = types._find_type_definition_for_element(xsd_element)
+def generate_element(
+    context: GenerationContext, xsd_element: ElementDecl | ElementRef
+) -> Work:
+    """
+    Generate a random number of occurrences of `xsd_element`.
+    The next occurrence is only generated once the previous one is consumed.
+    """
 
-    if isinstance(type_definition, BuiltIn):
-        generate_element_fn = _generate_built_in_element
-    elif type_definition.tag == xsd.simpleType:
-        generate_element_fn = simple_type.generate_simple_element
-    elif type_definition.tag == xsd.complexType:
-        generate_element_fn = complex_type.generate_complex_element
-    else:
-        raise InvalidXSDError()
+    occurs = xsd_element.occurs
+    random_occurs = _get_random_occurs(context, occurs)
+    particle = xsd_element
+    coverage = context.coverage
+    if coverage is not None and random_occurs == 0 and occurs.max != 0:
+        # Generate an optional element while it leads to uncovered paths
+        if not _budget_ran_out(context, 0, occurs) and coverage.wants(particle):
+            random_occurs = 1
+
+    profile = context.profile
+    if profile is not None:
+        profile.enter(Phase.reference_lookup)
+    xsd_element = context.schema.find_element(xsd_element)
+    generate_element_fn = _find_element_generator(context, xsd_element)
+    if profile is not None:
+        profile.leave()
+
+    for i in range(random_occurs):
+        if _budget_ran_out(context, i, occurs):
+            break
+        if coverage is not None and i == 0:
+            coverage.cover(particle)
+        if profile is not None:
+            profile.open_element(xsd_element.name)
+        yield generate_element_fn()
+
+
+def generate_single_element(
+    context: GenerationContext, xsd_element: ElementDecl
+) -> Work:
+    """
+    Generate exactly one occurrence of `xsd_element`, e.g. the root of a document.
+    """
 
-    return [generate_element_fn(xsd_element) for _ in range(random_occurs)]
+    if context.profile is not None:
+        context.profile.open_element(xsd_element.name)
+    if context.coverage is not None:
+        context.coverage.cover(xsd_element)
+    return _find_element_generator(context, xsd_element)()
 
 
-def _generate_built_in_element(xsd_element: _Element) -> ph.Element:
-    name = helpers.get_element_name(xsd_element)
-    generated_element = ph.Element(tag=name)
-    xsd_type = xsd_element.get("type")
-    if xsd_type is None or xsd_type not in BuiltIn:
-        raise InvalidXSDError()
-    generated_element.text = builtins.random_built_in_type(BuiltIn(xsd_type))
-    return generated_element
+def _find_element_generator(
+    context: GenerationContext, xsd_element: ElementDecl
+) -> Callable[[], Work]:
+    type_definition = context.schema.find_type(xsd_element.type)
 
+    provider = xsd_element.provider
+    if provider is not None and isinstance(type_definition, (BuiltIn, SimpleType)):
+        if simple_type.is_id_type(context.schema, type_definition):
+            # Provided IDs are referred to like generated ones
+            return lambda: events.leaf(
+                xsd_element.name, context.ids.register(provider(context.random))
+            )
+        return lambda: events.leaf(xsd_element.name, provider(context.random))
+    if isinstance(type_definition, BuiltIn):
+        return lambda: _generate_built_in_element(
+            context, xsd_element, type_definition
+        )
+    if isinstance(type_definition, SimpleType):
+        return lambda: simple_type.generate_simple_element(
+            context, xsd_element, type_definition
+        )
+    if isinstance(type_definition, ComplexType):
+        return lambda: complex_type.generate_complex_element(
+            context, xsd_element, type_definition
+        )
+    raise InvalidXSDError()
+
+
+def _generate_built_in_element(
+    context: GenerationContext, xsd_element: ElementDecl, xsd_type: BuiltIn
+) -> Work:
+    if context.profile is not None:
+        context.profile.enter(Phase.value_generation)
+    text = builtins.random_built_in_type(xsd_type, context.values, context.ids)
+    if context.profile is not None:
+        context.profile.leave()
+    return events.leaf(xsd_element.name, text)
 
-def _generate_any_element(xsd_any: _Element) -> list[ph.Element]:
+
+def _generate_any_element(
+    context: GenerationContext, xsd_any: AnyElement
+) -> Work:
     # TODO: add something with a namespace
-    random_occurs = _get_random_occurs(xsd_any)
-    return [ph.Element(tag=builtins.random_string()) for _ in range(random_occurs)]
+    random_occurs = _get_random_occurs(context, xsd_any.occurs)
+    for i in range(random_occurs):
+        if _budget_ran_out(context, i, xsd_any.occurs):
+            break
+        if context.profile is not None:
+            context.profile.open_element("any")
+        yield events.leaf(context.values.take(BuiltIn.ncname))
+
 
+def _get_random_occurs(context: GenerationContext, occurs: Occurs) -> int:
+    budget = context.budget
+    if budget is None:
+        unbounded_occurs = 2
+    elif budget.limited():
+        return occurs.min
+    else:
+        unbounded_occurs = budget.unbounded_occurs
 
-def _get_random_occurs(xsd_element: _Element) -> int:
-    min_occurs = xsd_element.get("minOccurs")
-    min_occurs = min_occurs if min_occurs else 1
+    max_occurs = max(occurs.min, unbounded_occurs) if occurs.max is None else occurs.max
+    return context.random.randint(occurs.min, max_occurs)
 
-    max_occurs = xsd_element.get("maxOccurs")
-    max_occurs = max_occurs if max_occurs else 1
-    max_occurs = 2 if max_occurs == "unbounded" else max_occurs
 
-    return random.randint(int(min_occurs), int(max_occurs))
+def _budget_ran_out(context: GenerationContext, i: int, occurs: Occurs) -> bool:
+    """Whether the occurrence `i` is optional and the budget of the document ran out"""
+    return context.budget is not None and i >= occurs.min and context.budget.limited()
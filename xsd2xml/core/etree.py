@@ -1,18 +1,128 @@
-from typing import Generator, Self, cast
+from os import PathLike
+from pathlib import Path
+from typing import IO, Iterator, Self, cast
+import copy
+import io
 import xml.etree.ElementTree as ET
 
 from .namespaces import xsd
+from .utils import InvalidXSDError
+
+type XSDSource = str | PathLike[str] | bytes | IO[bytes] | ET.ElementTree
+
+# Global schema components keyed by (component tag, expanded QName)
+type _SymbolTable = dict[tuple[str, str], ET.Element]
+
+_GLOBAL_COMPONENTS = (
+    xsd.element,
+    xsd.simpleType,
+    xsd.complexType,
+    xsd.attributeGroup,
+    xsd.group,
+    xsd.attribute,
+)
+
+
+# Tags of the children of a schema that load other schema documents
+_DIRECTIVES = (xsd.include, "{" + xsd.__ns__ + "}import", xsd.redefine)
+
+# Suffix of the names under which the originals of redefined components stay
+# available to their redefinitions, e.g. a type that extends itself
+_REDEFINED = "#redefined"
+
+# Tags of the children of a complex type that declare attributes rather than content
+_ATTRIBUTE_DECLARATIONS = (xsd.attribute, xsd.attributeGroup, xsd.anyAttribute)
+
+
+class _Nodes:
+    """
+    The state shared by the wrappers of one XSD tree:
+    the target namespace, the symbol table and one wrapper per node.
+    Components declared in the included and imported documents are looked up
+    through `imports`, once the registry has loaded them.
+    """
+
+    __slots__ = (
+        "root",
+        "target_namespace",
+        "symbols",
+        "redefined",
+        "wrappers",
+        "imports",
+        "_external",
+    )
+
+    def __init__(self, root: ET.Element, target_namespace: str | None = None) -> None:
+        self.root = root
+        self.target_namespace = root.get("targetNamespace", target_namespace)
+        self.symbols, self.redefined = _index_global_components(
+            root, self.target_namespace
+        )
+        self.wrappers: dict[ET.Element, _Element] = {}
+        self.imports: list[_Nodes] = []
+        self._external: dict[tuple[str, str], _Nodes] | None = None
+
+    def wrap(self, element: ET.Element) -> "_Element":
+        wrapper = self.wrappers.get(element)
+        if wrapper is None:
+            wrapper = _Element(element, root=self.root, nodes=self)
+        return wrapper
+
+    def closure(self) -> "list[_Nodes]":
+        """This document followed by the documents it loads, directly or not, breadth-first"""
+        documents: list[_Nodes] = [self]
+        seen = {id(self)}
+        for document in documents:
+            for imported in document.imports:
+                if id(imported) not in seen:
+                    seen.add(id(imported))
+                    documents.append(imported)
+        return documents
+
+    def lookup(self, kind: str, name: str) -> "_Element | None":
+        if name.endswith(_REDEFINED):
+            return self.lookup_external(kind, name.removesuffix(_REDEFINED))
+        element = self.symbols.get((kind, name))
+        if element is not None:
+            return self.wrap(element)
+        return self.lookup_external(kind, name)
+
+    def lookup_external(self, kind: str, name: str) -> "_Element | None":
+        """Find a global component in the documents loaded by this one"""
+        if not self.imports:
+            return None
+        if self._external is None:
+            external: dict[tuple[str, str], _Nodes] = {}
+            for document in self.closure()[1:]:
+                for key in document.symbols:
+                    _ = external.setdefault(key, document)
+            self._external = external
+        document = self._external.get((kind, name))
+        if document is None:
+            return None
+        return document.lookup(kind, name)
+
+
+_NOT_CACHED = object()
 
 
 class _Element:
+    __slots__ = ("_element", "_nodes", "_children", "_main_child")
+
     def __init__(
         self,
         element: ET.Element,
         /,
         root: ET.Element,
+        nodes: _Nodes | None = None,
     ):
-        self._root = root
+        if nodes is None:
+            nodes = _Nodes(root)
         self._element = element
+        self._nodes = nodes
+        self._children: list[_Element] | None = None
+        self._main_child: _Element | None | object = _NOT_CACHED
+        nodes.wrappers[element] = self
 
     @property
     def attrib(self) -> dict[str, str]:
@@ -27,13 +137,31 @@ class _Element:
         return self._element.text
 
     @property
-    def children(self) -> "Generator[_Element]":
-        for child in self._element:
-            yield _Element(child, root=self._root)
+    def children(self) -> "Iterator[_Element]":
+        if self._children is None:
+            self._children = [self._nodes.wrap(child) for child in self._element]
+        return iter(self._children)
+
+    @property
+    def main_child(self) -> "_Element | None":
+        """
+        The first child that does not declare attributes,
+        e.g. the content model or derivation of a complex type.
+        """
+        if self._main_child is _NOT_CACHED:
+            self._main_child = next(
+                (c for c in self.children if c.tag not in _ATTRIBUTE_DECLARATIONS),
+                None,
+            )
+        return cast("_Element | None", self._main_child)
 
     @property
     def root(self) -> "_Element":
-        return _Element(self._root, root=self._root)
+        return self._nodes.wrap(self._nodes.root)
+
+    @property
+    def target_namespace(self) -> str | None:
+        return self._nodes.target_namespace
 
     def get[_T](self, key: str, default: _T = None) -> str | _T:
         value = self._element.get(key)
@@ -54,7 +182,7 @@ class _Element:
         element = self._element.find(path)
         if element is None:
             return None
-        return _Element(element, root=self._root)
+        return self._nodes.wrap(element)
 
     def findall(  # type: ignore[reportIncompatibleMethodOverride]
         self, path: str, namespaces: dict[str, str] | None = None
@@ -62,12 +190,19 @@ class _Element:
         _ = namespaces
         elements = self._element.findall(path)
 
-        return [_Element(el, root=self._root) for el in elements]
+        return [self._nodes.wrap(el) for el in elements]
+
+    def lookup(self, kind: str, name: str) -> "_Element | None":
+        """
+        Find the global component with tag `kind` and expanded QName `name`,
+        in this document or in the documents it includes or imports.
+        """
+        return self._nodes.lookup(kind, name)
 
     def resolve_reference(self) -> "_Element":
         ref = self.get("ref")
         if ref is not None:
-            ref_element = self.root.find(f"{xsd.element}[@name='{ref}']")
+            ref_element = self.lookup(xsd.element, ref)
             if ref_element is None:
                 raise ValueError()
             return ref_element
@@ -75,39 +210,217 @@ class _Element:
 
 
 class _ElementTree:
-    def __init__(self, tree: ET.ElementTree, nsmap: dict[str, str]) -> None:
+    def __init__(
+        self,
+        tree: ET.ElementTree,
+        nsmap: dict[str, str],
+        target_namespace: str | None = None,
+    ) -> None:
+        xsd_root = tree.getroot()
+        if xsd_root is None:
+            raise ValueError()
+
         self._tree = tree
         self._namespaces = nsmap
+        self._nodes = _Nodes(xsd_root, target_namespace)
+        self.location: Path | None = None
+        """The file the XSD was read from, against which schema locations are resolved"""
+        self.content: bytes | None = None
+        """The raw XSD, when it was read by a registry"""
+        self.imports: list[_ElementTree] | None = None
+        """The documents loaded by the directives, once a registry has resolved them"""
+
+    @classmethod
+    def parse(cls, source: "XSDSource", target_namespace: str | None = None) -> Self:
+        """
+        Parse an XSD from a path, bytes, a binary file object or an existing tree.
+
+        `target_namespace` is the namespace of a schema that includes this one:
+        a document without target namespace takes it, and its unprefixed QNames
+        are in that namespace.
+        """
+
+        if isinstance(source, ET.ElementTree):
+            return cls.from_tree(source)
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+
+        # Namespaces are collected, the tree is built and QNames are expanded in one pass.
+        # Each element sees the prefixes declared on itself and its ancestors.
+        namespaces: dict[str, str] = {}
+        scopes: list[dict[str, str]] = [{}]
+        if target_namespace is not None:
+            scopes = [{"": target_namespace}]
+        declared: dict[str, str] = {}
+        events = ET.iterparse(source, events=("start-ns", "start", "end"))
+        for event, item in events:
+            match event:
+                case "start-ns":
+                    prefix, uri = cast(tuple[str, str], item)
+                    declared[prefix] = uri
+                    namespaces[prefix] = uri
+                case "start":
+                    scope = scopes[-1]
+                    if len(scopes) == 1 and _declares_target_namespace(item):
+                        # Only a schema without target namespace is included as a chameleon
+                        scope = {}
+                    if declared:
+                        scope = scope | declared
+                        declared = {}
+                    scopes.append(scope)
+                    _expand_element_qname_attributes(cast(ET.Element, item), scope)
+                case "end":
+                    _ = scopes.pop()
+
+        tree = ET.ElementTree(events.root)  # pyright: ignore[reportAttributeAccessIssue]
+        return cls(tree, namespaces, target_namespace)
 
     @classmethod
-    def parse(cls, path: str) -> Self:
-        namespaces = [
-            ns_tuple for _, ns_tuple in ET.iterparse(path, events=["start-ns"])
-        ]
-        namespaces = dict(cast(list[tuple[str, str]], namespaces))
-        tree = ET.parse(path)
-        _ = _expand_qname_attributes(tree.getroot(), namespaces)
-        return cls(tree, namespaces)  # pyright: ignore[reportArgumentType]
+    def from_tree(cls, tree: ET.ElementTree) -> Self:
+        """
+        Use an already parsed XSD. Prefixes are not preserved by ElementTree,
+        so QNames are expanded assuming the conventional xs and xsd prefixes
+        and the target namespace as default namespace.
+        The given tree is not modified.
+        """
+
+        xsd_root = tree.getroot()
+        if xsd_root is None:
+            raise ValueError()
+
+        xsd_root = copy.deepcopy(xsd_root)
+        namespaces = {"xs": xsd.__ns__, "xsd": xsd.__ns__}
+        target_namespace = xsd_root.get("targetNamespace")
+        if target_namespace is not None:
+            namespaces[""] = target_namespace
+
+        _ = _expand_qname_attributes(xsd_root, namespaces)
+        return cls(ET.ElementTree(xsd_root), namespaces)
+
+    @property
+    def namespaces(self) -> dict[str, str]:
+        return self._namespaces
 
     def getroot(self) -> _Element:
         xsd_root = self._tree.getroot()
         if xsd_root is None:
             raise ValueError()
 
-        return _Element(xsd_root, root=xsd_root)
+        return self._nodes.wrap(xsd_root)
+
+    @property
+    def target_namespace(self) -> str | None:
+        return self._nodes.target_namespace
+
+    def directives(self) -> Iterator[tuple[str, str | None, str | None]]:
+        """The tag, namespace and schema location of every include, import and redefine"""
+        xsd_root = self._tree.getroot()
+        if xsd_root is None:
+            return
+        for child in xsd_root:
+            if child.tag in _DIRECTIVES:
+                yield child.tag, child.get("namespace"), child.get("schemaLocation")
+
+    def set_imports(self, imports: "list[_ElementTree]") -> None:
+        self._nodes.imports = [document._nodes for document in imports]
+        self.imports = imports
+
+    def closure(self) -> "list[_ElementTree]":
+        """This document followed by the documents it loads, directly or not, breadth-first"""
+        documents: list[_ElementTree] = [self]
+        seen = {id(self)}
+        for document in documents:
+            for imported in document.imports or ():
+                if id(imported) not in seen:
+                    seen.add(id(imported))
+                    documents.append(imported)
+        return documents
+
+    def global_components(self) -> Iterator[tuple[str, str, _Element]]:
+        """
+        The tag, expanded QName and declaration of every global component visible
+        from this document. The first declaration of a name wins, searching this
+        document first. The originals of the components redefined by a document
+        come under their names suffixed with `#redefined`.
+        """
+
+        seen: set[tuple[str, str]] = set()
+        for nodes in self._nodes.closure():
+            for (kind, name), element in nodes.symbols.items():
+                if (kind, name) not in seen:
+                    seen.add((kind, name))
+                    yield kind, name, nodes.wrap(element)
+            for kind, name in nodes.redefined:
+                original = nodes.lookup_external(kind, name)
+                if original is not None and (kind, name + _REDEFINED) not in seen:
+                    seen.add((kind, name + _REDEFINED))
+                    yield kind, name + _REDEFINED, original
+
+
+def _declares_target_namespace(element: object) -> bool:
+    return cast(ET.Element, element).get("targetNamespace") is not None
+
+
+def _index_global_components(
+    xsd_root: ET.Element, target_namespace: str | None
+) -> tuple[_SymbolTable, list[tuple[str, str]]]:
+    """
+    Index the named top-level components of the schema so that references
+    can be resolved in constant time. The first declaration of a name wins.
+
+    The components of an xsd:redefine replace those of the redefined document,
+    and their references to themselves are renamed to reach the originals.
+    """
+
+    symbols: _SymbolTable = {}
+    redefined: list[tuple[str, str]] = []
+    for child in xsd_root:
+        if child.tag == xsd.redefine:
+            for component in child:
+                key = _component_key(component, target_namespace)
+                if key is not None and key not in symbols:
+                    symbols[key] = component
+                    redefined.append(key)
+                    _rename_self_references(component, *key)
+            continue
+        key = _component_key(child, target_namespace)
+        if key is not None:
+            _ = symbols.setdefault(key, child)
+    return symbols, redefined
+
+
+def _component_key(
+    element: ET.Element, target_namespace: str | None
+) -> tuple[str, str] | None:
+    name = element.get("name")
+    if name is None or element.tag not in _GLOBAL_COMPONENTS:
+        return None
+    if target_namespace is not None:
+        name = "{" + target_namespace + "}" + name
+    return element.tag, name
+
+
+def _rename_self_references(component: ET.Element, kind: str, name: str) -> None:
+    if kind in (xsd.complexType, xsd.simpleType):
+        for derivation in component.iter():
+            is_derivation = derivation.tag in (xsd.extension, xsd.restriction)
+            if is_derivation and derivation.get("base") == name:
+                derivation.set("base", name + _REDEFINED)
+    else:
+        for reference in component.iter(kind):
+            if reference.get("ref") == name:
+                reference.set("ref", name + _REDEFINED)
 
 
 def _expand_qname_attributes(
     element: ET.Element, document_namespaces: dict[str, str]
 ) -> ET.Element:
     """
-    Certain attributes may have a prefixed value e.g. xsi:type="schema:Episode".
-    Expand the prefixed attribute value to its full qualified name e.g. "{https://schema.org/}Episode"
+    Certain attributes have a QName value e.g. type="schema:Episode".
+    Expand the attribute value to its full qualified name e.g. "{https://schema.org/}Episode"
     """
 
-    for k, v in element.attrib.items():
-        if k == "base" or k == "type":
-            element.attrib[k] = _expand_qname(v, document_namespaces)
+    _expand_element_qname_attributes(element, document_namespaces)
 
     for child in element:
         _ = _expand_qname_attributes(child, document_namespaces)
@@ -115,18 +428,44 @@ def _expand_qname_attributes(
     return element
 
 
+def _expand_element_qname_attributes(
+    element: ET.Element, document_namespaces: dict[str, str]
+) -> None:
+    for k, v in element.attrib.items():
+        if k in _QNAME_ATTRIBUTES:
+            element.attrib[k] = _expand_qname(v, document_namespaces)
+
+
+_QNAME_ATTRIBUTES = ("base", "type", "ref")
+
+# The xml prefix is bound by definition and never declared
+_XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+
+
 def _expand_qname(name: str, document_namespaces: dict[str, str]) -> str:
     """
-    Expand a prefixed qualified name to its fully qualified name.
-    E.g. "schema:Episode" is expanded to "{https://schema.org/}Episode"
+    Expand a qualified name to its fully qualified name.
+    E.g. "schema:Episode" is expanded to "{https://schema.org/}Episode".
+    Unprefixed names are in the default namespace, if there is one.
     """
 
-    if ":" not in name:
+    if name.startswith("{"):
         return name
 
+    if ":" not in name:
+        default_namespace = document_namespaces.get("")
+        if not default_namespace:
+            return name
+        return "{" + default_namespace + "}" + name
+
     splitted_qname = name.split(":", 1)
     prefix = splitted_qname[0]
     local = splitted_qname[1]
-    prefix_iri = document_namespaces[prefix]
+    if prefix == "xml":
+        return "{" + _XML_NAMESPACE + "}" + local
+
+    prefix_iri = document_namespaces.get(prefix)
+    if prefix_iri is None:
+        raise InvalidXSDError()
 
     return "{" + prefix_iri + "}" + local
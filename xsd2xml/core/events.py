@@ -0,0 +1,45 @@
+"""
+Generation produces a document as a stream of events instead of a tree.
+
+An element is a `Start` followed by the events of its children and an `END`.
+Generators yield the events of one sibling at a time, so a consumer that
+handles each event directly only holds the elements that are still open.
+"""
+
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+
+@dataclass(slots=True)
+class Start:
+    tag: str
+    attrib: dict[str, str] = field(default_factory=dict)
+    text: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class End:
+    pass
+
+
+END = End()
+
+type Event = Start | End
+
+
+def leaf(tag: str, text: str | None = None) -> Iterator[Event]:
+    yield Start(tag, text=text)
+    yield END
+
+
+def skip_element(events: Iterable[Event]) -> None:
+    """
+    Consume the events up to and including the `END` of an element
+    whose `Start` was already consumed.
+    """
+
+    depth = 1
+    for event in events:
+        depth += 1 if isinstance(event, Start) else -1
+        if depth == 0:
+            return
@@ -13,7 +13,7 @@ def get_element_name(element: _Element) -> str:
     name = element.get("name")
     if name is None:
         raise InvalidXSDError()
-    target_namespace = element.root.get("targetNamespace", None)
+    target_namespace = element.target_namespace
     if target_namespace is None:
         return name
     return "{" + target_namespace + "}" + name
@@ -23,7 +23,7 @@ def _try_resolve_reference(element: _Element) -> _Element:
     ref = element.get("ref")
     tag = element.tag
     if ref is not None:
-        referenced_element = element.root.find(f"{tag}[@name='{ref}']")
+        referenced_element = element.lookup(tag, ref)
         if referenced_element is None:
             raise InvalidXSDError()
         return referenced_element
@@ -1,55 +1,89 @@
+"""
+IDs are recorded in a registry while they are generated and an IDREF refers
+to one of the IDs generated before it.
+
+An IDREF generated before the first ID gets a deferred slot instead: a value
+that can never be generated otherwise. The events from the first slot on are
+held back until the document has an ID, and then the slots are back-patched.
+Slots that are still open when the document ends are left out.
+"""
+
+from typing import Iterable, Iterator
 import random
-import xml.etree.ElementTree as ET
 
-from .builtins import IDMarker, IDREFMarker
+from . import events as ev
+from .events import Event, Start
+
+# XML cannot contain NUL, so a slot never collides with a generated value
+_SLOT_PREFIX = "\0idref-"
+
+
+class IDRegistry:
+    __slots__ = ("rng", "ids", "deferred")
 
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+        self.ids: list[str] = []
+        self.deferred: set[str] = set()
 
-def _recurse_markers(element: ET.Element) -> None:
-    ids = _recurse_find_ids(element)
-    if len(ids) == 0:
-        _recurse_remove_idrefs(element)
-    else:
-        _recurse_populate_idrefs(element, ids)
+    def register(self, id: str) -> str:
+        self.ids.append(id)
+        return id
 
+    def reference(self) -> str:
+        if self.ids:
+            return self.rng.choice(self.ids)
 
-def _recurse_find_ids(element: ET.Element) -> list[str]:
-    ids = []
-    for child in element:
-        ids += _recurse_find_ids(child)
+        slot = _SLOT_PREFIX + str(len(self.deferred))
+        self.deferred.add(slot)
+        return slot
 
-    if isinstance(element.text, IDMarker):
-        ids.append(element.text)
 
-    for v in element.attrib.values():
-        if isinstance(v, IDMarker):
-            ids.append(v)
+def resolve_idrefs(events: Iterable[Event], ids: IDRegistry) -> Iterator[Event]:
+    """
+    Pass on the events of a document with every deferred IDREF resolved or left out.
+    Events are only held back while a slot is waiting for the first ID.
+    """
 
-    return ids
+    held_back: list[Event] = []
+    for event in events:
+        if not ids.deferred:
+            yield event
+            continue
 
+        held_back.append(event)
+        if ids.ids:
+            _populate_slots(held_back, ids)
+            yield from held_back
+            held_back.clear()
 
-def _recurse_populate_idrefs(element: ET.Element, ids: list[str]) -> None:
-    if isinstance(element.text, IDREFMarker):
-        element.text = random.choice(ids)
+    if held_back:
+        yield from _remove_slots(held_back, ids)
 
-    for k, v in element.attrib.items():
-        if isinstance(v, IDREFMarker):
-            element.attrib[k] = random.choice(ids)
 
-    for child in element:
-        _recurse_populate_idrefs(child, ids)
+def _populate_slots(held_back: list[Event], ids: IDRegistry) -> None:
+    for event in held_back:
+        if not isinstance(event, Start):
+            continue
+        if event.text in ids.deferred:
+            event.text = ids.rng.choice(ids.ids)
+        for k, v in event.attrib.items():
+            if v in ids.deferred:
+                event.attrib[k] = ids.rng.choice(ids.ids)
 
+    ids.deferred.clear()
 
-def _recurse_remove_idrefs(element: ET.Element) -> None:
-    children = [el for el in element]
-    for child in children:
-        if isinstance(child.text, IDREFMarker):
-            element.remove(child)
 
-    for k, v in element.attrib.copy().items():
-        if isinstance(v, IDREFMarker):
-            element.attrib.pop(k)
-    
-    remaining_children = [child for child in element]
-    for child in remaining_children:
-        _recurse_remove_idrefs(child)
+def _remove_slots(held_back: list[Event], ids: IDRegistry) -> Iterator[Event]:
+    events = iter(held_back)
+    for event in events:
+        if isinstance(event, Start):
+            if event.text in ids.deferred:
+                ev.skip_element(events)
+                continue
+            for k, v in event.attrib.copy().items():
+                if v in ids.deferred:
+                    _ = event.attrib.pop(k)
+        yield event
 
+    ids.deferred.clear()
@@ -0,0 +1,417 @@
+"""
+Typed, immutable model of an XSD schema.
+
+The compiler turns the parsed XSD tree into these objects once, after which
+generation never has to look at raw XML nodes again. Named components refer
+to each other through `ElementRef` and `TypeRef`, which are looked up in the
+`CompiledSchema`. This keeps the model acyclic even for recursive schemas.
+"""
+
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from types import MappingProxyType
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterable, Iterator, Mapping
+import io
+import random
+import xml.etree.ElementTree as ET
+
+from .builtins import BuiltIn
+from .utils import InvalidXSDError
+
+if TYPE_CHECKING:
+    from os import PathLike
+
+    from .budget import Budget, _SizeModel
+    from .codegen import SpecializedGenerator
+    from .coverage import Coverage
+    from .events import Event
+    from .profile import Profile
+    from .validation import Violation, _SchemaCache
+
+type Provider = Callable[[random.Random], str]
+"""Generates a value from the random generator of a document"""
+
+
+@dataclass(frozen=True, slots=True)
+class Unsupported:
+    """
+    A construct the generator cannot produce.
+    `error` is raised when generation reaches it, not when the schema is compiled.
+    """
+
+    error: type[Exception]
+
+
+@dataclass(frozen=True, slots=True)
+class Occurs:
+    min: int = 1
+    max: int | None = 1
+    """`None` means unbounded"""
+
+
+@dataclass(frozen=True, slots=True)
+class TypeRef:
+    name: str
+
+
+@dataclass(frozen=True, slots=True)
+class Facet:
+    kind: str
+    value: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class Restriction:
+    base: BuiltIn
+    enumerations: tuple[str, ...] = ()
+    facets: tuple[Facet, ...] = ()
+    """Facets other than enumerations"""
+
+
+@dataclass(frozen=True, slots=True)
+class SimpleType:
+    name: str | None
+    content: Restriction | Unsupported
+    abstract: bool = False
+    base: str | None = None
+    """The name of the type this one restricts"""
+    provider: Provider | None = field(default=None, compare=False)
+
+
+@dataclass(frozen=True, slots=True)
+class AttributeUse:
+    name: str
+    type: BuiltIn | SimpleType | TypeRef | Unsupported
+    required: bool = False
+    provider: Provider | None = field(default=None, compare=False)
+
+
+@dataclass(frozen=True, slots=True)
+class AnyAttribute:
+    required: bool = False
+
+
+type Attribute = AttributeUse | AnyAttribute
+
+
+class Compositor(Enum):
+    sequence = auto()
+    choice = auto()
+    all = auto()
+
+
+@dataclass(frozen=True, slots=True)
+class ElementRef:
+    ref: str
+    occurs: Occurs = Occurs()
+
+
+@dataclass(frozen=True, slots=True)
+class AnyElement:
+    occurs: Occurs = Occurs()
+
+
+@dataclass(frozen=True, slots=True)
+class ModelGroup:
+    compositor: Compositor
+    particles: "tuple[Particle, ...]"
+    occurs: Occurs = Occurs()
+
+
+@dataclass(frozen=True, slots=True)
+class SimpleContentExtension:
+    base: BuiltIn | TypeRef
+    attributes: tuple[Attribute, ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class ComplexContentExtension:
+    base: TypeRef
+    extension: "ComplexType"
+    """The content and attributes added by the extension"""
+
+
+type ComplexContent = (
+    ModelGroup | SimpleContentExtension | ComplexContentExtension | Unsupported | None
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ComplexType:
+    name: str | None
+    content: ComplexContent
+    attributes: tuple[Attribute, ...] = ()
+    abstract: bool = False
+    base: str | None = None
+    """The name of the type this one extends or restricts"""
+
+
+type TypeDefinition = BuiltIn | SimpleType | ComplexType | TypeRef | Unsupported
+
+
+@dataclass(frozen=True, slots=True)
+class ElementDecl:
+    name: str
+    type: TypeDefinition
+    occurs: Occurs = Occurs()
+    provider: Provider | None = field(default=None, compare=False)
+    """Generates the value of an element with a simple type"""
+    attribute_providers: dict[str, Provider] | None = field(default=None, compare=False)
+    """Generate the values of the attributes of this element, by attribute name"""
+
+
+type Particle = ElementDecl | ElementRef | AnyElement | ModelGroup | Unsupported
+
+
+# The fields of `CompiledSchema` after `target_namespace`, in order
+_SCHEMA_MAPPINGS = (
+    "namespaces",
+    "elements",
+    "simple_types",
+    "complex_types",
+    "simple_type_substitutes",
+    "complex_type_substitutes",
+    "built_in_providers",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledSchema:
+    """
+    A schema compiled by `xsd2xml.compile`.
+    Global components are keyed by their expanded QName.
+    The mappings are read-only views of copies of the dictionaries the schema is
+    created with, so a schema shared by generators cannot change under them.
+    """
+
+    target_namespace: str | None
+    namespaces: Mapping[str, str]
+    """The prefixes declared in the XSD"""
+    elements: Mapping[str, ElementDecl]
+    simple_types: Mapping[str, SimpleType]
+    complex_types: Mapping[str, ComplexType]
+    simple_type_substitutes: Mapping[str, tuple[SimpleType, ...]]
+    complex_type_substitutes: Mapping[str, tuple[ComplexType, ...]]
+    """The types that may be used through `xsi:type` where a named type is expected"""
+    built_in_providers: Mapping[BuiltIn, Provider] = field(default_factory=dict)
+    _validation_cache: "_SchemaCache | None" = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    """What validating documents of this schema has in common, once one is validated"""
+    _size_models: "dict[tuple[str, float], _SizeModel]" = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    """How the size of documents grows with `maxOccurs="unbounded"`, by root and budget"""
+
+    def __post_init__(self) -> None:
+        for name in _SCHEMA_MAPPINGS:
+            mapping = MappingProxyType(dict(getattr(self, name)))
+            object.__setattr__(self, name, mapping)
+
+    def __reduce__(self) -> tuple[type["CompiledSchema"], tuple[object, ...]]:
+        # Mapping proxies cannot be pickled, the dictionaries behind them can
+        mappings = (dict(getattr(self, name)) for name in _SCHEMA_MAPPINGS)
+        return (CompiledSchema, (self.target_namespace, *mappings))
+
+    def generate(
+        self,
+        element_name: str,
+        rng: random.Random | None = None,
+        budget: "Budget | None" = None,
+        check: bool = False,
+        coverage: "Coverage | None" = None,
+    ) -> ET.ElementTree:
+        """
+        Generate a document with all random choices drawn from `rng`.
+        Without `rng`, a generator is seeded from the global `random` module,
+        so `random.seed` still makes the output reproducible.
+        `budget` sets the size of the document and limits it.
+        With `check`, the document is validated and `InvalidDocumentError` is raised
+        when the generator produced an invalid document.
+        `coverage` records the paths of the schema the document covers and,
+        when guided, steers its choices toward the uncovered ones.
+        """
+        return self.generate_element(
+            self.find_global_element(element_name), rng, budget, check, coverage
+        )
+
+    def generate_element(
+        self,
+        xsd_element: ElementDecl,
+        rng: random.Random | None = None,
+        budget: "Budget | None" = None,
+        check: bool = False,
+        coverage: "Coverage | None" = None,
+    ) -> ET.ElementTree:
+        from . import tree, validation
+
+        events = self.generate_events(xsd_element, rng, budget, coverage=coverage)
+        document = tree.build_tree(events)
+        if check:
+            validation.check(self, document)
+        return document
+
+    def validate(
+        self, document: "ET.ElementTree | ET.Element | Iterable[Event]"
+    ) -> "list[Violation]":
+        """
+        The violations of this schema in a tree or in the events of a document,
+        found without serializing it. An empty list means the document is valid.
+        """
+        from . import validation
+
+        return validation.validate(self, document)
+
+    def write(
+        self,
+        element_name: str,
+        sink: BinaryIO,
+        indent: str | None = "  ",
+        rng: random.Random | None = None,
+        budget: "Budget | None" = None,
+        coverage: "Coverage | None" = None,
+    ) -> None:
+        """
+        Generate a document and write it to `sink` as UTF-8 while it is generated,
+        without building a tree. The prefixes of the XSD are used and `indent` is
+        applied while writing.
+        """
+        self.write_element(
+            self.find_global_element(element_name), sink, indent, rng, budget, coverage
+        )
+
+    def write_element(
+        self,
+        xsd_element: ElementDecl,
+        sink: BinaryIO,
+        indent: str | None = "  ",
+        rng: random.Random | None = None,
+        budget: "Budget | None" = None,
+        coverage: "Coverage | None" = None,
+    ) -> None:
+        from . import writer
+
+        xml_writer = writer.XMLWriter(sink, writer.output_prefixes(self), indent)
+        writer.write_events(
+            xml_writer,
+            self.generate_events(xsd_element, rng, budget, coverage=coverage),
+        )
+        xml_writer.close()
+
+    def profile(
+        self,
+        element_name: str,
+        rng: random.Random | None = None,
+        budget: "Budget | None" = None,
+        serialize: bool = False,
+    ) -> "tuple[ET.ElementTree | bytes, Profile]":
+        """
+        Generate a document like `generate`, or like `write` when `serialize` is set,
+        and return it with the time spent per schema component and per phase.
+        """
+        from . import tree, writer
+        from .profile import Phase, Profile
+
+        profile = Profile()
+        xsd_element = self.find_global_element(element_name)
+        events = self.generate_events(xsd_element, rng, budget, profile)
+
+        if not serialize:
+            profile.enter(Phase.manifesting)
+            document = tree.build_tree(events)
+            profile.leave()
+            return document, profile
+
+        sink = io.BytesIO()
+        profile.enter(Phase.serialization)
+        xml_writer = writer.XMLWriter(sink, writer.output_prefixes(self), "  ")
+        writer.write_events(xml_writer, events)
+        xml_writer.close()
+        profile.leave()
+        return sink.getvalue(), profile
+
+    def coverage(self, element_name: str, guided: bool = True) -> "Coverage":
+        """
+        A coverage of the paths of the documents rooted at `element_name`,
+        to pass to `generate` or `generate_many`.
+        """
+        from .coverage import Coverage
+
+        return Coverage(self, element_name, guided)
+
+    def specialize(
+        self, element_name: str, cache_dir: "str | PathLike[str] | None" = None
+    ) -> "SpecializedGenerator":
+        """
+        Compile the generation of documents rooted at `element_name` into Python
+        functions, which generate the same documents as `generate` several times faster.
+        With `cache_dir`, the emitted module is kept there for later processes.
+        """
+        from . import codegen
+
+        return codegen.specialize(self, self.find_global_element(element_name), cache_dir)
+
+    def generate_events(
+        self,
+        xsd_element: ElementDecl,
+        rng: random.Random | None = None,
+        budget: "Budget | None" = None,
+        profile: "Profile | None" = None,
+        coverage: "Coverage | None" = None,
+    ) -> "Iterator[Event]":
+        """
+        Lazily generate a document as a stream of `events.Start` and `events.END`.
+        """
+        from . import element, engine, idrefs
+        from .context import GenerationContext
+        from .profile import Phase
+
+        if rng is None:
+            rng = random.Random(random.getrandbits(64))
+        document_budget = None
+        if budget is not None:
+            document_budget = budget.start(self, xsd_element, rng)
+        context = GenerationContext(self, rng, document_budget, profile, coverage)
+        events = engine.run(
+            element.generate_single_element(context, xsd_element), profile
+        )
+        if document_budget is not None:
+            events = document_budget.track(events)
+        events = idrefs.resolve_idrefs(events, context.ids)
+        if profile is not None:
+            events = profile.timed(Phase.id_resolution, events)
+        return events
+
+    def qualified_name(self, name: str) -> str:
+        if self.target_namespace is None or name.startswith("{"):
+            return name
+        return "{" + self.target_namespace + "}" + name
+
+    def find_global_element(self, element_name: str) -> ElementDecl:
+        xsd_element = self.elements.get(self.qualified_name(element_name))
+        if xsd_element is None:
+            raise ValueError()
+        return xsd_element
+
+    def find_element(self, xsd_element: ElementDecl | ElementRef) -> ElementDecl:
+        if isinstance(xsd_element, ElementDecl):
+            return xsd_element
+        referenced_element = self.elements.get(xsd_element.ref)
+        if referenced_element is None:
+            raise InvalidXSDError()
+        return referenced_element
+
+    def find_type(
+        self, type_definition: TypeDefinition
+    ) -> BuiltIn | SimpleType | ComplexType:
+        match type_definition:
+            case Unsupported(error):
+                raise error()
+            case TypeRef(name):
+                if name in self.simple_types:
+                    return self.simple_types[name]
+                if name in self.complex_types:
+                    return self.complex_types[name]
+                raise InvalidXSDError()
+            case _:
+                return type_definition
@@ -15,3 +15,7 @@ class xsi(Namespace):
 
 class xsd(Namespace):
     __ns__ = "http://www.w3.org/2001/XMLSchema"
+
+
+class xml(Namespace):
+    __ns__ = "http://www.w3.org/XML/1998/namespace"
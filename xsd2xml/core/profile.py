@@ -0,0 +1,175 @@
+"""
+Opt-in profiling of the generation of one document.
+
+Generators call the hooks of the profile in `GenerationContext.profile` only
+when it is set, so generation without a profile pays one `None` check per hook.
+
+Time is measured exclusively: the profile keeps a stack of the phases that are
+running, and the time between two hooks is charged to the innermost phase, to
+its schema component, if any, and to the innermost element being generated.
+The consumers of the events, the ID resolution and the tree building or
+serialization, are phases too.
+"""
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterable, Iterator
+import time
+
+from .events import END, Event
+
+
+class Phase(str, Enum):
+    content = "content models"
+    """Walking the content models, everything not in another phase"""
+    reference_lookup = "reference lookup"
+    derivation_search = "derivation search"
+    value_generation = "value generation"
+    id_resolution = "ID resolution"
+    manifesting = "manifesting"
+    """Building the tree"""
+    serialization = "serialization"
+
+
+# Time spent in these phases is also charged to the element being generated
+_GENERATION_PHASES = frozenset(
+    (
+        Phase.content,
+        Phase.reference_lookup,
+        Phase.derivation_search,
+        Phase.value_generation,
+    )
+)
+
+type Component = tuple[str, str]
+"""The kind of a schema component, `element`, `complexType` or `simpleType`, and its name"""
+
+
+@dataclass(slots=True)
+class Stats:
+    calls: int = 0
+    seconds: float = 0.0
+
+
+class _ElementFrame:
+    __slots__ = ("name", "type", "path", "seconds")
+
+    def __init__(self, name: str, path: tuple[str, ...]) -> None:
+        self.name = name
+        self.type: Component | None = None
+        self.path = path
+        self.seconds = 0.0
+
+
+def _local_name(name: str) -> str:
+    return name.rpartition("}")[2]
+
+
+class Profile:
+    """
+    Time and calls per schema component and per phase of the generation of one document.
+
+    The time of an element or of a complex type is the time spent generating
+    its own attributes and text and walking its content model, excluding its
+    children. The time of a simple type is the time spent generating its values.
+    Attribute groups are merged into the attributes of their types when a
+    schema is compiled, so their time belongs to those types.
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[Phase, Stats] = {}
+        self.components: dict[Component, Stats] = {}
+        self.paths: dict[tuple[str, ...], float] = {}
+        """Seconds per element path, ending with the name of the phase"""
+        self._frames: list[tuple[Phase, Component | None]] = []
+        self._elements: list[_ElementFrame] = []
+        self._last = time.perf_counter()
+
+    def _charge(self) -> None:
+        now = time.perf_counter()
+        seconds = now - self._last
+        self._last = now
+        if not self._frames:
+            return
+
+        phase, component = self._frames[-1]
+        self.phases[phase].seconds += seconds
+        if component is not None:
+            self.components[component].seconds += seconds
+
+        if phase in _GENERATION_PHASES and self._elements:
+            element = self._elements[-1]
+            element.seconds += seconds
+            path = element.path + (phase.name,)
+        else:
+            path = (phase.name,)
+        self.paths[path] = self.paths.get(path, 0.0) + seconds
+
+    def enter(self, phase: Phase, component: Component | None = None) -> None:
+        self._charge()
+        self._frames.append((phase, component))
+        self.phases.setdefault(phase, Stats()).calls += 1
+        if component is not None:
+            self.components.setdefault(component, Stats()).calls += 1
+
+    def leave(self) -> None:
+        self._charge()
+        self._frames.pop()
+
+    def timed(self, phase: Phase, events: Iterable[Event]) -> Iterator[Event]:
+        """Charge the time spent producing `events` to `phase`"""
+        iterator = iter(events)
+        while True:
+            self.enter(phase)
+            event = next(iterator, None)
+            self.leave()
+            if event is None:
+                return
+            yield event
+
+    def open_element(self, name: str) -> None:
+        """Start charging time to an element, until its `END` is generated"""
+        self._charge()
+        parent_path = self._elements[-1].path if self._elements else ()
+        self._elements.append(_ElementFrame(name, parent_path + (_local_name(name),)))
+        self.components.setdefault(("element", name), Stats()).calls += 1
+
+    def set_type(self, component: Component) -> None:
+        """Record the complex type of the innermost element"""
+        self._elements[-1].type = component
+        self.components.setdefault(component, Stats()).calls += 1
+
+    def close_element(self) -> None:
+        self._charge()
+        element = self._elements.pop()
+        self.components[("element", element.name)].seconds += element.seconds
+        if element.type is not None:
+            self.components[element.type].seconds += element.seconds
+
+    def track(self, events: Iterable[Event]) -> Iterator[Event]:
+        """Close the elements as their `END`s are generated"""
+        for event in events:
+            if event is END:
+                self.close_element()
+            yield event
+
+    def folded(self) -> str:
+        """
+        The time per element path in the folded-stack format of flame graphs,
+        in microseconds, e.g. `premis;object;objectIdentifier;value_generation 42`.
+        """
+        return "".join(
+            f"{';'.join(path)} {round(seconds * 1e6)}\n"
+            for path, seconds in sorted(self.paths.items())
+        )
+
+    def __str__(self) -> str:
+        lines = [f"{'phase':<36} {'calls':>8} {'ms':>10}"]
+        for phase, stats in sorted(self.phases.items(), key=lambda p: -p[1].seconds):
+            lines.append(f"{phase.value:<36} {stats.calls:>8} {stats.seconds * 1e3:>10.3f}")
+        lines.append(f"{'component':<36} {'calls':>8} {'ms':>10}")
+        components = sorted(self.components.items(), key=lambda c: -c[1].seconds)
+        for (kind, name), stats in components[:20]:
+            label = f"{kind} {_local_name(name)}"
+            lines.append(f"{label:<36} {stats.calls:>8} {stats.seconds * 1e3:>10.3f}")
+        return "\n".join(lines)
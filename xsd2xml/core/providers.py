@@ -0,0 +1,200 @@
+"""
+User supplied value providers, bound to the components of a compiled schema.
+
+Binding resolves the provider of every element, attribute and simple type
+once, so generation only reads the provider stored on the component.
+"""
+
+from dataclasses import replace
+from typing import Self
+
+from .builtins import BuiltIn
+from .model import (
+    AnyAttribute,
+    Attribute,
+    CompiledSchema,
+    ComplexContentExtension,
+    ComplexType,
+    ElementDecl,
+    ModelGroup,
+    Particle,
+    Provider,
+    SimpleContentExtension,
+    SimpleType,
+    TypeDefinition,
+)
+
+
+class ValueProviders:
+    """
+    Providers registered by built-in type, by named simple type or by path.
+
+    A path is the name of an element, for the value of elements with that name,
+    `element/@attribute` for an attribute of those elements, or `@attribute`
+    for that attribute on any element. Names without a namespace are in the
+    target namespace, like the names given to `CompiledSchema.generate`.
+
+    The most specific provider applies: an element path, an attribute path,
+    a simple type and finally a built-in type.
+    """
+
+    def __init__(self) -> None:
+        self.built_ins: dict[BuiltIn, Provider] = {}
+        self.simple_types: dict[str, Provider] = {}
+        self.elements: dict[str, Provider] = {}
+        self.element_attributes: dict[str, dict[str, Provider]] = {}
+        self.attributes: dict[str, Provider] = {}
+
+    def for_type(self, type: BuiltIn | str, provider: Provider) -> Self:
+        """
+        Use `provider` for the values of a built-in type or of the simple type named `type`.
+        """
+        if isinstance(type, BuiltIn):
+            self.built_ins[type] = provider
+        else:
+            self.simple_types[type] = provider
+        return self
+
+    def for_path(self, path: str, provider: Provider) -> Self:
+        element_name, _, attribute_name = path.partition("@")
+        element_name = element_name.removesuffix("/")
+        if not attribute_name:
+            self.elements[element_name] = provider
+        elif not element_name:
+            self.attributes[attribute_name] = provider
+        else:
+            providers = self.element_attributes.setdefault(element_name, {})
+            providers[attribute_name] = provider
+        return self
+
+    def bind(self, schema: CompiledSchema) -> CompiledSchema:
+        """
+        Return a copy of `schema` with the providers stored on its components.
+        """
+        return _Binder(self, schema).bind()
+
+
+class _Binder:
+    def __init__(self, providers: ValueProviders, schema: CompiledSchema) -> None:
+        self._schema = schema
+        self._built_ins = providers.built_ins
+        self._attributes = providers.attributes
+        self._simple_types = {
+            schema.qualified_name(name): provider
+            for name, provider in providers.simple_types.items()
+        }
+        self._elements = {
+            schema.qualified_name(name): provider
+            for name, provider in providers.elements.items()
+        }
+        self._element_attributes = {
+            schema.qualified_name(name): dict(attribute_providers)
+            for name, attribute_providers in providers.element_attributes.items()
+        }
+
+    def bind(self) -> CompiledSchema:
+        schema = self._schema
+        simple_types = {
+            name: self._bind_simple_type(t) for name, t in schema.simple_types.items()
+        }
+        complex_types = {
+            name: self._bind_complex_type(t) for name, t in schema.complex_types.items()
+        }
+
+        # The substitutes must be the bound types themselves, as they are compared by identity
+        def bound[_T](types: dict[str, _T], substitutes: tuple[_T, ...]) -> tuple[_T, ...]:
+            return tuple(types[t.name] for t in substitutes)  # pyright: ignore
+
+        return replace(
+            schema,
+            elements={
+                name: self._bind_element(e) for name, e in schema.elements.items()
+            },
+            simple_types=simple_types,
+            complex_types=complex_types,
+            simple_type_substitutes={
+                name: bound(simple_types, substitutes)
+                for name, substitutes in schema.simple_type_substitutes.items()
+            },
+            complex_type_substitutes={
+                name: bound(complex_types, substitutes)
+                for name, substitutes in schema.complex_type_substitutes.items()
+            },
+            built_in_providers={**schema.built_in_providers, **self._built_ins},
+        )
+
+    def _bind_element(self, xsd_element: ElementDecl) -> ElementDecl:
+        return replace(
+            xsd_element,
+            type=self._bind_type(xsd_element.type),
+            provider=self._elements.get(xsd_element.name, xsd_element.provider),
+            attribute_providers=self._element_attributes.get(
+                xsd_element.name, xsd_element.attribute_providers
+            ),
+        )
+
+    def _bind_type(self, type_definition: TypeDefinition) -> TypeDefinition:
+        match type_definition:
+            case SimpleType():
+                return self._bind_simple_type(type_definition)
+            case ComplexType():
+                return self._bind_complex_type(type_definition)
+            case _:
+                return type_definition
+
+    def _bind_simple_type(self, xsd_simple_type: SimpleType) -> SimpleType:
+        if xsd_simple_type.name is None:
+            return xsd_simple_type
+        provider = self._simple_types.get(xsd_simple_type.name)
+        if provider is None:
+            return xsd_simple_type
+        return replace(xsd_simple_type, provider=provider)
+
+    def _bind_complex_type(self, xsd_complex_type: ComplexType) -> ComplexType:
+        content = xsd_complex_type.content
+        match content:
+            case ModelGroup():
+                content = self._bind_particle(content)
+            case SimpleContentExtension():
+                content = replace(
+                    content, attributes=self._bind_attributes(content.attributes)
+                )
+            case ComplexContentExtension():
+                content = replace(
+                    content, extension=self._bind_complex_type(content.extension)
+                )
+
+        return replace(
+            xsd_complex_type,
+            content=content,
+            attributes=self._bind_attributes(xsd_complex_type.attributes),
+        )
+
+    def _bind_particle[_P: Particle](self, particle: _P) -> _P:
+        match particle:
+            case ElementDecl():
+                return self._bind_element(particle)
+            case ModelGroup():
+                particles = tuple(self._bind_particle(p) for p in particle.particles)
+                return replace(particle, particles=particles)
+            case _:
+                return particle
+
+    def _bind_attributes(
+        self, xsd_attributes: tuple[Attribute, ...]
+    ) -> tuple[Attribute, ...]:
+        return tuple(self._bind_attribute(a) for a in xsd_attributes)
+
+    def _bind_attribute(self, xsd_attribute: Attribute) -> Attribute:
+        if isinstance(xsd_attribute, AnyAttribute):
+            return xsd_attribute
+
+        xsd_type = xsd_attribute.type
+        if isinstance(xsd_type, SimpleType):
+            xsd_type = self._bind_simple_type(xsd_type)
+        return replace(
+            xsd_attribute,
+            type=xsd_type,
+            provider=self._attributes.get(xsd_attribute.name, xsd_attribute.provider),
+        )
+
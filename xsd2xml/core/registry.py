@@ -0,0 +1,219 @@
+"""
+Load schemas that span many documents through xsd:include, xsd:import and xsd:redefine.
+
+A registry parses every file once, however many schemas load it, and keeps
+the parsed documents for the schemas compiled later with the same registry.
+The network is never accessed: the location of a directive is looked up in
+the catalog, then resolved against the directory of the document that loads
+it, and a URL is only found through the catalog or by its file name in the
+search directories. A directive that finds no file is ignored, so that the
+components it would have declared are reported when generation reaches them.
+
+The documents loaded by one document are parsed concurrently, level by level.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import PathLike
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping
+from urllib.parse import urlsplit
+from xml.sax.saxutils import unescape
+import re
+import threading
+
+from .etree import XSDSource, _ElementTree
+from .namespaces import xsd
+
+# A parsed document is keyed by its file and, for an included document
+# without target namespace, by the namespace of the including schema
+type _DocumentKey = tuple[Path, str | None]
+
+# Directives and their attributes, found in the raw bytes of a document.
+# A false positive, e.g. in a comment, only adds a file to a cache key.
+_DIRECTIVE = re.compile(rb"<(?:[\w.-]+:)?(?:include|import|redefine)\b([^>]*)>")
+_ATTRIBUTE = re.compile(rb"""([\w.:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+
+
+class SchemaRegistry:
+    """
+    Parsed schema documents shared by the schemas compiled with this registry.
+
+    `catalog` maps a namespace or a schema location, as written in the
+    directives, to a local file. `directories` are searched for the file name
+    of the locations that are URLs. At most `max_workers` files are parsed at once.
+    """
+
+    def __init__(
+        self,
+        catalog: Mapping[str, str | PathLike[str]] | None = None,
+        directories: Iterable[str | PathLike[str]] = (),
+        max_workers: int = 4,
+    ) -> None:
+        self.catalog = {key: Path(path) for key, path in (catalog or {}).items()}
+        self.directories = [Path(directory) for directory in directories]
+        self.max_workers = max_workers
+        self._documents: dict[_DocumentKey, Future[_ElementTree]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, xsd_source: XSDSource) -> _ElementTree:
+        """
+        Parse an XSD and the documents it includes, imports and redefines.
+        A path is parsed once per registry. Bytes, file objects and trees have
+        no location, so their directives are resolved against the working directory.
+        """
+
+        if isinstance(xsd_source, (str, PathLike)):
+            [document] = self._load_documents([(Path(xsd_source).resolve(), None)])
+        else:
+            document = _ElementTree.parse(xsd_source)
+            if isinstance(xsd_source, bytes):
+                document.content = xsd_source
+        self._resolve(document)
+        return document
+
+    def read_closure(self, content: bytes, location: Path | None = None) -> list[bytes]:
+        """
+        The raw content of a document followed by the content of the documents it
+        loads, directly or not, located like `load` locates them but without parsing
+        any of them. `location` is the file of the document, if it has one.
+        """
+
+        contents = [content]
+        seen = set() if location is None else {location.resolve()}
+        level = [(content, location)]
+        while level:
+            next_level = []
+            for document_content, document_location in level:
+                for namespace, schema_location in _scan_directives(document_content):
+                    path = self._locate(document_location, namespace, schema_location)
+                    if path is None or path in seen:
+                        continue
+                    seen.add(path)
+                    loaded = path.read_bytes()
+                    contents.append(loaded)
+                    next_level.append((loaded, path))
+            level = next_level
+        return contents
+
+    def _resolve(self, root: _ElementTree) -> None:
+        """Load the directives of `root` and of the documents they load"""
+
+        seen = {id(root)}
+        level = [root]
+        while level:
+            unresolved: list[tuple[_ElementTree, list[_DocumentKey]]] = []
+            for document in level:
+                if document.imports is None:
+                    unresolved.append((document, self._locate_directives(document)))
+
+            keys = [key for _, document_keys in unresolved for key in document_keys]
+            loaded = iter(self._load_documents(keys))
+            for document, document_keys in unresolved:
+                document.set_imports([next(loaded) for _ in document_keys])
+
+            next_level = []
+            for document in level:
+                for imported in document.imports or ():
+                    if id(imported) not in seen:
+                        seen.add(id(imported))
+                        next_level.append(imported)
+            level = next_level
+
+    def _locate_directives(self, document: _ElementTree) -> list[_DocumentKey]:
+        keys = []
+        for tag, namespace, location in document.directives():
+            path = self._locate(document.location, namespace, location)
+            if path is None:
+                continue
+            if tag == "{" + xsd.__ns__ + "}import":
+                keys.append((path, None))
+            else:
+                keys.append(self._chameleon_key(path, document.target_namespace))
+        return keys
+
+    def _locate(
+        self, document_location: Path | None, namespace: str | None, location: str | None
+    ) -> Path | None:
+        for key in (namespace, location):
+            if key is not None and key in self.catalog:
+                return self.catalog[key].resolve()
+        if location is None:
+            return None
+
+        url = urlsplit(location)
+        if url.scheme and len(url.scheme) > 1:
+            # Never fetched: only a local copy with the same file name is used
+            file_name = Path(url.path).name
+            for directory in self.directories:
+                if (directory / file_name).is_file():
+                    return (directory / file_name).resolve()
+            return None
+
+        base = document_location.parent if document_location is not None else Path()
+        path = base / location
+        return path.resolve() if path.is_file() else None
+
+    def _chameleon_key(self, path: Path, namespace: str | None) -> _DocumentKey:
+        """
+        The key of an included document: a document that has a target namespace
+        of its own is the same whatever the namespace of the including schema.
+        """
+
+        if namespace is None:
+            return (path, None)
+        with self._lock:
+            future = self._documents.get((path, None))
+        if future is not None and future.done() and future.exception() is None:
+            if future.result().target_namespace is not None:
+                return (path, None)
+        return (path, namespace)
+
+    def _load_documents(self, keys: list[_DocumentKey]) -> list[_ElementTree]:
+        futures: list[Future[_ElementTree]] = []
+        to_parse: list[tuple[Future[_ElementTree], _DocumentKey]] = []
+        with self._lock:
+            for key in keys:
+                future = self._documents.get(key)
+                if future is None:
+                    future = self._documents[key] = Future()
+                    to_parse.append((future, key))
+                futures.append(future)
+
+        if len(to_parse) == 1:
+            self._parse(*to_parse[0])
+        elif to_parse:
+            workers = min(self.max_workers, len(to_parse))
+            with ThreadPoolExecutor(
+                workers, thread_name_prefix="xsd2xml-registry"
+            ) as executor:
+                for future, key in to_parse:
+                    _ = executor.submit(self._parse, future, key)
+        return [future.result() for future in futures]
+
+    def _parse(self, future: "Future[_ElementTree]", key: _DocumentKey) -> None:
+        path, namespace = key
+        try:
+            content = path.read_bytes()
+            document = _ElementTree.parse(content, namespace)
+            document.location = path
+            document.content = content
+        except BaseException as e:
+            # A later load parses the file again, e.g. once it has been fixed
+            with self._lock:
+                if self._documents.get(key) is future:
+                    del self._documents[key]
+            future.set_exception(e)
+        else:
+            future.set_result(document)
+
+
+def _scan_directives(content: bytes) -> Iterator[tuple[str | None, str | None]]:
+    """The namespace and schema location of the directives in a raw document"""
+    for match in _DIRECTIVE.finditer(content):
+        attributes = {
+            name.rpartition(b":")[2]: unescape(
+                (double if double is not None else single or b"").decode(errors="replace")
+            )
+            for name, double, single in _ATTRIBUTE.findall(match.group(1))
+        }
+        yield attributes.get(b"namespace"), attributes.get(b"schemaLocation")
@@ -0,0 +1,42 @@
+from typing import Iterable, Iterator
+import xml.etree.ElementTree as ET
+
+from .events import END, Event, Start
+
+
+def build_tree(events: Iterable[Event]) -> ET.ElementTree:
+    """
+    Build an ElementTree from the events of a document.
+    Every node is created once, directly as an `ET.Element`.
+    """
+
+    root = None
+    open_elements: list[ET.Element] = []
+    for event in events:
+        if isinstance(event, Start):
+            if open_elements:
+                element = ET.SubElement(open_elements[-1], event.tag, event.attrib)
+            else:
+                element = root = ET.Element(event.tag, event.attrib)
+            element.text = event.text
+            open_elements.append(element)
+        else:
+            _ = open_elements.pop()
+
+    if root is None:
+        raise ValueError()
+    return ET.ElementTree(root)
+
+
+def tree_events(root: ET.Element) -> Iterator[Event]:
+    """The events of a tree, the inverse of `build_tree`"""
+    stack = [iter((root,))]
+    while stack:
+        for element in stack[-1]:
+            yield Start(element.tag, element.attrib, element.text)
+            stack.append(iter(element))
+            break
+        else:
+            _ = stack.pop()
+            if stack:
+                yield END
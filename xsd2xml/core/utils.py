@@ -2,3 +2,11 @@ ns = {"xsd": "http://www.w3.org/2001/XMLSchema"}
 
 
 class InvalidXSDError(Exception): ...
+
+
+class InvalidDocumentError(Exception):
+    """A document violates its schema, see `CompiledSchema.validate`"""
+
+    def __init__(self, violations: list) -> None:
+        super().__init__("\n".join(str(violation) for violation in violations))
+        self.violations = violations
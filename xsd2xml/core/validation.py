@@ -0,0 +1,736 @@
+"""
+Validate documents against the compiled schema they were generated from.
+
+The validator walks an `ET.Element` tree with the same model the generator
+uses: content models and their occurrences, attribute uses, `xsi:type`
+substitutes, enumerations, the facets of restrictions and the lexical space
+of the built-in types. IDs must be unique and IDREFs must refer to them.
+Nothing is serialized or parsed again, which makes checking a generated
+document much cheaper than validating its serialization with a full XSD
+validator. It is no such validator: identity constraints, substitution
+groups, nillable elements and mixed content are not modelled, and wildcard
+content is accepted without being checked.
+
+Violations are reported with the path of the element they were found in.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Iterable, NamedTuple
+import base64
+import binascii
+import re
+import xml.etree.ElementTree as ET
+
+from .builtins import BuiltIn
+from .events import Event
+from .model import (
+    AnyAttribute,
+    AnyElement,
+    Attribute,
+    AttributeUse,
+    ComplexContentExtension,
+    ComplexType,
+    CompiledSchema,
+    Compositor,
+    ElementDecl,
+    ElementRef,
+    Facet,
+    ModelGroup,
+    Occurs,
+    Particle,
+    Restriction,
+    SimpleContentExtension,
+    SimpleType,
+    Unsupported,
+)
+from .namespaces import xsi
+from .utils import InvalidDocumentError, InvalidXSDError
+
+
+@dataclass(frozen=True, slots=True)
+class Violation:
+    path: str
+    """The path of the element, e.g. `/premis/object[2]/objectCharacteristics[1]`"""
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}"
+
+
+# The attributes, the type of the text and the children of a complex type,
+# with its extensions flattened
+@dataclass(frozen=True, slots=True)
+class _Content:
+    attributes: tuple[Attribute, ...]
+    text: BuiltIn | SimpleType | None
+    particles: tuple[Particle, ...]
+
+
+# How the tags of the children of an element match a content model
+@dataclass(frozen=True, slots=True)
+class _Match:
+    declarations: tuple[ElementDecl | None, ...] | None
+    """The declaration of every child, or None for a wildcard. None for no match."""
+    farthest: int
+    """The position of the first child that could not be matched"""
+
+
+# The declared type of an element, the types that may replace it through
+# xsi:type, and whether the declared type itself may be used
+class _ElementType(NamedTuple):
+    type: BuiltIn | SimpleType | ComplexType
+    substitutes: tuple[SimpleType | ComplexType, ...]
+    concrete: bool
+
+
+# The path of an element: the path of its parent, the parent and the position in it.
+# Only formatted when a violation is reported.
+type _Path = tuple["_Path", ET.Element, int] | str
+
+
+def validate(
+    schema: CompiledSchema, document: ET.ElementTree | ET.Element | Iterable[Event]
+) -> list[Violation]:
+    """
+    The violations of the schema in `document`, whose root must be a global element.
+    The events of a document are built into a tree first.
+    """
+    if isinstance(document, ET.ElementTree):
+        root = document.getroot()
+    elif isinstance(document, ET.Element):
+        root = document
+    else:
+        from . import tree
+
+        root = tree.build_tree(document).getroot()
+    if root is None:
+        raise ValueError()
+    return _DocumentValidator(_schema_cache(schema)).validate(root)
+
+
+def check(
+    schema: CompiledSchema, document: ET.ElementTree | ET.Element | Iterable[Event]
+) -> None:
+    """Raise `InvalidDocumentError` when `document` violates the schema"""
+    violations = validate(schema, document)
+    if violations:
+        raise InvalidDocumentError(violations)
+
+
+class _SchemaCache:
+    """
+    What validating the documents of a schema has in common: the flattened
+    complex types and how sequences of tags match their content models.
+    Generated documents repeat the same sequences of children over and over.
+    """
+
+    def __init__(self, schema: CompiledSchema) -> None:
+        self.schema = schema
+        self._element_types: dict[int, _ElementType] = {}
+        self._contents: dict[int, _Content] = {}
+        self._matches: dict[tuple[int, tuple[str, ...]], _Match] = {}
+
+    def element_type(self, xsd_element: ElementDecl) -> _ElementType:
+        key = id(xsd_element)
+        element_type = self._element_types.get(key)
+        if element_type is None:
+            element_type = self._element_types[key] = self._find_element_type(
+                xsd_element
+            )
+        return element_type
+
+    def _find_element_type(self, xsd_element: ElementDecl) -> _ElementType:
+        xsd_type = self.schema.find_type(xsd_element.type)
+        substitutes: tuple[SimpleType | ComplexType, ...]
+        if isinstance(xsd_type, BuiltIn):
+            return _ElementType(xsd_type, (), True)
+        if xsd_type.name is None:
+            substitutes = (xsd_type,)
+        elif isinstance(xsd_type, SimpleType):
+            substitutes = self.schema.simple_type_substitutes[xsd_type.name]
+        else:
+            substitutes = self.schema.complex_type_substitutes[xsd_type.name]
+        concrete = any(substitute is xsd_type for substitute in substitutes)
+        return _ElementType(xsd_type, substitutes, concrete)
+
+    def content(self, xsd_complex_type: ComplexType) -> _Content:
+        key = id(xsd_complex_type)
+        content = self._contents.get(key)
+        if content is None:
+            content = self._contents[key] = self._flatten(xsd_complex_type)
+        return content
+
+    def _flatten(self, xsd_complex_type: ComplexType) -> _Content:
+        match xsd_complex_type.content:
+            case None:
+                return _Content(xsd_complex_type.attributes, None, ())
+            case ModelGroup() as model_group:
+                return _Content(xsd_complex_type.attributes, None, (model_group,))
+            case SimpleContentExtension(base, attributes):
+                xsd_type = self.schema.find_type(base)
+                if isinstance(xsd_type, ComplexType):
+                    content = self.content(xsd_type)
+                    return _Content(
+                        content.attributes + attributes,
+                        content.text,
+                        content.particles,
+                    )
+                return _Content(attributes, xsd_type, ())
+            case ComplexContentExtension(base, extension):
+                xsd_type = self.schema.find_type(base)
+                if not isinstance(xsd_type, ComplexType):
+                    raise InvalidXSDError()
+                content = self.content(xsd_type)
+                extension_content = self.content(extension)
+                return _Content(
+                    content.attributes + extension_content.attributes,
+                    content.text,
+                    content.particles + extension_content.particles,
+                )
+            case Unsupported(error):
+                raise error()
+
+    def match(self, content: _Content, tags: tuple[str, ...]) -> _Match:
+        key = (id(content), tags)
+        result = self._matches.get(key)
+        if result is None:
+            if len(self._matches) >= _MAX_MATCHES:
+                self._matches.clear()
+            result = self._matches[key] = _ContentMatcher(self.schema, tags).match(
+                content.particles
+            )
+        return result
+
+
+# Bounds the memory of the matches of content models with many repetitions
+_MAX_MATCHES = 10_000
+def _schema_cache(schema: CompiledSchema) -> _SchemaCache:
+    """The cache stored on the schema, so that it lives as long as the schema"""
+    cache = schema._validation_cache
+    if cache is None:
+        cache = _SchemaCache(schema)
+        object.__setattr__(schema, "_validation_cache", cache)
+    return cache
+
+
+class _DocumentValidator:
+    def __init__(self, cache: _SchemaCache) -> None:
+        self.cache = cache
+        self.schema = cache.schema
+        self.violations: list[Violation] = []
+        self.ids: set[str] = set()
+        # The IDREFs and the paths of the elements they were found in
+        self.idrefs: list[tuple[str, _Path]] = []
+
+    def validate(self, root: ET.Element) -> list[Violation]:
+        path = "/" + _local_name(root.tag)
+        xsd_element = self.schema.elements.get(root.tag)
+        if xsd_element is None:
+            self._report(path, f"{root.tag} is not a global element")
+            return self.violations
+
+        # An explicit stack, as documents may be nested deeper than the recursion limit
+        stack: list[tuple[ET.Element, ElementDecl, _Path]] = [(root, xsd_element, path)]
+        while stack:
+            element, xsd_element, path = stack.pop()
+            children = self._validate_element(element, xsd_element, path)
+            stack.extend(reversed(children))
+
+        for idref, path in self.idrefs:
+            if idref not in self.ids:
+                self._report(path, f"IDREF {idref!r} does not refer to an ID")
+        return self.violations
+
+    def _report(self, path: _Path, message: str) -> None:
+        self.violations.append(Violation(_format_path(path), message))
+
+    def _validate_element(
+        self, element: ET.Element, xsd_element: ElementDecl, path: _Path
+    ) -> list[tuple[ET.Element, ElementDecl, _Path]]:
+        """Validate an element and return its children that are to be validated"""
+
+        xsd_type = self._element_type(element, xsd_element, path)
+        if xsd_type is None:
+            return []
+
+        if not isinstance(xsd_type, ComplexType):
+            self._validate_attributes(element, (), path)
+            self._validate_no_children(element, path)
+            self._validate_value(xsd_type, element.text or "", path, "text")
+            return []
+
+        content = self.cache.content(xsd_type)
+        self._validate_attributes(element, content.attributes, path)
+        if content.text is not None:
+            self._validate_no_children(element, path)
+            self._validate_value(content.text, element.text or "", path, "text")
+            return []
+
+        text = element.text
+        if text is not None and not text.isspace():
+            self._report(path, "text is not allowed in element-only content")
+        for child in element:
+            tail = child.tail
+            if tail is not None and not tail.isspace():
+                self._report(path, "text is not allowed in element-only content")
+        return self._validate_children(element, content, path)
+
+    def _element_type(
+        self, element: ET.Element, xsd_element: ElementDecl, path: _Path
+    ) -> BuiltIn | SimpleType | ComplexType | None:
+        """The type of an element, taking its `xsi:type` into account"""
+
+        xsd_type, substitutes, concrete = self.cache.element_type(xsd_element)
+        xsi_type = element.get(xsi.type)
+        if xsi_type is None:
+            if concrete:
+                return xsd_type
+            self._report(path, f"abstract type {xsd_type.name} needs an xsi:type")
+            return None
+        # A parsed document has a prefixed name, which is compared by its local name
+        if not xsi_type.startswith("{"):
+            xsi_type = xsi_type.rpartition(":")[2]
+        for substitute in substitutes:
+            if substitute.name is not None and xsi_type in (
+                substitute.name,
+                _local_name(substitute.name),
+            ):
+                return substitute
+        self._report(path, f"xsi:type {xsi_type} cannot replace {xsd_type.name}")
+        return None
+
+    def _validate_attributes(
+        self, element: ET.Element, xsd_attributes: tuple[Attribute, ...], path: _Path
+    ) -> None:
+        attrib = element.attrib
+        declared = 0
+        any_attribute = False
+        for xsd_attribute in xsd_attributes:
+            if isinstance(xsd_attribute, AnyAttribute):
+                any_attribute = True
+                continue
+            value = attrib.get(xsd_attribute.name)
+            if value is None:
+                if xsd_attribute.required:
+                    name = xsd_attribute.name
+                    self._report(path, f"missing required attribute {name}")
+                continue
+            declared += 1
+            self._validate_attribute_value(xsd_attribute, value, path)
+
+        if any_attribute or declared == len(attrib):
+            return
+        names = {a.name for a in xsd_attributes if isinstance(a, AttributeUse)}
+        for name in attrib:
+            if name not in names and not name.startswith("{" + xsi.__ns__ + "}"):
+                self._report(path, f"attribute {name} is not allowed")
+
+    def _validate_attribute_value(
+        self, xsd_attribute: AttributeUse, value: str, path: _Path
+    ) -> None:
+        xsd_type = self.schema.find_type(xsd_attribute.type)
+        if isinstance(xsd_type, ComplexType):
+            raise InvalidXSDError()
+        self._validate_value(xsd_type, value, path, f"attribute {xsd_attribute.name}")
+
+    def _validate_no_children(self, element: ET.Element, path: _Path) -> None:
+        if len(element):
+            self._report(path, "child elements are not allowed in simple content")
+
+    def _validate_value(
+        self, xsd_type: BuiltIn | SimpleType, value: str, path: _Path, what: str
+    ) -> None:
+        if isinstance(xsd_type, BuiltIn):
+            restriction = _BUILT_IN_RESTRICTIONS[xsd_type]
+        else:
+            match xsd_type.content:
+                case Restriction() as restriction:
+                    pass
+                case Unsupported(error):
+                    raise error()
+
+        base = restriction.base
+        if base not in (BuiltIn.string, BuiltIn.normalizedstring):
+            value = " ".join(value.split())
+        problem = _built_in_problem(base, value) or _facet_problem(restriction, value)
+        if problem is not None:
+            self._report(path, f"{what} {value!r} {problem}")
+            return
+
+        if base is BuiltIn.id:
+            if value in self.ids:
+                self._report(path, f"{what} {value!r} is a duplicate ID")
+            self.ids.add(value)
+        elif base is BuiltIn.idref:
+            self.idrefs.append((value, path))
+        elif base is BuiltIn.idrefs:
+            self.idrefs.extend((idref, path) for idref in value.split())
+
+    def _validate_children(
+        self, element: ET.Element, content: _Content, path: _Path
+    ) -> list[tuple[ET.Element, ElementDecl, _Path]]:
+        children = list(element)
+        result = self.cache.match(content, tuple(child.tag for child in children))
+        if result.declarations is None:
+            if result.farthest < len(children):
+                tag = children[result.farthest].tag
+                self._report(path, f"element {tag} is not expected here")
+            else:
+                self._report(path, "required child elements are missing")
+            return []
+
+        return [
+            (child, xsd_element, (path, element, i))
+            for i, (child, xsd_element) in enumerate(zip(children, result.declarations))
+            if xsd_element is not None
+        ]
+
+
+def _format_path(path: _Path) -> str:
+    """The path of an element, with the position of every element among its namesakes"""
+    steps = []
+    while not isinstance(path, str):
+        path, parent, i = path
+        tag = parent[i].tag
+        position = sum(1 for sibling in parent[: i + 1] if sibling.tag == tag)
+        steps.append(f"{_local_name(tag)}[{position}]")
+    steps.append(path)
+    return "/".join(reversed(steps))
+
+
+class _ContentMatcher:
+    """
+    Matches the tags of the children of an element against particles. Matching
+    a particle from a position gives every position it can end at, so ambiguous
+    content models are matched without backtracking.
+    """
+
+    def __init__(self, schema: CompiledSchema, tags: tuple[str, ...]) -> None:
+        self.schema = schema
+        self.tags = tags
+        self.farthest = 0
+        self.declarations: dict[int, ElementDecl] = {}
+        self._memo: dict[tuple[int, int], frozenset[int]] = {}
+
+    def match(self, particles: tuple[Particle, ...]) -> _Match:
+        ends = {0}
+        for particle in particles:
+            ends = self.match_all(particle, ends)
+        n = len(self.tags)
+        if n not in ends:
+            return _Match(None, self.farthest)
+        return _Match(tuple(self.declarations.get(i) for i in range(n)), n)
+
+    def match_all(self, particle: Particle, starts: Iterable[int]) -> set[int]:
+        ends = set()
+        for start in starts:
+            ends |= self.match_particle(particle, start)
+        return ends
+
+    def match_particle(self, particle: Particle, start: int) -> frozenset[int]:
+        key = (id(particle), start)
+        ends = self._memo.get(key)
+        if ends is None:
+            ends = self._memo[key] = frozenset(self._match(particle, start))
+        return ends
+
+    def _match(self, particle: Particle, start: int) -> set[int]:
+        match particle:
+            case ElementDecl() | ElementRef():
+                xsd_element = self.schema.find_element(particle)
+                return _repeat(
+                    lambda i: self._match_element(xsd_element, i),
+                    particle.occurs,
+                    start,
+                )
+            case AnyElement(occurs):
+                return _repeat(self._match_any, occurs, start)
+            case ModelGroup(Compositor.sequence, particles, occurs):
+                return _repeat(
+                    lambda i: self._match_sequence(particles, i), occurs, start
+                )
+            case ModelGroup(Compositor.choice, particles, occurs):
+                return _repeat(
+                    lambda i: self._match_choice(particles, i), occurs, start
+                )
+            case ModelGroup(Compositor.all, particles, occurs):
+                return _repeat(lambda i: self._match_all(particles, i), occurs, start)
+            case Unsupported(error):
+                raise error()
+        raise AssertionError(particle)
+
+    def _match_element(self, xsd_element: ElementDecl, i: int) -> set[int]:
+        if i < len(self.tags) and self.tags[i] == xsd_element.name:
+            _ = self.declarations.setdefault(i, xsd_element)
+            self.farthest = max(self.farthest, i + 1)
+            return {i + 1}
+        return set()
+
+    def _match_any(self, i: int) -> set[int]:
+        if i < len(self.tags):
+            self.farthest = max(self.farthest, i + 1)
+            return {i + 1}
+        return set()
+
+    def _match_sequence(self, particles: tuple[Particle, ...], start: int) -> set[int]:
+        ends = {start}
+        for particle in particles:
+            ends = self.match_all(particle, ends)
+            if not ends:
+                break
+        return ends
+
+    def _match_choice(self, particles: tuple[Particle, ...], start: int) -> set[int]:
+        ends = set()
+        for particle in particles:
+            ends |= self.match_particle(particle, start)
+        return ends
+
+    def _match_all(self, particles: tuple[Particle, ...], start: int) -> set[int]:
+        """Every particle of an all group, in any order"""
+        required = frozenset(
+            i for i, particle in enumerate(particles) if _min_occurs(particle) > 0
+        )
+        ends = set()
+        states = {(start, frozenset[int]())}
+        seen = set(states)
+        while states:
+            next_states = set()
+            for position, used in states:
+                if required <= used:
+                    ends.add(position)
+                for i, particle in enumerate(particles):
+                    if i in used:
+                        continue
+                    for end in self.match_particle(particle, position):
+                        if end != position:
+                            next_states.add((end, used | {i}))
+            states = next_states - seen
+            seen |= states
+        return ends
+
+
+_BUILT_IN_RESTRICTIONS = {built_in: Restriction(built_in) for built_in in BuiltIn}
+
+
+def _min_occurs(particle: Particle) -> int:
+    if isinstance(particle, Unsupported):
+        return 1
+    return particle.occurs.min
+
+
+def _repeat(
+    match_one: Callable[[int], set[int]], occurs: Occurs, start: int
+) -> set[int]:
+    """The positions that `occurs.min` to `occurs.max` repetitions can end at"""
+    ends = {start} if occurs.min == 0 else set()
+    current = {start}
+    repetitions = 0
+    while current and (occurs.max is None or repetitions < occurs.max):
+        repetitions += 1
+        reached = set()
+        for position in current:
+            reached |= match_one(position)
+        if repetitions < occurs.min:
+            current = reached
+            continue
+        # Positions that were reached before were already repeated from
+        current = reached - ends
+        ends |= reached
+    return ends
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+_NCNAME = r"[^\W\d][\w.\-]*"
+_NAME = r"([^\W\d]|:)[\w.\-:]*"
+_NMTOKEN = r"[\w.\-:]+"
+_INTEGER = r"[+-]?\d+"
+_DECIMAL = r"[+-]?(\d+(\.\d*)?|\.\d+)"
+_TIME_ZONE = r"(Z|[+-]\d\d:\d\d)?"
+_YEAR = r"-?\d{4,}"
+_MONTH = r"(0[1-9]|1[0-2])"
+_DAY = r"(0[1-9]|[12]\d|3[01])"
+_TIME = r"([01]\d|2[0-3]):[0-5]\d:[0-5]\d(\.\d+)?"
+
+_PATTERNS: dict[BuiltIn, re.Pattern[str]] = {
+    built_in: re.compile(pattern)
+    for built_in, pattern in {
+        BuiltIn.boolean: r"true|false|1|0",
+        BuiltIn.decimal: _DECIMAL,
+        BuiltIn.float: rf"INF|-INF|NaN|{_DECIMAL}([eE][+-]?\d+)?",
+        BuiltIn.double: rf"INF|-INF|NaN|{_DECIMAL}([eE][+-]?\d+)?",
+        BuiltIn.duration: (
+            r"-?P(?=\d|T\d)(\d+Y)?(\d+M)?(\d+D)?(T(?=\d)(\d+H)?(\d+M)?(\d+(\.\d+)?S)?)?"
+        ),
+        BuiltIn.date_time: rf"{_YEAR}-{_MONTH}-{_DAY}T{_TIME}{_TIME_ZONE}",
+        BuiltIn.time: rf"{_TIME}{_TIME_ZONE}",
+        BuiltIn.date: rf"{_YEAR}-{_MONTH}-{_DAY}{_TIME_ZONE}",
+        BuiltIn.g_year_month: rf"{_YEAR}-{_MONTH}{_TIME_ZONE}",
+        BuiltIn.g_year: rf"{_YEAR}{_TIME_ZONE}",
+        BuiltIn.g_month_day: rf"--{_MONTH}-{_DAY}{_TIME_ZONE}",
+        BuiltIn.g_day: rf"---{_DAY}{_TIME_ZONE}",
+        BuiltIn.g_month: rf"--{_MONTH}{_TIME_ZONE}",
+        BuiltIn.hex_binary: r"([0-9a-fA-F]{2})*",
+        BuiltIn.q_name: rf"({_NCNAME}:)?{_NCNAME}",
+        BuiltIn.notation: rf"({_NCNAME}:)?{_NCNAME}",
+        BuiltIn.normalizedstring: r"[^\t\n\r]*",
+        BuiltIn.token: r"([^\s]+( [^\s]+)*)?",
+        BuiltIn.language: r"[a-zA-Z]{1,8}(-[a-zA-Z0-9]{1,8})*",
+        BuiltIn.nmtoken: _NMTOKEN,
+        BuiltIn.nmtokens: rf"{_NMTOKEN}( {_NMTOKEN})*",
+        BuiltIn.xsd_name: _NAME,
+        BuiltIn.ncname: _NCNAME,
+        BuiltIn.id: _NCNAME,
+        BuiltIn.idref: _NCNAME,
+        BuiltIn.idrefs: rf"{_NCNAME}( {_NCNAME})*",
+        BuiltIn.entity: _NCNAME,
+        BuiltIn.entities: rf"{_NCNAME}( {_NCNAME})*",
+    }.items()
+}
+
+# The inclusive bounds of the integer types
+_INTEGER_RANGES: dict[BuiltIn, tuple[int | None, int | None]] = {
+    BuiltIn.integer: (None, None),
+    BuiltIn.nonpositiveinteger: (None, 0),
+    BuiltIn.negativeinteger: (None, -1),
+    BuiltIn.long: (-(2**63), 2**63 - 1),
+    BuiltIn.int: (-(2**31), 2**31 - 1),
+    BuiltIn.short: (-(2**15), 2**15 - 1),
+    BuiltIn.byte: (-(2**7), 2**7 - 1),
+    BuiltIn.nonnegativeinteger: (0, None),
+    BuiltIn.unsignedlong: (0, 2**64 - 1),
+    BuiltIn.unsignedint: (0, 2**32 - 1),
+    BuiltIn.unsignedshort: (0, 2**16 - 1),
+    BuiltIn.unsignedbyte: (0, 2**8 - 1),
+    BuiltIn.positiveinteger: (1, None),
+}
+
+
+def _built_in_problem(built_in: BuiltIn, value: str) -> str | None:
+    """Why `value` is not in the lexical space of `built_in`, if it is not"""
+
+    if built_in in _INTEGER_RANGES:
+        if re.fullmatch(_INTEGER, value) is None:
+            return f"is not a valid {built_in.name}"
+        low, high = _INTEGER_RANGES[built_in]
+        number = int(value)
+        if (low is not None and number < low) or (high is not None and number > high):
+            return f"is out of range for {built_in.name}"
+        return None
+    if built_in is BuiltIn.base64_binary:
+        try:
+            _ = base64.b64decode(value.replace(" ", ""), validate=True)
+        except binascii.Error:
+            return "is not valid base64Binary"
+        return None
+
+    pattern = _PATTERNS.get(built_in)
+    if pattern is not None and pattern.fullmatch(value) is None:
+        return f"is not a valid {built_in.name}"
+    return None
+
+
+_NUMERIC = {BuiltIn.decimal, BuiltIn.float, BuiltIn.double} | _INTEGER_RANGES.keys()
+_LISTS = {BuiltIn.nmtokens, BuiltIn.idrefs, BuiltIn.entities}
+
+
+def _facet_problem(restriction: Restriction, value: str) -> str | None:
+    """Why `value` is not allowed by the enumerations and facets of `restriction`"""
+
+    if restriction.enumerations and value not in restriction.enumerations:
+        return "is not one of the enumerated values"
+
+    patterns = [facet.value for facet in restriction.facets if facet.kind == "pattern"]
+    if patterns and not any(_matches_pattern(p, value) for p in patterns if p):
+        return "does not match the pattern"
+
+    for facet in restriction.facets:
+        if facet.value is None:
+            continue
+        problem = _single_facet_problem(restriction.base, facet, value)
+        if problem is not None:
+            return problem
+    return None
+
+
+def _single_facet_problem(base: BuiltIn, facet: Facet, value: str) -> str | None:
+    assert facet.value is not None
+    match facet.kind:
+        case "length" | "minLength" | "maxLength":
+            length = _length(base, value)
+            limit = int(facet.value)
+            if (
+                (facet.kind == "length" and length != limit)
+                or (facet.kind == "minLength" and length < limit)
+                or (facet.kind == "maxLength" and length > limit)
+            ):
+                return f"does not have {facet.kind} {limit}"
+        case "minInclusive" | "maxInclusive" | "minExclusive" | "maxExclusive":
+            if base not in _NUMERIC:
+                return None
+            number, limit = _number(value), _number(facet.value)
+            if number is None or limit is None or number.is_nan() or limit.is_nan():
+                return None
+            if (
+                (facet.kind == "minInclusive" and number < limit)
+                or (facet.kind == "maxInclusive" and number > limit)
+                or (facet.kind == "minExclusive" and number <= limit)
+                or (facet.kind == "maxExclusive" and number >= limit)
+            ):
+                return f"violates {facet.kind} {facet.value}"
+        case "totalDigits" | "fractionDigits":
+            number = _number(value)
+            if number is None or not number.is_finite():
+                return None
+            digits = number.normalize().as_tuple()
+            fraction_digits = max(0, -int(digits.exponent))
+            total_digits = max(len(digits.digits), fraction_digits)
+            actual = total_digits if facet.kind == "totalDigits" else fraction_digits
+            if actual > int(facet.value):
+                return f"violates {facet.kind} {facet.value}"
+    return None
+
+
+def _length(base: BuiltIn, value: str) -> int:
+    if base in _LISTS:
+        return len(value.split())
+    if base is BuiltIn.hex_binary:
+        return len(value) // 2
+    if base is BuiltIn.base64_binary:
+        return len(base64.b64decode(value.replace(" ", "")))
+    return len(value)
+
+
+def _number(value: str) -> Decimal | None:
+    try:
+        return Decimal(value.replace("INF", "Infinity"))
+    except InvalidOperation:
+        return None
+
+
+# The multi-character escapes of XSD regular expressions that Python lacks
+_XSD_ESCAPES = {
+    r"\i": r"[^\W\d]|:",
+    r"\c": r"[\w.\-:]",
+    r"\I": r"[\W\d]",
+    r"\C": r"[^\w.\-:]",
+}
+_patterns: dict[str, re.Pattern[str] | None] = {}
+
+
+def _matches_pattern(pattern: str, value: str) -> bool:
+    compiled = _patterns.get(pattern, ...)
+    if compiled is ...:
+        translated = pattern
+        for escape, replacement in _XSD_ESCAPES.items():
+            translated = translated.replace(escape, f"(?:{replacement})")
+        try:
+            compiled = re.compile(translated)
+        except re.error:
+            compiled = None  # Not checked rather than wrongly rejected
+        _patterns[pattern] = compiled
+    return compiled is None or compiled.fullmatch(value) is not None
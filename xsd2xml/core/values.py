@@ -0,0 +1,441 @@
+"""
+Values of built-in types, generated a block at a time.
+
+Every document has its own pools, filled from the random generator of the
+document so that the output stays reproducible. A pool is refilled with a
+whole block of values drawn from one read of random bytes. Blocks grow on
+every refill, so long documents amortize the refills while short documents
+waste few values.
+
+When NumPy is installed, it draws the random numbers of the blocks. The two
+backends produce different documents for the same seed.
+"""
+
+from typing import Callable, Mapping, Protocol
+import base64
+import random
+import string
+
+from .builtins import BuiltIn
+from .model import Provider
+
+try:
+    import numpy  # pyright: ignore[reportMissingImports]
+except ImportError:  # NumPy is optional
+    numpy = None
+
+_FIRST_BLOCK = 8
+_MAX_BLOCK = 1024
+
+
+class _Entropy(Protocol):
+    def bytes(self, n: int) -> bytes: ...
+
+    def integers(self, low: int, high: int, n: int) -> list[int]:
+        """`n` integers from `low` up to and including `high`, with `high - low < 2**64`"""
+        ...
+
+    def floats(self, n: int) -> list[float]:
+        """`n` floats in [0, 1)"""
+        ...
+
+
+class _RandomEntropy:
+    __slots__ = ("_random",)
+
+    def __init__(self, rng: random.Random) -> None:
+        self._random = rng
+
+    def bytes(self, n: int) -> bytes:
+        return self._random.randbytes(n)
+
+    def _words(self, n: int) -> memoryview:
+        return memoryview(self._random.randbytes(8 * n)).cast("Q")
+
+    def integers(self, low: int, high: int, n: int) -> list[int]:
+        # The modulo bias is at most span / 2**64, negligible for test data
+        span = high - low + 1
+        return [low + word % span for word in self._words(n)]
+
+    def floats(self, n: int) -> list[float]:
+        return [(word >> 11) * 2**-53 for word in self._words(n)]
+
+
+class _NumPyEntropy:
+    __slots__ = ("_generator",)
+
+    def __init__(self, rng: random.Random) -> None:
+        assert numpy is not None
+        self._generator = numpy.random.default_rng(rng.getrandbits(128))
+
+    def bytes(self, n: int) -> bytes:
+        return self._generator.bytes(n)
+
+    def integers(self, low: int, high: int, n: int) -> list[int]:
+        assert numpy is not None
+        dtype = numpy.uint64 if low >= 0 else numpy.int64
+        return self._generator.integers(low, high, n, dtype, endpoint=True).tolist()
+
+    def floats(self, n: int) -> list[float]:
+        return self._generator.random(n).tolist()
+
+
+def _new_entropy(rng: random.Random) -> _Entropy:
+    if numpy is not None:
+        return _NumPyEntropy(rng)
+    return _RandomEntropy(rng)
+
+
+class ValuePools:
+    """
+    The values of built-in types that are handed out to one document.
+    """
+
+    __slots__ = ("_random", "_providers", "_entropy", "_pools", "_block_sizes")
+
+    def __init__(
+        self, rng: random.Random, providers: Mapping[BuiltIn, Provider] | None = None
+    ) -> None:
+        self._random = rng
+        self._providers = providers or {}
+        self._entropy = _new_entropy(rng)
+        self._pools: dict[BuiltIn, list[str]] = {}
+        self._block_sizes: dict[BuiltIn, int] = {}
+
+    def take(self, type: BuiltIn) -> str:
+        pool = self._pools.get(type)
+        if not pool:
+            pool = self._refill(type)
+        return pool.pop()
+
+    def _refill(self, type: BuiltIn) -> list[str]:
+        block_size = self._block_sizes.get(type, _FIRST_BLOCK)
+        self._block_sizes[type] = min(2 * block_size, _MAX_BLOCK)
+
+        provider = self._providers.get(type)
+        if provider is not None:
+            pool = [provider(self._random) for _ in range(block_size)]
+        else:
+            fill = _FILLERS.get(type)
+            if fill is None:
+                raise NotImplementedError()
+            pool = fill(self._entropy, block_size)
+        pool.reverse()  # Values are popped from the end
+        self._pools[type] = pool
+        return pool
+
+
+_LETTERS = string.ascii_letters.encode()
+# Bytes are mapped onto letters, dropping the bytes that would make some letters more likely
+_LETTER_TABLE = bytes(_LETTERS[i % len(_LETTERS)] for i in range(256))
+_NOT_LETTERS = bytes(range(256 // len(_LETTERS) * len(_LETTERS), 256))
+
+
+def _letters(entropy: _Entropy, k: int) -> str:
+    letters = b""
+    while len(letters) < k:
+        random_bytes = entropy.bytes(k - len(letters) + k // 4 + 8)
+        letters += random_bytes.translate(_LETTER_TABLE, _NOT_LETTERS)
+    return letters[:k].decode("ascii")
+
+
+def _words(entropy: _Entropy, n: int, length: int = 10) -> list[str]:
+    letters = _letters(entropy, n * length)
+    return [letters[i : i + length] for i in range(0, n * length, length)]
+
+
+def _booleans(entropy: _Entropy, n: int) -> list[str]:
+    return ["true" if b & 1 else "false" for b in entropy.bytes(n)]
+
+
+def _signed_integer(value: int, plus_sign: bool) -> str:
+    if value > 0 and plus_sign:
+        return f"+{value}"
+    return str(value)
+
+
+def _small_integers(entropy: _Entropy, n: int) -> list[str]:
+    values = entropy.integers(-100, 100, n)
+    return [_signed_integer(v, b & 1 == 1) for v, b in zip(values, entropy.bytes(n))]
+
+
+def _small_non_negative_integers(entropy: _Entropy, n: int) -> list[str]:
+    values = entropy.integers(0, 100, n)
+    return [f"+{v}" if b & 1 else str(v) for v, b in zip(values, entropy.bytes(n))]
+
+
+def _decimals(entropy: _Entropy, n: int) -> list[str]:
+    integer_parts = _small_integers(entropy, n)
+    fractional_parts = entropy.integers(0, 100, n)
+    forms = entropy.integers(0, 3, n)
+
+    decimals = []
+    for integer_part, fractional_part, form in zip(
+        integer_parts, fractional_parts, forms
+    ):
+        match form:
+            case 0:
+                decimals.append(integer_part)
+            case 1:
+                decimals.append(f"{integer_part}.")
+            case 2:
+                decimals.append(f"{integer_part}.00")
+            case _:
+                decimals.append(f"{integer_part}.{fractional_part}")
+    return decimals
+
+
+def _floats(entropy: _Entropy, n: int) -> list[str]:
+    return [str(-100 + 200 * f) for f in entropy.floats(n)]
+
+
+# Special values have weight 1, the three notations of a finite number weight 10
+_DOUBLE_SPECIALS = ("INF", "-INF", "NaN", "NaN", "-0")
+
+
+def _doubles(entropy: _Entropy, n: int) -> list[str]:
+    mantissas = _decimals(entropy, n)
+    exponents = _small_integers(entropy, n)
+    choices = entropy.integers(0, len(_DOUBLE_SPECIALS) + 29, n)
+
+    doubles = []
+    for mantissa, exponent, choice in zip(mantissas, exponents, choices):
+        if choice < len(_DOUBLE_SPECIALS):
+            doubles.append(_DOUBLE_SPECIALS[choice])
+        elif choice < len(_DOUBLE_SPECIALS) + 10:
+            doubles.append(f"{mantissa}e{exponent}")
+        elif choice < len(_DOUBLE_SPECIALS) + 20:
+            doubles.append(f"{mantissa}E{exponent}")
+        else:
+            doubles.append(mantissa)
+    return doubles
+
+
+_ZERO_DURATIONS = ("P0Y0M0DT0H0M0S", "P0Y0M0D", "-P0Y0M0DT0H0M0S", "P0Y0M0DT0H0M0.00S")
+
+
+def _durations(entropy: _Entropy, n: int) -> list[str]:
+    amounts = entropy.integers(0, 10, 5 * n)
+    seconds = entropy.integers(0, 100, 2 * n)
+    # For each of the six parts: the amount, zero or nothing
+    forms = entropy.integers(0, 2, 6 * n)
+    flags = entropy.bytes(n)
+    choices = entropy.integers(0, len(_ZERO_DURATIONS) + 9, n)
+
+    durations = []
+    for i in range(n):
+        if choices[i] < len(_ZERO_DURATIONS):
+            durations.append(_ZERO_DURATIONS[choices[i]])
+            continue
+
+        seconds_integer, seconds_fraction = seconds[2 * i], seconds[2 * i + 1]
+        second = f"{seconds_integer}"
+        if flags[i] & 1:
+            second = f"{seconds_integer}.{seconds_fraction}"
+        sign = "-" if flags[i] & 2 else ""
+
+        parts = []
+        for (amount, designator), form in zip(
+            (
+                (amounts[5 * i], "Y"),
+                (amounts[5 * i + 1], "M"),
+                (amounts[5 * i + 2], "D"),
+                (amounts[5 * i + 3], "H"),
+                (amounts[5 * i + 4], "M"),
+                (second, "S"),
+            ),
+            forms[6 * i : 6 * i + 6],
+        ):
+            match form:
+                case 0:
+                    parts.append(f"{amount}{designator}")
+                case 1:
+                    parts.append(f"0{designator}")
+                case _:
+                    parts.append("")
+
+        date_part, time_part = "".join(parts[:3]), "".join(parts[3:])
+        if time_part:
+            durations.append(f"{sign}P{date_part}T{time_part}")
+        elif date_part:
+            durations.append(f"{sign}P{date_part}")
+        else:
+            durations.append(f"{sign}P0Y")
+    return durations
+
+
+def _years(entropy: _Entropy, n: int) -> list[int]:
+    return entropy.integers(1900, 2099, n)
+
+
+def _months(entropy: _Entropy, n: int) -> list[int]:
+    return entropy.integers(1, 12, n)
+
+
+def _days(entropy: _Entropy, n: int) -> list[int]:
+    # Every month has these days
+    return entropy.integers(1, 28, n)
+
+
+def _dates(entropy: _Entropy, n: int) -> list[str]:
+    return [
+        f"{y:04}-{m:02}-{d:02}"
+        for y, m, d in zip(_years(entropy, n), _months(entropy, n), _days(entropy, n))
+    ]
+
+
+def _times(entropy: _Entropy, n: int) -> list[str]:
+    hours = entropy.integers(0, 23, n)
+    minutes = entropy.integers(0, 59, n)
+    seconds = entropy.integers(0, 59, n)
+    return [f"{h:02}:{m:02}:{s:02}" for h, m, s in zip(hours, minutes, seconds)]
+
+
+def _date_times(entropy: _Entropy, n: int) -> list[str]:
+    return [f"{d}T{t}" for d, t in zip(_dates(entropy, n), _times(entropy, n))]
+
+
+def _year_months(entropy: _Entropy, n: int) -> list[str]:
+    return [f"{y:04}-{m:02}" for y, m in zip(_years(entropy, n), _months(entropy, n))]
+
+
+def _g_years(entropy: _Entropy, n: int) -> list[str]:
+    return [f"{y:04}" for y in _years(entropy, n)]
+
+
+def _month_days(entropy: _Entropy, n: int) -> list[str]:
+    return [f"--{m:02}-{d:02}" for m, d in zip(_months(entropy, n), _days(entropy, n))]
+
+
+def _g_days(entropy: _Entropy, n: int) -> list[str]:
+    return [f"---{d:02}" for d in _days(entropy, n)]
+
+
+def _g_months(entropy: _Entropy, n: int) -> list[str]:
+    return [f"--{m:02}" for m in _months(entropy, n)]
+
+
+_BINARY_LENGTH = 12
+
+
+def _hex_binaries(entropy: _Entropy, n: int) -> list[str]:
+    data = entropy.bytes(n * _BINARY_LENGTH)
+    return [
+        data[i : i + _BINARY_LENGTH].hex().upper()
+        for i in range(0, len(data), _BINARY_LENGTH)
+    ]
+
+
+def _base64_binaries(entropy: _Entropy, n: int) -> list[str]:
+    data = entropy.bytes(n * _BINARY_LENGTH)
+    return [
+        base64.b64encode(data[i : i + _BINARY_LENGTH]).decode("ascii")
+        for i in range(0, len(data), _BINARY_LENGTH)
+    ]
+
+
+_URI_FORMS = (
+    "https://{host}.example.com/{path}",
+    "http://www.{host}.example.org/{path}/{segment}.xml",
+    "https://{host}.example.net/{path}?q={segment}#{fragment}",
+    "urn:{host}:{path}",
+    "{path}/{segment}.xml",
+    "../{path}#{fragment}",
+    "#{fragment}",
+)
+
+
+def _any_uris(entropy: _Entropy, n: int) -> list[str]:
+    """Absolute URIs, URNs and relative references, some with a query or fragment"""
+    hosts = [host.lower() for host in _words(entropy, n, 6)]
+    paths = _words(entropy, n, 8)
+    segments = _words(entropy, n, 4)
+    fragments = _words(entropy, n, 5)
+    forms = entropy.integers(0, len(_URI_FORMS) - 1, n)
+    return [
+        _URI_FORMS[form].format(host=host, path=path, segment=segment, fragment=fragment)
+        for form, host, path, segment, fragment in zip(
+            forms, hosts, paths, segments, fragments
+        )
+    ]
+
+
+_LANGUAGES = ("en", "en-US", "en-GB", "fr", "fr-BE", "de", "nl", "nl-BE", "es", "ja")
+
+
+def _languages(entropy: _Entropy, n: int) -> list[str]:
+    return [_LANGUAGES[i] for i in entropy.integers(0, len(_LANGUAGES) - 1, n)]
+
+
+def _name_lists(entropy: _Entropy, n: int) -> list[str]:
+    words = _words(entropy, 3 * n)
+    lengths = entropy.integers(1, 3, n)
+    return [" ".join(words[3 * i : 3 * i + k]) for i, k in enumerate(lengths)]
+
+
+def _uuids(entropy: _Entropy, n: int) -> list[str]:
+    """
+    Random (version 4) UUIDs, prefixed so that they are valid IDs.
+    """
+
+    data = bytearray(entropy.bytes(16 * n))
+    ids = []
+    for i in range(0, len(data), 16):
+        data[i + 6] = data[i + 6] & 0x0F | 0x40
+        data[i + 8] = data[i + 8] & 0x3F | 0x80
+        h = data[i : i + 16].hex()
+        ids.append(f"uuid-{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+    return ids
+
+
+def _integer_range(low: int, high: int) -> Callable[[_Entropy, int], list[str]]:
+    def integers(entropy: _Entropy, n: int) -> list[str]:
+        return [str(value) for value in entropy.integers(low, high, n)]
+
+    return integers
+
+
+# NOTATION and ENTITY values must name a notation or unparsed entity declared
+# elsewhere, so they cannot be generated. IDREFs come from the `IDRegistry`.
+_FILLERS: dict[BuiltIn, Callable[[_Entropy, int], list[str]]] = {
+    BuiltIn.string: _words,
+    BuiltIn.boolean: _booleans,
+    BuiltIn.decimal: _decimals,
+    BuiltIn.float: _floats,
+    BuiltIn.double: _doubles,
+    BuiltIn.duration: _durations,
+    BuiltIn.date_time: _date_times,
+    BuiltIn.time: _times,
+    BuiltIn.date: _dates,
+    BuiltIn.g_year_month: _year_months,
+    BuiltIn.g_year: _g_years,
+    BuiltIn.g_month_day: _month_days,
+    BuiltIn.g_day: _g_days,
+    BuiltIn.g_month: _g_months,
+    BuiltIn.hex_binary: _hex_binaries,
+    BuiltIn.base64_binary: _base64_binaries,
+    BuiltIn.any_uri: _any_uris,
+    # Unprefixed, so there is no namespace declaration to take care of
+    BuiltIn.q_name: _words,
+    BuiltIn.normalizedstring: _words,
+    BuiltIn.token: _words,
+    BuiltIn.language: _languages,
+    BuiltIn.nmtoken: _words,
+    BuiltIn.nmtokens: _name_lists,
+    BuiltIn.xsd_name: _words,
+    BuiltIn.ncname: _words,
+    BuiltIn.id: _uuids,
+    BuiltIn.integer: _small_integers,
+    BuiltIn.nonpositiveinteger: _integer_range(-(2**31), 0),
+    BuiltIn.negativeinteger: _integer_range(-(2**31), -1),
+    BuiltIn.long: _integer_range(-(2**63), 2**63 - 1),
+    BuiltIn.int: _integer_range(-(2**31), 2**31 - 1),
+    BuiltIn.short: _integer_range(-(2**15), 2**15 - 1),
+    BuiltIn.byte: _integer_range(-(2**7), 2**7 - 1),
+    BuiltIn.nonnegativeinteger: _small_non_negative_integers,
+    BuiltIn.unsignedlong: _integer_range(0, 2**64 - 1),
+    BuiltIn.unsignedint: _integer_range(0, 2**32 - 1),
+    BuiltIn.unsignedshort: _integer_range(0, 2**16 - 1),
+    BuiltIn.unsignedbyte: _integer_range(0, 2**8 - 1),
+    BuiltIn.positiveinteger: _integer_range(1, 2**31),
+}
@@ -0,0 +1,223 @@
+"""
+Serialize generated elements straight to a binary sink as UTF-8.
+
+Unlike `ElementTree.write`, the writer does not need the finished tree to
+collect namespaces first: prefixes come from the schema and a namespace the
+schema does not declare is declared on the element where it first appears.
+Elements are written as their events arrive and only the open elements are
+kept, so memory is bounded by the nesting depth rather than the document size.
+"""
+
+from typing import BinaryIO, Iterable
+import re
+
+from .events import Event, Start
+from .model import CompiledSchema
+from .namespaces import xml, xsd, xsi
+
+_needs_text_escape = re.compile(r"[&<>]").search
+_needs_attribute_escape = re.compile(r'[&<>"\n\r\t]').search
+
+
+def _escape_text(text: str) -> str:
+    if not _needs_text_escape(text):
+        return text
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _escape_attribute(value: str) -> str:
+    if not _needs_attribute_escape(value):
+        return value
+    value = value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    value = value.replace('"', "&quot;").replace("\r", "&#13;")
+    return value.replace("\n", "&#10;").replace("\t", "&#09;")
+
+
+def output_prefixes(schema: CompiledSchema) -> dict[str, str]:
+    """
+    Map the namespaces of a document to the prefixes used in the XSD.
+    The target namespace keeps its prefix, or becomes the default namespace
+    when the XSD does not give it one.
+    """
+
+    prefixes = {xsi.__ns__: "xsi"}
+    for prefix, uri in schema.namespaces.items():
+        if uri == xsd.__ns__ or uri in prefixes or prefix in prefixes.values():
+            continue
+        if prefix == "" and uri != schema.target_namespace:
+            continue
+        prefixes[uri] = prefix
+    return prefixes
+
+
+class XMLWriter:
+    """
+    Write elements to `sink` as they are started and ended.
+    `start` and `end` calls must be balanced and a text must directly follow its `start`.
+    """
+
+    def __init__(
+        self,
+        sink: BinaryIO,
+        prefixes: dict[str, str],
+        indent: str | None = "  ",
+        xml_declaration: bool = True,
+    ) -> None:
+        self._sink = sink
+        # The xml prefix is bound by definition and never declared
+        self._prefixes = {xml.__ns__: "xml"} | prefixes
+        self._root_declarations = {prefix: uri for uri, prefix in prefixes.items()}
+        self._indent = indent
+        # Per open element: the prefixes it declared and whether it has children
+        self._scopes: list[dict[str, str]] = []
+        self._has_children: list[bool] = []
+        self._open_tags: list[str] = []
+        self._start_tag_open = False
+        # Serialized names that only depend on the declarations of the root element
+        self._tag_names: dict[str, str] = {}
+        self._attribute_names: dict[str, str] = {}
+        self._default_redeclarations = 0
+        self._generated_prefixes = 0
+
+        if xml_declaration:
+            self._write("<?xml version='1.0' encoding='utf-8'?>\n")
+
+    def _write(self, data: str) -> None:
+        _ = self._sink.write(data.encode())
+
+    def _uri_of(self, prefix: str, declarations: dict[str, str]) -> str | None:
+        if prefix == "xml":
+            return xml.__ns__
+        if prefix in declarations:
+            return declarations[prefix]
+        for scope in reversed(self._scopes):
+            if prefix in scope:
+                return scope[prefix]
+        return None
+
+    def _new_prefix(self, uri: str, declarations: dict[str, str]) -> str:
+        while True:
+            prefix = f"ns{self._generated_prefixes}"
+            self._generated_prefixes += 1
+            if prefix not in self._prefixes.values():
+                declarations[prefix] = uri
+                return prefix
+
+    def _qualify_tag(self, tag: str, declarations: dict[str, str]) -> str:
+        if not tag.startswith("{"):
+            if self._uri_of("", declarations):
+                # Undeclare the default namespace for an element without namespace
+                declarations[""] = ""
+            return tag
+
+        uri, local = tag[1:].split("}", 1)
+        prefix = self._prefixes.get(uri)
+        if prefix is None or self._uri_of(prefix, declarations) != uri:
+            if prefix == "":
+                declarations[""] = uri
+            else:
+                prefix = self._new_prefix(uri, declarations)
+
+        if prefix == "":
+            return local
+        return prefix + ":" + local
+
+    def _qualify_attribute(self, name: str, declarations: dict[str, str]) -> str:
+        if not name.startswith("{"):
+            return name
+
+        uri, local = name[1:].split("}", 1)
+        prefix = self._prefixes.get(uri)
+        if not prefix or self._uri_of(prefix, declarations) != uri:
+            prefix = self._new_prefix(uri, declarations)
+        return prefix + ":" + local
+
+    def _close_start_tag(self) -> None:
+        if self._start_tag_open:
+            self._write(">")
+            self._start_tag_open = False
+
+    def start(self, tag: str, attrib: dict[str, str]) -> None:
+        self._close_start_tag()
+        depth = len(self._open_tags)
+        if depth > 0:
+            self._has_children[-1] = True
+            if self._indent is not None:
+                self._write("\n" + self._indent * depth)
+
+        declarations: dict[str, str] = {}
+        if depth == 0:
+            declarations = dict(self._root_declarations)
+            self._scopes.append(declarations)
+            name = self._qualify_tag(tag, declarations)
+        elif self._default_redeclarations == 0 and tag in self._tag_names:
+            name = self._tag_names[tag]
+        else:
+            name = self._qualify_tag(tag, declarations)
+            if not declarations and self._default_redeclarations == 0:
+                self._tag_names[tag] = name
+
+        parts = ["<", name]
+        for k, v in attrib.items():
+            attribute_name = self._attribute_names.get(k)
+            if attribute_name is None:
+                attribute_name = self._qualify_attribute(k, declarations)
+                if k[0] != "{" or self._prefixes.get(k[1:].split("}", 1)[0]):
+                    self._attribute_names[k] = attribute_name
+            parts.append(f' {attribute_name}="{_escape_attribute(v)}"')
+
+        if depth > 0:
+            self._scopes.append(declarations)
+            if "" in declarations:
+                self._default_redeclarations += 1
+
+        namespace_declarations = []
+        for prefix, uri in sorted(declarations.items()):
+            if prefix == "":
+                namespace_declarations.append(f' xmlns="{_escape_attribute(uri)}"')
+            else:
+                namespace_declarations.append(
+                    f' xmlns:{prefix}="{_escape_attribute(uri)}"'
+                )
+        parts[2:2] = namespace_declarations
+        self._write("".join(parts))
+
+        self._start_tag_open = True
+        self._open_tags.append(name)
+        self._has_children.append(False)
+
+    def text(self, text: str) -> None:
+        self._close_start_tag()
+        self._write(_escape_text(text))
+
+    def end(self) -> None:
+        name = self._open_tags.pop()
+        has_children = self._has_children.pop()
+        scope = self._scopes.pop()
+        if "" in scope and self._open_tags:
+            self._default_redeclarations -= 1
+
+        if self._start_tag_open:
+            self._write(" />")
+            self._start_tag_open = False
+            return
+
+        if has_children and self._indent is not None:
+            self._write("\n" + self._indent * len(self._open_tags))
+        self._write(f"</{name}>")
+
+    def close(self) -> None:
+        if self._open_tags:
+            raise ValueError()
+        if self._indent is not None:
+            self._write("\n")
+
+
+def write_events(writer: XMLWriter, events: Iterable[Event]) -> None:
+    for event in events:
+        if isinstance(event, Start):
+            writer.start(event.tag, event.attrib)
+            if event.text:
+                writer.text(event.text)
+        else:
+            writer.end()
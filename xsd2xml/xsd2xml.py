@@ -1,22 +1,168 @@
+from contextlib import aclosing
+from os import PathLike
+from pathlib import Path
+from typing import AsyncGenerator
+import asyncio
+import random
 import xml.etree.ElementTree as ET
 
-from .core.etree import _ElementTree
-from .core import idrefs, element
-from .core.namespaces import xsd
+from .core.etree import XSDSource
+from .core.compiler import compile_schema
+from .core.model import CompiledSchema
+from .core.providers import ValueProviders
+from .core.registry import SchemaRegistry
+from .core import cache
+from .core.batch import Batch, Document
+from .core import aio
+from .core.budget import Budget
+from .core.coverage import Coverage
 
 
-def generate(xsd_path: str, element_name: str) -> ET.ElementTree:
-    xsd_tree = _ElementTree.parse(xsd_path)
-    xsd_root = xsd_tree.getroot()
+def compile(
+    xsd: XSDSource,
+    cache_dir: str | PathLike[str] | None = None,
+    providers: ValueProviders | None = None,
+    registry: SchemaRegistry | None = None,
+) -> CompiledSchema:
+    """
+    Parse and compile the XSD once so that it can be used for many generations.
+    `xsd` is a path, the XSD as bytes, a binary file object or a parsed tree.
 
-    xsd_element = xsd_root.find(f"{xsd.element}[@name='{element_name}']")
-    if xsd_element is None:
-        raise ValueError()
+    The documents it includes, imports and redefines are loaded through `registry`,
+    which maps them to local files and parses each file once for all the schemas
+    compiled with it. Without a registry, a new one is used.
 
-    ph_elements = element.generate_element(xsd_element)
-    ph_element = next(iter(ph_elements))
-    root_element = ph_element.manifest_placeholders()
+    When `cache_dir` is given, the compiled schema is stored there and later
+    processes compiling the same XSD load it instead. Parsed trees are never cached.
 
-    idrefs._recurse_markers(root_element)
+    `providers` replace the generated values of the types and paths they are registered for.
+    """
+    if registry is None:
+        registry = SchemaRegistry()
 
-    return ET.ElementTree(root_element)
+    if cache_dir is None or isinstance(xsd, ET.ElementTree):
+        schema = compile_schema(registry.load(xsd))
+    else:
+        xsd_bytes = cache.read_source(xsd)
+        if not isinstance(xsd, (str, PathLike)):
+            # A file object can only be read once
+            xsd = xsd_bytes
+
+        # The key covers the raw content of every document of the schema, so that
+        # a cache hit parses none of them
+        location = Path(xsd).resolve() if isinstance(xsd, (str, PathLike)) else None
+        key = cache.cache_key(*registry.read_closure(xsd_bytes, location))
+        schema = cache.load_or_compile(
+            key, cache_dir, lambda: compile_schema(registry.load(xsd))
+        )
+
+    if providers is not None:
+        schema = providers.bind(schema)
+    return schema
+
+
+def generate(
+    xsd: XSDSource,
+    element_name: str,
+    rng: random.Random | None = None,
+    budget: Budget | None = None,
+    check: bool = False,
+) -> ET.ElementTree:
+    return compile(xsd).generate(element_name, rng, budget, check)
+
+
+def generate_many(
+    xsd: XSDSource | CompiledSchema,
+    element_name: str,
+    n: int,
+    seed: int | None = None,
+    serialize: bool = False,
+    workers: int | None = None,
+    chunk_size: int = 16,
+    budget: Budget | None = None,
+    specialize: bool = False,
+    check: bool = False,
+    coverage: Coverage | None = None,
+) -> Batch:
+    """
+    Lazily generate `n` documents. The schema is compiled and the root element
+    is looked up once for the whole batch.
+    Documents are `ET.ElementTree`s, or indented UTF-8 encoded bytes when `serialize` is set.
+
+    With `workers`, documents are generated by that many processes in chunks of
+    `chunk_size` documents. Given a seed, the documents are the same and in the
+    same order for any number of workers, and `Batch.document` regenerates any
+    single one of them.
+
+    `budget` sets the size of every document, e.g. `Budget(elements=Zipf(10, 100_000))`.
+
+    With `specialize`, the documents are generated by Python code emitted for the
+    root element, see `CompiledSchema.specialize`. They are the same documents.
+
+    With `check`, every document is validated against the schema, see
+    `CompiledSchema.validate`, and `InvalidDocumentError` is raised for an invalid one.
+
+    With a `coverage`, see `CompiledSchema.coverage`, every document is steered
+    toward the paths of the schema the documents before it did not cover, until
+    all are covered. Such a batch is generated in one process without specialization.
+    """
+    schema = xsd if isinstance(xsd, CompiledSchema) else compile(xsd)
+    return Batch(
+        schema,
+        element_name,
+        n,
+        seed=seed,
+        serialize=serialize,
+        workers=workers,
+        chunk_size=chunk_size,
+        budget=budget,
+        specialize=specialize,
+        check=check,
+        coverage=coverage,
+    )
+
+
+async def agenerate(
+    xsd: XSDSource | CompiledSchema,
+    element_name: str,
+    n: int | None = None,
+    seed: int | None = None,
+    serialize: bool = False,
+    workers: int | None = None,
+    prefetch: int = 8,
+    budget: Budget | None = None,
+    specialize: bool = False,
+    check: bool = False,
+) -> AsyncGenerator[Document, None]:
+    """
+    Asynchronously generate `n` documents, or an endless stream when `n` is None,
+    without blocking the event loop: `async for document in agenerate(...)`.
+
+    The schema is compiled and the documents are generated in a thread, or in
+    `workers` processes. At most `prefetch` documents are generated ahead of the
+    consumer. Given a seed, the documents are those of `generate_many`.
+    Leaving the loop or cancelling the consuming task stops generation.
+    With `check`, every document is validated against the schema.
+    """
+    if isinstance(xsd, CompiledSchema):
+        schema = xsd
+    else:
+        schema = await asyncio.to_thread(compile, xsd)
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    stream = aio.generate_documents(
+        schema,
+        element_name,
+        n,
+        seed,
+        serialize=serialize,
+        budget=budget,
+        specialize=specialize,
+        workers=workers,
+        prefetch=prefetch,
+        check=check,
+    )
+    async with aclosing(stream):
+        async for document in stream:
+            yield document